@@ -1,10 +1,16 @@
-import json, boto3, os, datetime
+import json, os, datetime
+from decimal import Decimal
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr, Key
+from common.aggregates import update_entries, order_amount, CONFLICT_RETRIES
+from common.dynamo import transact_write, TransactionCanceled
+from common import kpis
+from boto3.dynamodb.conditions import Key
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
 
 def handler(event, context):
     try:
@@ -28,10 +34,15 @@ def handler(event, context):
                 "body": json.dumps({"error": "Evento sin id_order para métricas de delivery"}),
             }
 
-        resp = delivery_table.scan(FilterExpression=Attr("id_order").eq(order_id))
-        if not resp.get("Items"):
+        resp = delivery_table.query(
+            IndexName="OrderIndex",
+            KeyConditionExpression=Key("id_order").eq(order_id)
+        )
+        deliveries = [d for d in resp.get("Items", []) if not tenant_id or d.get("tenant_id") == tenant_id]
+        if not deliveries:
             return {"statusCode": 404, "body": json.dumps({"error": "Entrega no encontrada"})}
-        delivery = resp["Items"][0]
+        delivery = deliveries[0]
+        tenant_id = tenant_id or delivery.get("tenant_id")
 
         if not delivery.get("tiempo_salida") or not delivery.get("tiempo_llegada"):
             # Si aún no tenemos tiempos completos, no consideramos esto un error de la
@@ -58,12 +69,59 @@ def handler(event, context):
         metric = analytics_resp["Items"][0]
         id_metric = metric["id_metric"]
 
-        analytics_table.update_item(
-            Key={"tenant_id": tenant_id, "id_metric": id_metric},
-            UpdateExpression="SET #s=:s, fin=:f, tiempo_total=:t, id_staff=:st",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": "entregado", ":f": delivery["tiempo_llegada"], ":t": dur, ":st": delivery.get("id_staff")}
-        )
+        metric_update = {
+            "Key": {"tenant_id": tenant_id, "id_metric": id_metric},
+            "UpdateExpression": "SET #s=:s, fin=:f, tiempo_total=:t, id_staff=:st",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {":s": "entregado", ":f": delivery["tiempo_llegada"], ":t": Decimal(str(round(dur, 2))), ":st": delivery.get("id_staff")},
+        }
+
+        # Este handler corre tanto por Order.Delivered como desde Step Functions:
+        # los contadores del dashboard y los KPIs se suman una sola vez, marcando la métrica
+        # (agregado_entrega) dentro de la misma transacción.
+        order = orders_table.get_item(
+            Key={"tenant_id": tenant_id, "id_order": order_id},
+            ProjectionExpression="#t, #i",
+            ExpressionAttributeNames={"#t": "total", "#i": "items"},
+        ).get("Item") or {}
+        counters = {
+            "entregas_completadas": 1,
+            "ordenes_entregadas": 1,
+            "total_ingresos": order_amount(order),
+        }
+        staff = [delivery["id_staff"]] if delivery.get("id_staff") else None
+
+        # Sketches de tiempos por etapa (empacado -> salida -> entregado)
+        kitchen = kitchen_table.get_item(
+            Key={"tenant_id": tenant_id, "order_id": order_id},
+            ProjectionExpression="packed_at, end_time",
+        ).get("Item") or {}
+        observations = [
+            kpis.stage_observation("empacado_a_salida", kitchen.get("packed_at") or kitchen.get("end_time"), delivery["tiempo_salida"]),
+            kpis.stage_observation("salida_a_entregado", delivery["tiempo_salida"], delivery["tiempo_llegada"]),
+        ]
+        responsables = [("delivered_by", delivery.get("delivered_by"), kpis.hour_key(end))]
+        try:
+            transact_write(
+                [{
+                    "Update": {
+                        "TableName": analytics_table.name,
+                        **metric_update,
+                        "UpdateExpression": metric_update["UpdateExpression"] + ", agregado_entrega=:true",
+                        "ConditionExpression": "attribute_not_exists(agregado_entrega)",
+                        "ExpressionAttributeValues": {**metric_update["ExpressionAttributeValues"], ":true": True},
+                    }
+                }]
+                + update_entries(analytics_table.name, tenant_id, datetime.datetime.utcnow().date(), counters, staff=staff)
+                + kpis.update_entries(analytics_table.name, tenant_id, observations, responsables),
+                conflict_retries=CONFLICT_RETRIES,
+            )
+        except TransactionCanceled as e:
+            # TransactionConflict persistente u otro motivo: se propaga para que el evento se reintente
+            if not any(r.get("Code") == "ConditionalCheckFailed" for r in e.reasons):
+                raise
+            # ya contabilizada: solo se refresca la métrica
+            analytics_table.update_item(**metric_update)
 
         return {
             "statusCode": 200,
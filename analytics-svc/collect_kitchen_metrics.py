@@ -1,20 +1,25 @@
-import json, boto3, os, datetime
+import json, os, datetime
+from decimal import Decimal
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr, Key
+from boto3.dynamodb.conditions import Key
+from common import kpis
+from common.aggregates import CONFLICT_RETRIES
+from common.dynamo import transact_write, TransactionCanceled
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
-kitchen_table = dynamo.Table(os.environ["KITCHEN_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
 
 def handler(event, context):
     try:
         detail = event.get("detail", {})
         order_id = detail["order_id"]
+        tenant_id = detail["tenant_id"]
 
-        resp = kitchen_table.scan(FilterExpression=Attr("order_id").eq(order_id))
-        if not resp.get("Items"):
+        kitchen = kitchen_table.get_item(Key={"tenant_id": tenant_id, "order_id": order_id}).get("Item")
+        if not kitchen:
             return {"statusCode": 404, "body": json.dumps({"error": "Pedido no encontrado en cocina"})}
-        kitchen = resp["Items"][0]
 
         if not kitchen.get("start_time") or not kitchen.get("end_time"):
             return {"statusCode": 400, "body": json.dumps({"error": "Pedido sin tiempos definidos"})}
@@ -28,18 +33,60 @@ def handler(event, context):
             KeyConditionExpression=Key("id_order").eq(order_id)
         )
         
-        if not analytics_resp.get("Items"):
+        metrics = [m for m in analytics_resp.get("Items", []) if m.get("tenant_id") == tenant_id]
+        if not metrics:
             return {"statusCode": 404, "body": json.dumps({"error": "Métrica no encontrada para este pedido"})}
         
-        metric = analytics_resp["Items"][0]
+        metric = metrics[0]
         id_metric = metric["id_metric"]
 
-        analytics_table.update_item(
-            Key={"id_metric": id_metric},
-            UpdateExpression="SET #s=:s, inicio=:i, fin=:f, tiempo_total=:t",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": "listo_para_entrega", ":i": kitchen["start_time"], ":f": kitchen["end_time"], ":t": dur}
-        )
+        metric_update = {
+            "Key": {"tenant_id": tenant_id, "id_metric": id_metric},
+            "UpdateExpression": "SET #s=:s, inicio=:i, fin=:f, tiempo_total=:t",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {":s": "listo_para_entrega", ":i": kitchen["start_time"], ":f": kitchen["end_time"], ":t": Decimal(str(round(dur, 2)))},
+        }
+
+        # Sketches de tiempos por etapa (recibido -> aceptado -> empacado).
+        # receive_order copia created_at del pedido; para registros anteriores se lee de Orders.
+        order_created_at = kitchen.get("order_created_at")
+        if not order_created_at:
+            order = orders_table.get_item(
+                Key={"tenant_id": tenant_id, "id_order": order_id},
+                ProjectionExpression="created_at",
+            ).get("Item") or {}
+            order_created_at = order.get("created_at")
+        accepted_at = kitchen.get("accepted_at")
+        accepted_dt = kpis.parse_iso(accepted_at)
+        packed_at = kitchen.get("packed_at") or kitchen["end_time"]
+        observations = [
+            kpis.stage_observation("recibido_a_aceptado", order_created_at, accepted_at),
+            kpis.stage_observation("aceptado_a_empacado", accepted_at, packed_at),
+        ]
+        responsables = [
+            ("accepted_by", kitchen.get("accepted_by"), kpis.hour_key(accepted_dt) if accepted_dt else None),
+            ("packed_by", kitchen.get("packed_by"), kpis.hour_key(end)),
+        ]
+
+        # Order.Prepared puede llegar más de una vez: la marca kpi_cocina evita contar dos veces
+        try:
+            transact_write(
+                [{
+                    "Update": {
+                        "TableName": analytics_table.name,
+                        **metric_update,
+                        "UpdateExpression": metric_update["UpdateExpression"] + ", kpi_cocina=:true",
+                        "ConditionExpression": "attribute_not_exists(kpi_cocina)",
+                        "ExpressionAttributeValues": {**metric_update["ExpressionAttributeValues"], ":true": True},
+                    }
+                }] + kpis.update_entries(analytics_table.name, tenant_id, observations, responsables),
+                conflict_retries=CONFLICT_RETRIES,
+            )
+        except TransactionCanceled as e:
+            # TransactionConflict persistente u otro motivo: se propaga para que el evento se reintente
+            if not any(r.get("Code") == "ConditionalCheckFailed" for r in e.reasons):
+                raise
+            analytics_table.update_item(**metric_update)
 
         return {"statusCode": 200, "body": json.dumps({"message": "Métrica de cocina actualizada", "tiempo_total": dur})}
 
@@ -1,8 +1,13 @@
-import json, boto3, os, datetime, uuid
+import json, os, datetime, uuid
 from botocore.exceptions import ClientError
+from common.aggregates import update_entries, CONFLICT_RETRIES
+from common.dynamo import transact_write, TransactionCanceled
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+
+# id de la métrica inicial derivado del pedido: un reintento del evento cae en el mismo item
+METRIC_NAMESPACE = uuid.UUID("6f1c2a7e-3b4d-4e8f-9a0b-5c6d7e8f9a01")
 
 def handler(event, context):
     try:
@@ -10,10 +15,11 @@ def handler(event, context):
         order_id = detail["id_order"]
         tenant_id = detail.get("tenant_id", "default")
 
-        now = datetime.datetime.utcnow().isoformat()
+        now_dt = datetime.datetime.utcnow()
+        now = now_dt.isoformat()
 
         metric_item = {
-            "id_metric": str(uuid.uuid4()),
+            "id_metric": str(uuid.uuid5(METRIC_NAMESPACE, f"{tenant_id}#{order_id}")),
             "id_order": order_id,
             "id_staff": None,
             "status": "recibido",
@@ -23,7 +29,23 @@ def handler(event, context):
             "tenant_id": tenant_id
         }
 
-        analytics_table.put_item(Item=metric_item)
+        # Métrica del pedido + contadores del dashboard en una sola transacción. EventBridge
+        # entrega al menos una vez: el Put condicional hace que pedidos_total se sume una sola vez.
+        # Si sigue cancelándose tras los reintentos, la excepción hace que EventBridge reintente.
+        try:
+            transact_write(
+                [{"Put": {
+                    "TableName": analytics_table.name,
+                    "Item": metric_item,
+                    "ConditionExpression": "attribute_not_exists(id_metric)",
+                }}]
+                + update_entries(analytics_table.name, tenant_id, now_dt.date(), {"pedidos_total": 1}),
+                conflict_retries=CONFLICT_RETRIES,
+            )
+        except TransactionCanceled as e:
+            if not e.reasons or e.reasons[0].get("Code") != "ConditionalCheckFailed":
+                raise
+            return {"statusCode": 200, "body": json.dumps({"message": "Métrica inicial ya registrada", "id_order": order_id})}
 
         return {"statusCode": 200, "body": json.dumps({"message": "Métrica inicial registrada", "id_order": order_id})}
 
@@ -1,8 +1,10 @@
-import json, boto3, os, datetime, uuid
+import json, os, datetime, uuid
 from botocore.exceptions import ClientError
+from common.aggregates import update_entries, CONFLICT_RETRIES
+from common.dynamo import transact_write
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
 
 def handler(event, context):
     try:
@@ -10,11 +12,11 @@ def handler(event, context):
         staff_id = detail.get("id_staff")
         tenant_id = detail.get("tenant_id", "default")
         role = detail.get("role", "desconocido")
-        now = datetime.datetime.utcnow().isoformat()
+        now_dt = datetime.datetime.utcnow()
+        now = now_dt.isoformat()
 
         metric_item = {
             "id_metric": str(uuid.uuid4()),
-            "id_order": None,
             "id_staff": staff_id,
             "status": "activo",
             "inicio": now,
@@ -24,7 +26,17 @@ def handler(event, context):
             "role": role
         }
 
-        analytics_table.put_item(Item=metric_item)
+        # id_order se omite: es clave de OrderIndex y no admite NULL
+        if staff_id:
+            # el set `staff` del agregado alimenta empleados_activos del dashboard
+            # si sigue cancelándose tras los reintentos, la excepción hace que EventBridge reintente
+            transact_write(
+                [{"Put": {"TableName": analytics_table.name, "Item": metric_item}}]
+                + update_entries(analytics_table.name, tenant_id, now_dt.date(), {}, staff=[staff_id]),
+                conflict_retries=CONFLICT_RETRIES,
+            )
+        else:
+            analytics_table.put_item(Item=metric_item)
         return {"statusCode": 200, "body": json.dumps({"message": "Métrica de personal actualizada"})}
     except ClientError as e:
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
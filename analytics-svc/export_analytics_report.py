@@ -1,24 +1,41 @@
-import json, boto3, os, csv, io, datetime
-from boto3.dynamodb.conditions import Attr
+import json, os, csv, io, datetime
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common.dynamo import ConsumedCapacity, iter_query
+from common.logger import log_info
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
-s3 = boto3.client("s3")
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+s3 = aws.lazy_client("s3")
+
+# Columnas de los registros de métricas (collect_*_metrics)
+METRIC_FIELDS = ["id_metric", "tenant_id", "id_order", "id_staff", "role", "status", "inicio", "fin", "tiempo_total"]
 
 def handler(event, context):
     try:
         tenant_id = event.get("tenant_id", "default")
-        resp = analytics_table.scan(FilterExpression=Attr("tenant_id").eq(tenant_id))
-        items = resp.get("Items", [])
-        if not items:
-            return {"statusCode": 404, "body": json.dumps({"error": "No hay métricas disponibles"})}
+        capacity = ConsumedCapacity()
+        # tenant_id es la clave de partición de Analytics: query en vez de scan
+        items = iter_query(
+            analytics_table,
+            capacity,
+            projection=METRIC_FIELDS,
+            KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+            # los registros AGG# del dashboard no son métricas
+            FilterExpression=Attr("record_type").not_exists(),
+        )
 
-        filename = f"{tenant_id}_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
         csv_buffer = io.StringIO()
-        writer = csv.DictWriter(csv_buffer, fieldnames=items[0].keys())
+        writer = csv.DictWriter(csv_buffer, fieldnames=METRIC_FIELDS, extrasaction="ignore")
         writer.writeheader()
-        writer.writerows(items)
+        rows = 0
+        for item in items:
+            writer.writerow(item)
+            rows += 1
+        if not rows:
+            return {"statusCode": 404, "body": json.dumps({"error": "No hay métricas disponibles"})}
+
+        filename = f"{tenant_id}_{datetime.datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
 
         s3.put_object(
             Bucket=os.environ["ANALYTICS_BUCKET"],
@@ -27,6 +44,7 @@ def handler(event, context):
             ContentType="text/csv"
         )
 
+        log_info("Reporte de analytics exportado", event, context, {"tenant_id": tenant_id, "rows": rows, "consumed_capacity": capacity.as_dict()})
         return {"statusCode": 200, "body": json.dumps({"message": "Reporte exportado", "file": filename})}
     except ClientError as e:
         return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -1,10 +1,11 @@
 import datetime
-import json, boto3, os, statistics
+import json, os, statistics
 from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
+from common.dynamo import iter_scan
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
 
 
 def handler(event, context):
@@ -22,8 +23,11 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        resp = delivery_table.scan(FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("status").eq("entregado"))
-        items = resp.get("Items", [])
+        items = iter_scan(
+            delivery_table,
+            projection=["direccion", "tiempo_salida", "tiempo_llegada"],
+            FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("status").eq("entregado"),
+        )
 
         zonas = {}
         tiempos = []
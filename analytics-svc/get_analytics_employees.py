@@ -1,9 +1,10 @@
-import json, boto3, os
+import json, os
 from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
 
 
 def handler(event, context):
@@ -22,11 +23,12 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        resp = analytics_table.query(
+        items = iter_query(
+            analytics_table,
+            projection=["id_staff", "tiempo_total"],
             KeyConditionExpression=Key("tenant_id").eq(tenant_id),
-            FilterExpression=Attr("id_staff").ne(None)
+            FilterExpression=Attr("id_staff").ne(None) & Attr("record_type").not_exists()
         )
-        items = resp.get("Items", [])
 
         metrics = {}
         for i in items:
@@ -1,9 +1,10 @@
-import json, boto3, os, statistics
+import json, os, statistics
 from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
 
 
 def handler(event, context):
@@ -22,21 +23,25 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        resp = analytics_table.query(
+        items = iter_query(
+            analytics_table,
+            projection=["status", "tiempo_total"],
             KeyConditionExpression=Key("tenant_id").eq(tenant_id),
-            FilterExpression=Attr("id_order").ne(None)
+            FilterExpression=Attr("id_order").ne(None) & Attr("record_type").not_exists()
         )
-        items = resp.get("Items", [])
-
-        tiempos = [i["tiempo_total"] for i in items if i.get("tiempo_total")]
-        promedio = statistics.mean(tiempos) if tiempos else 0
 
+        total_pedidos = 0
+        tiempos = []
         estados = {}
         for i in items:
+            total_pedidos += 1
+            if i.get("tiempo_total"):
+                tiempos.append(i["tiempo_total"])
             estados[i["status"]] = estados.get(i["status"], 0) + 1
+        promedio = statistics.mean(tiempos) if tiempos else 0
 
         result = {
-            "total_pedidos": len(items),
+            "total_pedidos": total_pedidos,
             "tiempo_promedio": promedio,
             "distribucion_estados": estados
         }
@@ -1,13 +1,12 @@
-import json, boto3, os, datetime
-from decimal import Decimal
+import json, os, datetime
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
+from common.aggregates import COUNTERS, TOTAL_ID, day_id
+from common.dynamo import ConsumedCapacity, batch_get_items
+from common.logger import log_info
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-analytics_table = dynamo.Table(os.environ["ANALYTICS_TABLE"])
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
-s3 = boto3.client("s3")
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+s3 = aws.lazy_client("s3")
 
 
 def handler(event, context):
@@ -26,60 +25,32 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        # pedidos totales (métricas registradas)
-        pedidos = analytics_table.scan(FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("id_order").ne(None))
-        pedidos_total = len(pedidos.get("Items", []))
-
-        # empleados activos
-        empleados = analytics_table.scan(FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("id_staff").ne(None))
-        staff_total = len(set([e["id_staff"] for e in empleados.get("Items", [])]))
-
-        # entregas completadas
-        deliveries = delivery_table.scan(FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("status").eq("entregado"))
-        entregas_total = len(deliveries.get("Items", []))
-
-        # métricas financieras básicas a partir de las órdenes entregadas
-        # Nota: para simplicidad se usa un scan filtrando por tenant_id y status="entregado".
-        # En producción esto podría optimizarse con índices.
-        orders_scan = orders_table.scan(
-            FilterExpression=Attr("tenant_id").eq(tenant_id) & Attr("status").eq("entregado")
-        )
-        orders_items = orders_scan.get("Items", [])
-
-        total_ingresos = 0.0
-        ordenes_ultimos_7_dias = 0
-        now = datetime.datetime.utcnow()
-        seven_days_ago = now - datetime.timedelta(days=7)
-
-        for o in orders_items:
-            items = o.get("items") or []
-            order_total = 0.0
-            for it in items:
-                if not isinstance(it, dict):
-                    continue
-                precio = it.get("precio") or it.get("price") or 0
-                qty = it.get("qty") or 1
-                try:
-                    if isinstance(precio, Decimal):
-                        precio_val = float(precio)
-                    else:
-                        precio_val = float(precio)
-                    order_total += precio_val * float(qty)
-                except Exception:
-                    continue
-            total_ingresos += order_total
+        capacity = ConsumedCapacity()
+        today = datetime.datetime.utcnow().date()
+        last_7_days = [today - datetime.timedelta(days=i) for i in range(7)]
+
+        # Agregados mantenidos por los collectors: registro total + uno por día
+        keys = [{"tenant_id": tenant_id, "id_metric": TOTAL_ID}]
+        keys += [{"tenant_id": tenant_id, "id_metric": day_id(d)} for d in last_7_days]
+        records = {
+            r["id_metric"]: r
+            for r in batch_get_items(
+                analytics_table,
+                keys,
+                projection=["id_metric", "staff", *COUNTERS],
+                capacity=capacity,
+            )
+        }
+        total = records.get(TOTAL_ID, {})
 
-            # contar órdenes entregadas en los últimos 7 días usando updated_at
-            updated_raw = o.get("updated_at") or o.get("created_at")
-            if updated_raw:
-                try:
-                    updated_dt = datetime.datetime.fromisoformat(str(updated_raw))
-                    if updated_dt >= seven_days_ago:
-                        ordenes_ultimos_7_dias += 1
-                except Exception:
-                    pass
+        pedidos_total = int(total.get("pedidos_total", 0))
+        staff_total = len(total.get("staff") or [])
+        entregas_total = int(total.get("entregas_completadas", 0))
+        total_ingresos = float(total.get("total_ingresos", 0))
+        ordenes_entregadas = int(total.get("ordenes_entregadas", 0))
+        ordenes_ultimos_7_dias = sum(int(records.get(day_id(d), {}).get("ordenes_entregadas", 0)) for d in last_7_days)
 
-        ticket_promedio = (total_ingresos / len(orders_items)) if orders_items else 0.0
+        ticket_promedio = (total_ingresos / ordenes_entregadas) if ordenes_entregadas else 0.0
 
         resumen = {
             "tenant_id": tenant_id,
@@ -100,6 +71,7 @@ def handler(event, context):
             ContentType="application/json"
         )
 
+        log_info("Dashboard calculado", event, context, {"tenant_id": tenant_id, "consumed_capacity": capacity.as_dict()})
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resumen)}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
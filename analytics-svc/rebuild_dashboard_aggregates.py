@@ -0,0 +1,115 @@
+import json, os, datetime
+from decimal import Decimal
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Attr, Key
+from common.aggregates import RECORD_TYPE, TOTAL_ID, day_id, order_amount
+from common.dynamo import ConsumedCapacity, iter_query, count_items, run_parallel
+from common.logger import log_info
+from common import aws
+
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def parse_day(ts):
+    try:
+        return datetime.datetime.fromisoformat(str(ts)).date()
+    except Exception:
+        return None
+
+
+def handler(event, context):
+    """Recalcula desde cero los agregados del dashboard de un tenant (invocación manual).
+
+    Pensado para inicializar tenants con historial previo a los agregados
+    incrementales; conviene correrlo con poco tráfico porque sobrescribe los
+    registros AGG# del tenant.
+    """
+    try:
+        tenant_id = event.get("tenant_id", "default")
+        capacity = ConsumedCapacity()
+        days = {}
+
+        def day(d):
+            return days.setdefault(d, {"pedidos_total": 0, "ordenes_entregadas": 0, "total_ingresos": Decimal("0")})
+
+        # métricas registradas: pedidos (id_order) y personal (id_staff)
+        def leer_metricas():
+            pedidos_total = 0
+            staff = set()
+            metrics = iter_query(
+                analytics_table,
+                capacity,
+                projection=["id_order", "id_staff", "inicio"],
+                KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+                FilterExpression=Attr("record_type").not_exists(),
+            )
+            for m in metrics:
+                if m.get("id_order"):
+                    pedidos_total += 1
+                    d = parse_day(m.get("inicio"))
+                    if d:
+                        day(d)["pedidos_total"] += 1
+                if m.get("id_staff"):
+                    staff.add(m["id_staff"])
+            return pedidos_total, staff
+
+        def contar_entregas():
+            return count_items(
+                delivery_table.query,
+                capacity,
+                KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+                FilterExpression=Attr("status").eq("entregado"),
+            )
+
+        def resumir_ordenes():
+            total_ingresos = Decimal("0")
+            ordenes_entregadas = 0
+            orders_items = iter_query(
+                orders_table,
+                capacity,
+                projection=["total", "items", "updated_at", "created_at"],
+                KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+                FilterExpression=Attr("status").eq("entregado"),
+            )
+            for o in orders_items:
+                total = order_amount(o)
+                ordenes_entregadas += 1
+                total_ingresos += total
+                d = parse_day(o.get("updated_at") or o.get("created_at"))
+                if d:
+                    day(d)["ordenes_entregadas"] += 1
+                    day(d)["total_ingresos"] += total
+            return total_ingresos, ordenes_entregadas
+
+        res = run_parallel({"metricas": leer_metricas, "entregas": contar_entregas, "ordenes": resumir_ordenes})
+        pedidos_total, staff = res["metricas"]
+        total_ingresos, ordenes_entregadas = res["ordenes"]
+
+        total_item = {
+            "tenant_id": tenant_id,
+            "id_metric": TOTAL_ID,
+            "record_type": RECORD_TYPE,
+            "pedidos_total": pedidos_total,
+            "entregas_completadas": res["entregas"],
+            "ordenes_entregadas": ordenes_entregadas,
+            "total_ingresos": total_ingresos,
+        }
+        if staff:
+            total_item["staff"] = staff
+
+        with analytics_table.batch_writer() as batch:
+            batch.put_item(Item=total_item)
+            for d, counters in days.items():
+                batch.put_item(Item={
+                    "tenant_id": tenant_id,
+                    "id_metric": day_id(d),
+                    "record_type": RECORD_TYPE,
+                    **counters,
+                })
+
+        log_info("Agregados del dashboard recalculados", event, context, {"tenant_id": tenant_id, "days": len(days), "consumed_capacity": capacity.as_dict()})
+        return {"statusCode": 200, "body": json.dumps({"message": "Agregados recalculados", "tenant_id": tenant_id, "days": len(days)})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
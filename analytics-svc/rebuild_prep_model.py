@@ -0,0 +1,60 @@
+import json, os, datetime
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from common import aws, kitchen_queue, kpis, prep_model
+from common.dynamo import ConsumedCapacity, batch_get_items, iter_query
+from common.logger import log_info
+
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def handler(event, context):
+    """Ajusta desde cero el modelo de preparación de un tenant con su historial de Kitchen (invocación manual).
+
+    Usa los tickets empacados de los últimos `days` días (90 por defecto) y
+    reemplaza el modelo incremental; los Order.Prepared siguientes lo siguen ajustando.
+    """
+    try:
+        tenant_id = (event or {}).get("tenant_id")
+        if not tenant_id:
+            return {"statusCode": 400, "body": json.dumps({"error": "tenant_id requerido"})}
+        days = int((event or {}).get("days") or 90)
+        since = (datetime.datetime.utcnow() - datetime.timedelta(days=days)).isoformat()
+        capacity = ConsumedCapacity()
+
+        tickets = {
+            t["order_id"]: t
+            for t in iter_query(
+                kitchen_table,
+                capacity,
+                projection=["order_id", "start_time", "end_time"],
+                IndexName="TenantEndTimeIndex",
+                KeyConditionExpression=Key("tenant_id").eq(tenant_id) & Key("end_time").gte(since),
+            )
+        }
+        orders = batch_get_items(
+            orders_table,
+            [{"tenant_id": tenant_id, "id_order": order_id} for order_id in tickets],
+            projection=["id_order", "items", "list_id_products"],
+            capacity=capacity,
+        )
+
+        observations = []
+        for order in orders:
+            ticket = tickets.get(order["id_order"]) or {}
+            start, end = kpis.parse_iso(ticket.get("start_time")), kpis.parse_iso(ticket.get("end_time"))
+            if start and end:
+                observations.append((kitchen_queue.order_lines(order), (end - start).total_seconds() / 60.0))
+
+        model = prep_model.fit(observations, kitchen_queue.menu_plans(tenant_id))
+        current = prep_model.load_model(tenant_id, consistent=True)
+        prep_model.save_model(tenant_id, model, expected_version=current.get("version", 0))
+
+        log_info("Modelo de preparación recalculado", event, context, {
+            "tenant_id": tenant_id, "observations": model["n"], "products": len(model["coef"]),
+            "consumed_capacity": capacity.as_dict(),
+        })
+        return {"statusCode": 200, "body": json.dumps({"tenant_id": tenant_id, "observations": model["n"], "products": len(model["coef"])})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
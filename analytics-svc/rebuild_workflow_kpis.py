@@ -0,0 +1,115 @@
+import json, os
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+from common import kpis
+from common.dynamo import ConsumedCapacity, iter_query, run_parallel
+from common.logger import log_info
+from common.sketch import DDSketch
+from common import aws
+
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+
+
+def handler(event, context):
+    """Recalcula los sketches KPI# de un tenant a partir de Orders/Kitchen/Delivery (invocación manual).
+
+    Inicializa tenants con historial previo a los KPIs incrementales; sobrescribe
+    los registros de las horas que encuentra.
+    """
+    try:
+        tenant_id = event.get("tenant_id", "default")
+
+        # Cargar datos por tenant (solo los atributos que usan los KPIs).
+        # Las tres tablas se leen a la vez, cada una con un Query sobre la partición del tenant.
+        capacity = ConsumedCapacity()
+        tenant_key = Key("tenant_id").eq(tenant_id)
+
+        def cargar_ordenes():
+            return {
+                o["id_order"]: o
+                for o in iter_query(orders_table, capacity, projection=["id_order", "created_at"], KeyConditionExpression=tenant_key)
+            }
+
+        def cargar_cocina():
+            return {
+                k["order_id"]: k
+                for k in iter_query(
+                    kitchen_table,
+                    capacity,
+                    projection=["order_id", "accepted_at", "packed_at", "end_time", "accepted_by", "packed_by"],
+                    KeyConditionExpression=tenant_key,
+                )
+            }
+
+        def cargar_entregas():
+            delivery_by_order = {}
+            delivery_items = iter_query(
+                delivery_table,
+                capacity,
+                projection=["id_order", "tiempo_salida", "tiempo_llegada", "delivered_by"],
+                KeyConditionExpression=tenant_key,
+            )
+            for it in delivery_items:
+                oid = it.get("id_order")
+                if not oid:
+                    continue
+                delivery_by_order[oid] = it
+            return delivery_by_order
+
+        data = run_parallel({"orders": cargar_ordenes, "kitchen": cargar_cocina, "delivery": cargar_entregas})
+        orders = data["orders"]
+        kitchen = data["kitchen"]
+        delivery_by_order = data["delivery"]
+
+        sketches = {}
+        responsables = {}
+
+        for oid, o in orders.items():
+            k = kitchen.get(oid, {})
+            d = delivery_by_order.get(oid, {})
+            pac = k.get("packed_at") or k.get("end_time")
+            for obs in (
+                kpis.stage_observation("recibido_a_aceptado", o.get("created_at"), k.get("accepted_at")),
+                kpis.stage_observation("aceptado_a_empacado", k.get("accepted_at"), pac),
+                kpis.stage_observation("empacado_a_salida", pac, d.get("tiempo_salida")),
+                kpis.stage_observation("salida_a_entregado", d.get("tiempo_salida"), d.get("tiempo_llegada")),
+            ):
+                if obs:
+                    stage, hour, minutes = obs
+                    sketches.setdefault((hour, stage), DDSketch()).add(minutes)
+
+            for field, staff_id, ts in (
+                ("accepted_by", k.get("accepted_by"), k.get("accepted_at")),
+                ("packed_by", k.get("packed_by"), pac),
+                ("delivered_by", d.get("delivered_by"), d.get("tiempo_llegada")),
+            ):
+                dt = kpis.parse_iso(ts)
+                if staff_id and dt:
+                    c = responsables.setdefault(kpis.hour_key(dt), {})
+                    c[f"{field}:{staff_id}"] = c.get(f"{field}:{staff_id}", 0) + 1
+
+        def record(hour, stage, attrs):
+            item = {
+                "tenant_id": tenant_id,
+                "id_metric": kpis.record_id(hour, stage),
+                "record_type": kpis.RECORD_TYPE,
+                "stage": stage,
+                "hour": hour,
+            }
+            for name, value in attrs.items():
+                item[name] = kpis.to_number(value)
+            return item
+
+        with analytics_table.batch_writer() as batch:
+            for (hour, stage), sk in sketches.items():
+                batch.put_item(Item=record(hour, stage, sk.to_attributes()))
+            for hour, counters in responsables.items():
+                batch.put_item(Item=record(hour, kpis.RESPONSABLES, counters))
+
+        log_info("KPIs de workflow recalculados", event, context, {"tenant_id": tenant_id, "records": len(sketches) + len(responsables), "consumed_capacity": capacity.as_dict()})
+        return {"statusCode": 200, "body": json.dumps({"message": "KPIs recalculados", "tenant_id": tenant_id, "records": len(sketches) + len(responsables)})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -0,0 +1,62 @@
+import json, os
+from botocore.exceptions import ClientError
+from common import aws, kitchen_queue, kpis, prep_model
+
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def handler(event, context):
+    """Entrena el modelo de preparación del tenant con el ticket recién empacado (Order.Prepared).
+
+    La marca prep_observed en el ticket evita contar dos veces un evento repetido.
+    Si el modelo sigue en conflicto tras los reintentos (ModelConflict) la
+    excepción se propaga para que EventBridge reintente el evento.
+    """
+    try:
+        detail = event.get("detail", {}) or {}
+        order_id = detail["order_id"]
+        tenant_id = detail["tenant_id"]
+        key = {"tenant_id": tenant_id, "order_id": order_id}
+
+        kitchen = kitchen_table.get_item(Key=key, ConsistentRead=True).get("Item")
+        if not kitchen:
+            return {"statusCode": 404, "body": json.dumps({"error": "Pedido no encontrado en cocina"})}
+        if kitchen.get("prep_observed"):
+            return {"statusCode": 200, "body": json.dumps({"message": "Ticket ya observado", "order_id": order_id})}
+        start, end = kpis.parse_iso(kitchen.get("start_time")), kpis.parse_iso(kitchen.get("end_time"))
+        if not start or not end:
+            return {"statusCode": 400, "body": json.dumps({"error": "Pedido sin tiempos definidos"})}
+        minutes = (end - start).total_seconds() / 60.0
+
+        order = orders_table.get_item(
+            Key={"tenant_id": tenant_id, "id_order": order_id},
+            ProjectionExpression="#i, list_id_products",
+            ExpressionAttributeNames={"#i": "items"},
+        ).get("Item") or {}
+        lines = kitchen_queue.order_lines(order)
+
+        # la marca va en la misma transacción que el modelo: si no entrena, no queda marcado
+        mark = {
+            "Update": {
+                "TableName": kitchen_table.name,
+                "Key": key,
+                "UpdateExpression": "SET prep_observed = :t",
+                "ConditionExpression": "attribute_exists(order_id) AND attribute_not_exists(prep_observed)",
+                "ExpressionAttributeValues": {":t": True},
+            }
+        }
+        try:
+            model = prep_model.update_with(tenant_id, lines, minutes, mark)
+        except prep_model.AlreadyObserved:
+            return {"statusCode": 200, "body": json.dumps({"message": "Ticket ya observado", "order_id": order_id})}
+        return {"statusCode": 200, "body": json.dumps({
+            "order_id": order_id,
+            "minutes": round(minutes, 2),
+            "trained": model is not None,
+            "observations": model["n"] if model else None,
+        })}
+    except KeyError as e:
+        return {"statusCode": 400, "body": json.dumps({"error": f"Campo faltante en evento: {e}"})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
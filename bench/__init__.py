@@ -0,0 +1,10 @@
+"""Benchmarks de los handlers (no se despliegan: functions.yml empaqueta solo cada handler + common/).
+
+- bench.cold_start: tiempo de import de cada handler en un intérprete nuevo.
+- bench.run: carga los handlers contra DynamoDB/S3/EventBridge simulados con
+  moto, siembra datos multi-tenant (1k / 100k / 1M pedidos) y reproduce
+  eventos de API Gateway / EventBridge midiendo latencia, items leídos y
+  capacidad consumida por handler.
+
+Dependencias extra: `pip install -r bench/requirements.txt`.
+"""
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Mide el tiempo de import (fase INIT de Lambda) de cada handler de functions.yml.
+
+Cada módulo se importa en un intérprete nuevo, varias veces, y se reporta la
+mediana en ms. Así se puede seguir el costo del cold start handler por handler.
+
+    python -m bench.cold_start                 # todos los handlers
+    python -m bench.cold_start health orders   # solo los que contienen el texto
+    python -m bench.cold_start --budget 150    # exit 1 si alguno supera 150 ms
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Se ejecuta en el subproceso: importa el archivo del handler y devuelve ms y módulos cargados
+PROBE = r"""
+import importlib.util, sys, time
+sys.path.insert(0, {root!r})
+before = set(sys.modules)
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler_module", {path!r})
+mod = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mod)
+elapsed = (time.perf_counter() - t0) * 1000
+heavy = sorted(m for m in ("boto3", "botocore.session", "bcrypt") if m in sys.modules and m not in before)
+print(elapsed, ",".join(heavy))
+"""
+
+
+def load_handlers():
+    """[(nombre_función, archivo)] según functions.yml (sin repetir archivos)."""
+    handlers, seen, name = [], set(), None
+    for line in (ROOT / "functions.yml").read_text(encoding="utf-8").splitlines():
+        m = re.match(r"^([A-Za-z0-9_]+):\s*$", line)
+        if m:
+            name = m.group(1)
+            continue
+        m = re.match(r"^\s+handler:\s*(\S+)", line)
+        if m and name:
+            path = m.group(1).rsplit(".", 1)[0] + ".py"
+            if path not in seen:
+                seen.add(path)
+                handlers.append((name, path))
+    return handlers
+
+
+def lambda_env():
+    """Variables de provider.environment de serverless.yml más región/credenciales ficticias."""
+    env = dict(os.environ)
+    in_env = False
+    for line in (ROOT / "serverless.yml").read_text(encoding="utf-8").splitlines():
+        if re.match(r"^  environment:\s*$", line):
+            in_env = True
+            continue
+        if in_env:
+            m = re.match(r"^    ([A-Z0-9_]+):\s*(.+)$", line)
+            if not m:
+                break
+            env.setdefault(m.group(1), m.group(2).strip())
+    env.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+    env.setdefault("AWS_ACCESS_KEY_ID", "bench")
+    env.setdefault("AWS_SECRET_ACCESS_KEY", "bench")
+    return env
+
+
+def measure(path, env, runs):
+    code = PROBE.format(root=str(ROOT), path=str(ROOT / path))
+    samples, heavy = [], ""
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            err = (proc.stderr.strip().splitlines() or ["?"])[-1]
+            return None, err
+        ms, _, heavy = proc.stdout.strip().partition(" ")
+        samples.append(float(ms))
+    return statistics.median(samples), heavy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filters", nargs="*", help="texto a buscar en el nombre o archivo del handler")
+    parser.add_argument("--runs", type=int, default=5, help="imports por handler (se reporta la mediana)")
+    parser.add_argument("--budget", type=float, help="ms máximos por handler; exit 1 si alguno lo supera")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    env = lambda_env()
+    handlers = [
+        (name, path) for name, path in load_handlers()
+        if not args.filters or any(f in name or f in path for f in args.filters)
+    ]
+
+    results = []
+    for name, path in handlers:
+        ms, info = measure(path, env, args.runs)
+        results.append({"function": name, "file": path, "import_ms": ms, "info": info})
+    results.sort(key=lambda r: -1 if r["import_ms"] is None else r["import_ms"], reverse=True)
+
+    over = [r for r in results if r["import_ms"] is None or (args.budget and r["import_ms"] > args.budget)]
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "budget_ms": args.budget, "results": results}, indent=2))
+    else:
+        print(f"{'handler':45} {'import ms':>10}  módulos pesados")
+        for r in results:
+            ms = "ERROR" if r["import_ms"] is None else f"{r['import_ms']:.1f}"
+            flag = " *" if r in over else ""
+            print(f"{r['file']:45} {ms:>10}  {r['info']}{flag}")
+        ok = [r["import_ms"] for r in results if r["import_ms"] is not None]
+        if ok:
+            print(f"\n{len(ok)} handlers, mediana {statistics.median(ok):.1f} ms, máximo {max(ok):.1f} ms")
+        if over:
+            print(f"{len(over)} handler(s) con error o sobre el presupuesto (*)")
+
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
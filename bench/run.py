@@ -0,0 +1,192 @@
+"""Latencia por handler contra AWS simulado (moto) con datos multi-tenant.
+
+    python -m bench.run                          # 1k pedidos, todos los escenarios
+    python -m bench.run --scale 100k dashboard   # solo escenarios que contienen "dashboard"
+    python -m bench.run --scale 1m --iterations 5 --json > bench_output.txt
+
+Por handler reporta: import en frío (intérprete nuevo), primera invocación,
+p50/p95/p99 de las siguientes, items devueltos / examinados por DynamoDB,
+capacidad consumida (según moto) y llamadas a AWS por invocación. Las
+latencias contra moto no son las de producción, pero los items examinados y
+las llamadas sí dependen solo del código: ahí se ven los scans que crecen con
+la tabla.
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+import warnings
+
+from bench import cold_start, seed, stack
+from bench.scenarios import SCENARIOS
+
+
+class AwsMeter:
+    """Cuenta llamadas a AWS e items/capacidad de DynamoDB mediante hooks de botocore."""
+
+    def __init__(self):
+        from common.dynamo import ConsumedCapacity
+
+        self._new = ConsumedCapacity
+        self.capacity = ConsumedCapacity()
+        self.calls = {}
+
+    def install(self):
+        from common import aws
+
+        # los clientes creados después (ej. el recurso de cada hilo) copian los hooks de la sesión
+        emitters = [aws._get_session().events]
+        emitters += [c.meta.events for c in [aws.resource("dynamodb").meta.client] + [aws.client(s) for s in ("dynamodb", "s3", "events")]]
+        for events in emitters:
+            events.register("before-parameter-build.dynamodb", self._ask_capacity, unique_id="bench-capacity")
+            events.register("after-call", self._after_call, unique_id="bench-calls")
+
+    def reset(self):
+        self.capacity = self._new()
+        self.calls = {}
+
+    def _ask_capacity(self, params, model, **kwargs):
+        if "ReturnConsumedCapacity" in model.input_shape.members:
+            params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+    def _after_call(self, parsed, model, **kwargs):
+        service = model.service_model.service_name
+        key = f"{service}:{model.name}"
+        self.calls[key] = self.calls.get(key, 0) + 1
+        if service == "dynamodb":
+            self.capacity.add(parsed)
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    idx = max(0, min(len(ordered) - 1, int(round(p / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+
+def run_scenario(sc, ds, meter, iterations, rng):
+    try:
+        fn = getattr(stack.load_handler(sc.handler), sc.function)
+    except Exception as e:
+        return {"scenario": sc.name, "handler": sc.handler, "kind": sc.kind, "statuses": {"import": 1},
+                "errors": [f"import: {type(e).__name__}: {e}"]}
+    latencies, statuses, errors = [], {}, []
+    per_call = {"count": 0, "scanned_count": 0, "capacity_units": 0.0, "aws_calls": 0}
+    first_ms = None
+
+    for i in range(iterations + 1):
+        event = sc.build(ds, rng)
+        meter.reset()
+        t0 = time.perf_counter()
+        try:
+            resp = fn(event, None)
+            status = resp.get("statusCode", 200) if isinstance(resp, dict) else 200
+        except Exception as e:
+            status = "exc"
+            errors.append(f"{type(e).__name__}: {e}")
+        elapsed = (time.perf_counter() - t0) * 1000
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+        if i == 0:
+            first_ms = elapsed
+            continue
+        latencies.append(elapsed)
+        c = meter.capacity
+        per_call["count"] += c.count
+        per_call["scanned_count"] += c.scanned_count
+        per_call["capacity_units"] += c.capacity_units
+        per_call["aws_calls"] += sum(meter.calls.values())
+
+    n = max(1, len(latencies))
+    return {
+        "scenario": sc.name,
+        "handler": sc.handler,
+        "kind": sc.kind,
+        "first_ms": round(first_ms, 1),
+        "p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "items_returned": round(per_call["count"] / n, 1),
+        "items_scanned": round(per_call["scanned_count"] / n, 1),
+        "capacity_units": round(per_call["capacity_units"] / n, 2),
+        "aws_calls": round(per_call["aws_calls"] / n, 1),
+        "statuses": statuses,
+        "errors": sorted(set(errors))[:3],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("filters", nargs="*", help="texto a buscar en el nombre o archivo del escenario")
+    parser.add_argument("--scale", default="1k", help="pedidos a sembrar: 1k, 100k, 1m o un número")
+    parser.add_argument("--tenants", type=int, default=5)
+    parser.add_argument("--days", type=int, default=30, help="días de historial")
+    parser.add_argument("--iterations", type=int, default=20, help="invocaciones medidas por escenario (más una de calentamiento)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-import-time", action="store_true", help="no medir el import en intérprete nuevo")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    scenarios = [
+        sc for sc in SCENARIOS
+        if not args.filters or any(f in sc.name or f in sc.handler for f in args.filters)
+    ]
+    if not scenarios:
+        parser.error("ningún escenario coincide con los filtros")
+
+    stack.start()
+    # common.logger sube el root logger a INFO; en el benchmark solo interesan los errores
+    logging.disable(logging.WARNING)
+    warnings.filterwarnings("ignore", module="moto")
+    # antes de sembrar: los hilos de run_parallel que crea la siembra conservan sus clientes
+    meter = AwsMeter()
+    meter.install()
+
+    orders = seed.parse_scale(args.scale)
+    t0 = time.perf_counter()
+    ds = seed.seed(orders, tenants=args.tenants, days=args.days, seed_value=args.seed)
+    seed.build_aggregates(ds, stack.load_handler)
+    seed_s = time.perf_counter() - t0
+    if not args.json:
+        print(f"sembrados {ds.total_orders} pedidos en {len(ds.tenants)} tenants "
+              f"({len(ds.orders[ds.main_tenant])} en {ds.main_tenant}) en {seed_s:.1f} s\n", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    env = cold_start.lambda_env()
+
+    results = []
+    for sc in scenarios:
+        result = run_scenario(sc, ds, meter, args.iterations, rng)
+        if not args.no_import_time:
+            ms, _ = cold_start.measure(sc.handler, env, runs=3)
+            result["import_ms"] = round(ms, 1) if ms is not None else None
+        results.append(result)
+
+    stack.stop()
+
+    if args.json:
+        print(json.dumps({
+            "scale": ds.total_orders,
+            "tenants": len(ds.tenants),
+            "main_tenant_orders": len(ds.orders[ds.main_tenant]),
+            "iterations": args.iterations,
+            "results": results,
+        }, indent=2))
+        return 0
+
+    cols = ("import_ms", "first_ms", "p50_ms", "p95_ms", "p99_ms", "items_returned", "items_scanned", "capacity_units", "aws_calls")
+    heads = ("import", "1ra", "p50", "p95", "p99", "items", "examinados", "RCU/WCU", "llamadas")
+    print(f"{'escenario':26}" + "".join(f"{h:>11}" for h in heads) + "  status")
+    for r in results:
+        vals = "".join(f"{'-' if r.get(c) is None else r[c]:>11}" for c in cols)
+        status = ",".join(f"{k}x{v}" for k, v in sorted(r["statuses"].items()))
+        print(f"{r['scenario']:26}{vals}  {status}")
+        for err in r["errors"]:
+            print(f"{'':26}  ! {err[:110]}")
+    print("\nlatencias en ms; items, capacidad y llamadas son promedios por invocación")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
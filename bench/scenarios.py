@@ -0,0 +1,134 @@
+"""Eventos sintéticos por handler (API Gateway o EventBridge/invocación directa).
+
+Cada escenario arma su evento a partir del Dataset sembrado, eligiendo ids
+reales del tenant más grande para que las lecturas encuentren datos.
+"""
+import json
+from dataclasses import dataclass
+from typing import Callable
+
+
+@dataclass
+class Scenario:
+    name: str
+    handler: str              # archivo del handler, relativo a la raíz del repo
+    build: Callable           # (dataset, rng) -> evento
+    kind: str = "api"         # api | event (EventBridge, Step Functions, invocación manual)
+    function: str = "handler"
+
+
+def api_event(tenant, method="GET", path=None, qs=None, body=None, user_type="staff", user_id="bench-admin"):
+    headers = {
+        "Origin": "https://bench.papasqueens.test",
+        "X-Tenant-Id": tenant,
+        "X-User-Type": user_type,
+        "X-User-Id": user_id,
+        "X-User-Email": f"{user_id}@papasqueens.test",
+    }
+    return {
+        "httpMethod": method,
+        "headers": headers,
+        "pathParameters": path,
+        "queryStringParameters": qs,
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {"stage": "bench"},
+    }
+
+
+def _order_event(ds, rng):
+    t = ds.main_tenant
+    return api_event(t, path={"id_order": rng.choice(ds.orders[t])})
+
+
+def _order_status_unchanged(ds, rng):
+    # el cliente ya tiene la versión sembrada (1): respuesta 304 sin leer Orders
+    event = _order_event(ds, rng)
+    event["headers"]["If-None-Match"] = '"1"'
+    return event
+
+
+def _delivery_event(ds, rng):
+    t = ds.main_tenant
+    return api_event(t, path={"id_delivery": rng.choice(ds.deliveries[t])})
+
+
+def _customer_orders(ds, rng):
+    t = ds.main_tenant
+    c = rng.choice(ds.customers[t])
+    return api_event(t, path={"id_customer": c}, user_type="customer", user_id=c)
+
+
+def _create_order(ds, rng):
+    t = ds.main_tenant
+    c = rng.choice(ds.customers[t])
+    products = rng.sample(ds.products[t], 2)
+    body = {
+        "tenant_id": t,
+        "id_customer": c,
+        "list_id_products": products,
+        "items": [{"id_producto": p, "precio": 12.9, "qty": 1} for p in products],
+        "delivery_address": "Av. Benchmark 123",
+        "customer_name": "Cliente Bench",
+    }
+    return api_event(t, method="POST", body=body, user_type="customer", user_id=c)
+
+
+def _create_orders_batch(ds, rng):
+    t = ds.main_tenant
+    orders = []
+    for _ in range(25):
+        p = rng.choice(ds.products[t])
+        orders.append({
+            "id_customer": rng.choice(ds.customers[t]),
+            "list_id_products": [p],
+            "items": [{"id_producto": p, "precio": 8.5, "qty": 2}],
+            "delivery_address": "Av. Benchmark 456",
+        })
+    return api_event(t, method="POST", body={"tenant_id": t, "orders": orders})
+
+
+SCENARIOS = [
+    Scenario("health", "health/health.py", lambda ds, rng: api_event(ds.main_tenant)),
+
+    # orders
+    Scenario("create_order", "orders-svc/create_order.py", _create_order),
+    Scenario("create_orders_batch", "orders-svc/create_orders_batch.py", _create_orders_batch),
+    Scenario("get_order", "orders-svc/get_order.py", _order_event),
+    Scenario("get_order_status", "orders-svc/get_order_status.py", _order_event),
+    Scenario("get_order_status_304", "orders-svc/get_order_status.py", _order_status_unchanged),
+    Scenario("get_customer_orders", "orders-svc/get_customer_orders.py", _customer_orders),
+    Scenario("list_products", "orders-svc/list_products.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("get_products_by_category", "orders-svc/get_products_by_category.py",
+             lambda ds, rng: api_event(ds.main_tenant, path={"categoria": "papas"})),
+    Scenario("get_products_by_category_customer", "orders-svc/get_products_by_category.py",
+             lambda ds, rng: api_event(ds.main_tenant, path={"categoria": "papas"}, user_type="customer", user_id="bench-customer")),
+
+    # kitchen
+    Scenario("get_kitchen_queue", "kitchen-svc/get_kitchen_queue.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("list_menu_items", "kitchen-svc/list_menu_items.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("list_staff", "kitchen-svc/list_staff.py", lambda ds, rng: api_event(ds.main_tenant)),
+    # la primera corrida procesa el historial del tenant; las siguientes, solo lo nuevo (nada)
+    Scenario("sync_kitchen_metrics", "kitchen-svc/sync_kitchen_metrics.py",
+             lambda ds, rng: {"detail": {"tenant_id": ds.main_tenant}}, kind="event"),
+
+    # delivery
+    Scenario("list_riders", "delivery-svc/list_riders.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("list_deliveries", "delivery-svc/list_deliveries.py",
+             lambda ds, rng: api_event(ds.main_tenant, qs={"status": "en_camino"})),
+    Scenario("get_delivery_status", "delivery-svc/get_delivery_status.py", _delivery_event),
+    Scenario("track_rider", "delivery-svc/track_rider.py", _delivery_event),
+    Scenario("delivery_metrics", "delivery-svc/delivery_metrics.py",
+             lambda ds, rng: {"detail": {"tenant_id": ds.main_tenant}}, kind="event"),
+
+    # analytics
+    Scenario("get_dashboard", "analytics-svc/get_dashboard.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("get_workflow_kpis", "analytics-svc/get_workflow_kpis.py",
+             lambda ds, rng: api_event(ds.main_tenant, qs={"hours": "168"})),
+    Scenario("get_analytics_orders", "analytics-svc/get_analytics_orders.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("get_analytics_delivery", "analytics-svc/get_analytics_delivery.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("get_analytics_employees", "analytics-svc/get_analytics_employees.py", lambda ds, rng: api_event(ds.main_tenant)),
+    Scenario("collect_order_metrics", "analytics-svc/collect_order_metrics.py",
+             lambda ds, rng: {"detail": {"id_order": rng.choice(ds.orders[ds.main_tenant]), "tenant_id": ds.main_tenant}}, kind="event"),
+    Scenario("export_analytics_report", "analytics-svc/export_analytics_report.py",
+             lambda ds, rng: {"tenant_id": ds.main_tenant}, kind="event"),
+]
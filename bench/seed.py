@@ -0,0 +1,256 @@
+"""Datos sintéticos multi-tenant con la forma que escriben los handlers.
+
+Los pedidos se reparten entre tenants con una distribución tipo Zipf (el primer
+tenant es el más grande, como pasa con una cadena frente a locales chicos) y
+con fechas de los últimos `days` días. Cada pedido deja sus registros en
+Orders, Kitchen, Delivery, OrderTimeline y Analytics según la etapa en la que quedó.
+"""
+import datetime
+import random
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+
+# etapa final de los pedidos históricos (la mayoría ya entregados)
+STATUS_WEIGHTS = {
+    "entregado": 0.86,
+    "cancelado": 0.02,
+    "recibido": 0.03,
+    "en_preparacion": 0.03,
+    "listo_para_entrega": 0.02,
+    "asignado": 0.02,
+    "en_camino": 0.02,
+}
+FLOW = ("recibido", "en_preparacion", "listo_para_entrega", "asignado", "en_camino", "entregado")
+CATEGORIES = ("papas", "hamburguesas", "bebidas", "postres", "combos")
+STAFF_ROLES = (("cocinero", 10), ("repartidor", 8), ("admin", 2))
+
+
+def parse_scale(value: str) -> int:
+    """'1k' / '100k' / '1m' o un número de pedidos."""
+    return SCALES.get(value.lower()) or int(value.replace("_", ""))
+
+
+class Dataset:
+    """Ids sembrados, para que los escenarios armen eventos que apuntan a datos reales."""
+
+    def __init__(self):
+        self.tenants = []
+        self.orders = {}        # tenant -> [id_order]
+        self.customers = {}     # tenant -> [id_customer]
+        self.deliveries = {}    # tenant -> [id_delivery]
+        self.staff = {}         # tenant -> {role: [id_staff]}
+        self.products = {}      # tenant -> [id_producto]
+        self.total_orders = 0
+
+    @property
+    def main_tenant(self):
+        return self.tenants[0]
+
+
+def _tenant_sizes(orders: int, tenants: int) -> list:
+    weights = [1 / (i + 1) for i in range(tenants)]
+    total = sum(weights)
+    sizes = [max(1, int(orders * w / total)) for w in weights]
+    sizes[0] += orders - sum(sizes)
+    return sizes
+
+
+def _iso(dt):
+    return dt.isoformat()
+
+
+def _write(table, items):
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def _reference_data(tenant, rng, ds, now):
+    menu, staff = [], []
+    ds.products[tenant] = []
+    for i in range(40):
+        pid = f"{tenant}-p{i:03d}"
+        ds.products[tenant].append(pid)
+        categoria = CATEGORIES[i % len(CATEGORIES)]
+        menu.append({
+            "tenant_id": tenant,
+            "id_producto": pid,
+            "nombre": f"Producto {i}",
+            "categoria": categoria,
+            # clave de TenantCategoryIndex (todos los sembrados están disponibles)
+            "tenant_categoria": f"{tenant}#{categoria}",
+            "precio": Decimal(str(rng.choice((8.5, 12.9, 15.0, 4.5, 21.9)))),
+            "available": True,
+            "created_at": _iso(now),
+            "updated_at": _iso(now),
+        })
+    ds.staff[tenant] = {}
+    for role, n in STAFF_ROLES:
+        for i in range(n):
+            sid = f"{tenant}-{role}-{i:02d}"
+            status = "activo" if i % 4 else "inactivo"
+            ds.staff[tenant].setdefault(role, []).append(sid)
+            staff.append({
+                "tenant_id": tenant,
+                "id_staff": sid,
+                "name": f"{role.title()} {i}",
+                "role": role,
+                "email": f"{sid}@papasqueens.test",
+                "status": status,
+                "role_status": f"{role}#{status}",
+                "updated_at": _iso(now),
+            })
+    return menu, staff
+
+
+def _order_records(tenant, n, rng, ds, now, days):
+    """Registros de un pedido en cada tabla según hasta dónde avanzó."""
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    customers = ds.customers[tenant]
+    products = ds.products[tenant]
+    cooks = ds.staff[tenant]["cocinero"]
+    riders = ds.staff[tenant]["repartidor"]
+
+    created = now - datetime.timedelta(seconds=rng.uniform(0, days * 86400))
+    status = rng.choices(statuses, weights)[0]
+    reached = FLOW.index(status) if status in FLOW else 1
+    oid = f"{tenant}-o{n:07d}"
+    customer = rng.choice(customers)
+    chosen = rng.sample(products, rng.randint(1, 4))
+    items = [{"id_producto": p, "precio": Decimal(str(rng.choice((8.5, 12.9, 15.0)))), "qty": rng.randint(1, 3)} for p in chosen]
+
+    accepted = created + datetime.timedelta(minutes=rng.uniform(0.5, 6))
+    packed = accepted + datetime.timedelta(minutes=rng.uniform(6, 25))
+    left = packed + datetime.timedelta(minutes=rng.uniform(1, 10))
+    arrived = left + datetime.timedelta(minutes=rng.uniform(10, 45))
+    last = (created, accepted, packed, packed, left, arrived)[reached]
+    cook, rider = rng.choice(cooks), rng.choice(riders)
+
+    order = {
+        "tenant_id": tenant,
+        "id_order": oid,
+        "id_customer": customer,
+        "tenant_customer": f"{tenant}#{customer}",
+        "list_id_products": chosen,
+        "items": items,
+        "status": status,
+        "customer_name": f"Cliente {customer[-4:]}",
+        "delivery_address": f"Av. Siempre Viva {rng.randint(1, 9999)}",
+        "created_at": _iso(created),
+        "updated_at": _iso(last),
+        "staff_confirmed_delivered": status == "entregado",
+        "customer_confirmed_delivered": status == "entregado",
+    }
+    kitchen = {
+        "tenant_id": tenant,
+        "order_id": oid,
+        "status": "listo_para_entrega" if reached >= 2 else status,
+        "list_id_staff": [cook] if reached >= 1 else [],
+        "customer_name": order["customer_name"],
+        "delivery_address": order["delivery_address"],
+        "order_created_at": order["created_at"],
+        "updated_at": _iso(last),
+    }
+    if reached >= 1:
+        kitchen.update({"start_time": _iso(accepted), "accepted_at": _iso(accepted), "accepted_by": cook})
+    if reached >= 2:
+        kitchen.update({"end_time": _iso(packed), "packed_at": _iso(packed), "packed_by": cook})
+
+    delivery = None
+    if reached >= 2:
+        delivery = {
+            "tenant_id": tenant,
+            "id_delivery": f"{oid}-d",
+            "id_order": oid,
+            "direccion": order["delivery_address"],
+            "customer_name": order["customer_name"],
+            "status": FLOW[reached],
+            "created_at": _iso(packed),
+            "updated_at": _iso(last),
+        }
+        if reached >= 3:
+            delivery["id_staff"] = rider
+        if reached >= 4:
+            delivery["tiempo_salida"] = _iso(left)
+        if reached >= 5:
+            delivery.update({"tiempo_llegada": _iso(arrived), "delivered_by": rider})
+
+    metric = {
+        "tenant_id": tenant,
+        "id_metric": f"{oid}-m",
+        "id_order": oid,
+        "status": status,
+        "inicio": order["created_at"],
+    }
+    if reached >= 5:
+        metric.update({
+            "id_staff": rider,
+            "fin": _iso(arrived),
+            "tiempo_total": Decimal(str(round((arrived - created).total_seconds() / 60, 2))),
+        })
+    return order, kitchen, delivery, metric
+
+
+def seed(orders: int, tenants: int = 5, days: int = 30, seed_value: int = 7, workers: int = 8) -> Dataset:
+    """Siembra `orders` pedidos repartidos en `tenants` tenants. Requiere bench.stack.start()."""
+    from common import aws, kitchen_queue, timeline
+
+    rng = random.Random(seed_value)
+    now = datetime.datetime.utcnow()
+    ds = Dataset()
+    tables = {name: aws.table(env) for name, env in (
+        ("orders", "ORDERS_TABLE"), ("kitchen", "KITCHEN_TABLE"), ("delivery", "DELIVERY_TABLE"),
+        ("analytics", "ANALYTICS_TABLE"), ("staff", "STAFF_TABLE"), ("menu", "MENU_TABLE"),
+        ("timeline", "ORDER_TIMELINE_TABLE"),
+    )}
+    batches = {name: [] for name in tables}
+
+    for t, size in enumerate(_tenant_sizes(orders, tenants)):
+        tenant = f"tenant-{t + 1:02d}"
+        ds.tenants.append(tenant)
+        ds.customers[tenant] = [f"{tenant}-c{i:05d}" for i in range(max(20, size // 15))]
+        menu, staff = _reference_data(tenant, rng, ds, now)
+        batches["menu"] += menu
+        batches["staff"] += staff
+        ds.orders[tenant], ds.deliveries[tenant] = [], []
+        for n in range(size):
+            order, kitchen, delivery, metric = _order_records(tenant, n, rng, ds, now, days)
+            if kitchen["status"] in kitchen_queue.QUEUED:
+                # tickets en cola con el plan que les calcula receive_order (tiempos por categoría)
+                plan = kitchen_queue.build_plan(kitchen_queue.order_lines(order), {}, order["created_at"])
+                kitchen.update(kitchen_queue.ticket_fields(tenant, order["id_order"], plan))
+            ds.orders[tenant].append(order["id_order"])
+            batches["orders"].append(order)
+            batches["kitchen"].append(kitchen)
+            batches["analytics"].append(metric)
+            key = timeline.order_key(tenant, order["id_order"])
+            batches["timeline"].append({**kitchen, "order_key": key, "sk": timeline.KITCHEN})
+            batches["timeline"].append({
+                "order_key": key, "sk": timeline.STATUS, "version": 1,
+                "status": order["status"], "id_customer": order["id_customer"], "updated_at": order["updated_at"],
+            })
+            if delivery:
+                ds.deliveries[tenant].append(delivery["id_delivery"])
+                batches["delivery"].append(delivery)
+                batches["timeline"].append({**delivery, "order_key": key, "sk": timeline.DELIVERY})
+        ds.total_orders += size
+
+    # cada tabla se parte en trozos que se escriben en paralelo
+    chunk = 5_000
+    jobs = [(tables[name], items[i:i + chunk]) for name, items in batches.items() for i in range(0, len(items), chunk)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda job: _write(*job), jobs))
+    return ds
+
+
+def build_aggregates(ds: Dataset, load_handler):
+    """Genera AGG#, KPI# y el snapshot del menú de cada tenant con los handlers de recálculo del repo."""
+    dashboard = load_handler("analytics-svc/rebuild_dashboard_aggregates.py")
+    workflow = load_handler("analytics-svc/rebuild_workflow_kpis.py")
+    snapshot = load_handler("kitchen-svc/build_menu_snapshot.py")
+    for tenant in ds.tenants:
+        dashboard.handler({"tenant_id": tenant}, None)
+        workflow.handler({"tenant_id": tenant}, None)
+        snapshot.handler({"tenant_id": tenant}, None)
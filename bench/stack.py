@@ -0,0 +1,79 @@
+"""AWS simulado en el mismo proceso (moto) con las tablas, buckets y bus de serverless.yml.
+
+Las definiciones se leen de `resources` en serverless.yml, así el benchmark
+usa los mismos índices (GSIs) que producción.
+"""
+import importlib.util
+import os
+import sys
+
+import yaml
+
+from bench.cold_start import ROOT, lambda_env
+
+_mock = None
+_loaded = 0
+_NO_VALUE = object()
+
+
+def _resolve(value):
+    """Resuelve los Fn::If de serverless.yml como en la última etapa (`gsiStage` 3: todos los índices)."""
+    if isinstance(value, dict):
+        if "Fn::If" in value:
+            return _resolve(value["Fn::If"][1])
+        if value == {"Ref": "AWS::NoValue"}:
+            return _NO_VALUE
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [v for v in map(_resolve, value) if v is not _NO_VALUE]
+    return value
+
+
+def start():
+    """Activa moto y crea tablas, buckets y el bus de eventos. Idempotente."""
+    global _mock
+    if _mock is not None:
+        return
+    for k, v in lambda_env().items():
+        os.environ.setdefault(k, v)
+    # los clientes deben ir a moto, nunca a un endpoint configurado en el entorno
+    for k in [k for k in os.environ if k.startswith("AWS_ENDPOINT_URL")]:
+        del os.environ[k]
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+
+    from moto import mock_aws
+
+    _mock = mock_aws()
+    _mock.start()
+
+    from common import aws
+
+    config = yaml.safe_load((ROOT / "serverless.yml").read_text(encoding="utf-8"))
+    ddb, s3 = aws.client("dynamodb"), aws.client("s3")
+    for res in config["resources"]["Resources"].values():
+        props = _resolve(dict(res.get("Properties") or {}))
+        if res["Type"] == "AWS::DynamoDB::Table":
+            props.pop("TimeToLiveSpecification", None)
+            ddb.create_table(**props)
+        elif res["Type"] == "AWS::S3::Bucket":
+            s3.create_bucket(Bucket=props["BucketName"])
+    aws.client("events").create_event_bus(Name=os.environ["EVENT_BUS"])
+
+
+def stop():
+    global _mock
+    if _mock is not None:
+        _mock.stop()
+        _mock = None
+
+
+def load_handler(rel_path: str):
+    """Importa el archivo del handler (las carpetas `*-svc` no son paquetes)."""
+    global _loaded
+    _loaded += 1
+    name = "bench_handler_%d_%s" % (_loaded, rel_path.replace("/", "_").replace("-", "_")[:-3])
+    spec = importlib.util.spec_from_file_location(name, ROOT / rel_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
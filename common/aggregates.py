@@ -0,0 +1,70 @@
+"""Agregados del dashboard mantenidos de forma incremental en la tabla Analytics.
+
+Por tenant se guardan un registro total (`AGG#TOTAL`) y uno por día
+(`AGG#DAY#YYYY-MM-DD`). Los collectors los actualizan con `ADD` (atómico),
+y get_dashboard solo tiene que leer un puñado de claves.
+"""
+import datetime
+from decimal import Decimal
+
+RECORD_TYPE = "dashboard_agg"
+TOTAL_ID = "AGG#TOTAL"
+DAY_PREFIX = "AGG#DAY#"
+
+# AGG#TOTAL, el día y las horas KPI# son items calientes: eventos simultáneos del tenant chocan
+# (TransactionConflict) y se reintentan antes de fallar la invocación
+CONFLICT_RETRIES = 6
+
+# Contadores numéricos de cada registro agregado
+COUNTERS = ("pedidos_total", "entregas_completadas", "ordenes_entregadas", "total_ingresos")
+
+
+def day_id(day: datetime.date) -> str:
+    return f"{DAY_PREFIX}{day.isoformat()}"
+
+
+def order_amount(order: dict) -> Decimal:
+    """Total de la orden: el que guardó create_order o, para órdenes anteriores, la suma de sus items."""
+    total = order.get("total")
+    if total is not None:
+        return Decimal(str(total))
+    return order_total(order.get("items"))
+
+
+def order_total(items) -> Decimal:
+    """Total de una orden a partir de sus items (precio/price * qty), igual que el recibo."""
+    total = Decimal("0")
+    for it in items or []:
+        if not isinstance(it, dict):
+            continue
+        precio = it.get("precio") or it.get("price") or 0
+        qty = it.get("qty") or 1
+        try:
+            total += Decimal(str(precio)) * Decimal(str(qty))
+        except Exception:
+            continue
+    return total
+
+
+def update_entries(table_name: str, tenant_id: str, day: datetime.date, counters: dict, staff=None) -> list:
+    """Entradas `Update` de TransactWriteItems para el registro total y el del día."""
+    adds = []
+    values = {":rt": RECORD_TYPE}
+    for name, value in counters.items():
+        adds.append(f"{name} :{name}")
+        values[f":{name}"] = Decimal(str(value))
+    if staff:
+        adds.append("staff :staff")
+        values[":staff"] = set(staff)
+
+    entries = []
+    for id_metric in (TOTAL_ID, day_id(day)):
+        entries.append({
+            "Update": {
+                "TableName": table_name,
+                "Key": {"tenant_id": tenant_id, "id_metric": id_metric},
+                "UpdateExpression": "SET record_type = :rt ADD " + ", ".join(adds),
+                "ExpressionAttributeValues": values,
+            }
+        })
+    return entries
@@ -0,0 +1,127 @@
+"""Fábrica compartida de clientes y recursos de AWS.
+
+Los clientes se crean una sola vez por contenedor (perezosamente, al primer
+uso) con una configuración común: keep-alive, pool de conexiones más grande,
+reintentos adaptativos y timeouts muy por debajo del límite de 29 s de la
+Lambda. Así todos los handlers reutilizan las conexiones TLS ya abiertas.
+
+Para no pagar en el cold start lo que una invocación quizá no use, los handlers
+declaran sus tablas y clientes a nivel de módulo con lazy_table/lazy_client:
+el objeto real (y el modelo del servicio que botocore carga del disco) se
+construye recién en el primer acceso.
+
+Los recursos (resource("dynamodb"), lazy_table) son uno por hilo: el cliente
+de un recurso arma las condiciones Key/Attr con un ConditionExpressionBuilder
+con estado (reset y contadores #n/:v en cada llamada), y compartido entre
+hilos puede mezclar o perder cláusulas. Los clientes de bajo nivel no tienen
+ese estado y sí se comparten.
+
+Endpoints locales (DynamoDB Local, LocalStack, ...): AWS_ENDPOINT_URL aplica
+a todos los servicios y AWS_ENDPOINT_URL_<SERVICIO> (ej. AWS_ENDPOINT_URL_DYNAMODB)
+a uno solo.
+"""
+import os
+import threading
+
+from botocore.config import Config
+
+CONFIG = Config(
+    connect_timeout=float(os.environ.get("AWS_CONNECT_TIMEOUT", "2")),
+    read_timeout=float(os.environ.get("AWS_READ_TIMEOUT", "10")),
+    retries={"max_attempts": int(os.environ.get("AWS_MAX_ATTEMPTS", "5")), "mode": "adaptive"},
+    max_pool_connections=int(os.environ.get("AWS_MAX_POOL_CONNECTIONS", "32")),
+    tcp_keepalive=True,
+)
+
+_lock = threading.RLock()
+_session = None
+_clients = {}
+# recursos por hilo (ver docstring del módulo)
+_local = threading.local()
+
+
+def endpoint_url(service: str):
+    """Endpoint configurado para el servicio, o None para usar el de AWS."""
+    specific = os.environ.get("AWS_ENDPOINT_URL_" + service.upper().replace("-", "_"))
+    return specific or os.environ.get("AWS_ENDPOINT_URL") or None
+
+
+def _get_session():
+    # boto3.Session no es thread-safe al crear clientes: siempre bajo _lock
+    global _session
+    if _session is None:
+        import boto3.session
+        _session = boto3.session.Session()
+    return _session
+
+
+def client(service: str):
+    """Cliente de bajo nivel compartido (thread-safe una vez creado)."""
+    c = _clients.get(service)
+    if c is None:
+        with _lock:
+            c = _clients.get(service)
+            if c is None:
+                c = _get_session().client(service, config=CONFIG, endpoint_url=endpoint_url(service))
+                _clients[service] = c
+    return c
+
+
+def resource(service: str):
+    """Recurso de alto nivel del hilo actual (ej. resource("dynamodb").Table(...))."""
+    resources = getattr(_local, "resources", None)
+    if resources is None:
+        resources = _local.resources = {}
+    r = resources.get(service)
+    if r is None:
+        with _lock:
+            r = _get_session().resource(service, config=CONFIG, endpoint_url=endpoint_url(service))
+        resources[service] = r
+    return r
+
+
+def table(env_name: str):
+    """Tabla de DynamoDB cuyo nombre está en la variable de entorno `env_name`."""
+    return resource("dynamodb").Table(os.environ[env_name])
+
+
+class Lazy:
+    """Proxy que construye el objeto con `factory()` en el primer acceso a un atributo.
+
+    Con `per_thread` cada hilo construye (y reutiliza) el suyo.
+    """
+
+    __slots__ = ("_factory", "_obj", "_local")
+
+    def __init__(self, factory, per_thread: bool = False):
+        self._factory = factory
+        self._obj = None
+        self._local = threading.local() if per_thread else None
+
+    def _resolve(self):
+        if self._local is not None:
+            obj = getattr(self._local, "obj", None)
+            if obj is None:
+                obj = self._local.obj = self._factory()
+            return obj
+        if self._obj is None:
+            with _lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+
+def lazy_client(service: str) -> Lazy:
+    return Lazy(lambda: client(service))
+
+
+def lazy_resource(service: str) -> Lazy:
+    return Lazy(lambda: resource(service), per_thread=True)
+
+
+def lazy_table(table_name: str) -> Lazy:
+    """Tabla de DynamoDB que recién crea el recurso al primer uso (una por hilo)."""
+    return Lazy(lambda: resource("dynamodb").Table(table_name), per_thread=True)
@@ -0,0 +1,112 @@
+"""Caché en memoria por contenedor Lambda para datos de referencia (menú, staff, ARNs).
+
+Cada contenedor caliente guarda los resultados en un TTL+LRU acotado. Para que
+un cambio hecho desde otra Lambda se vea antes de que venza el TTL, cada
+namespace tiene un número de versión por tenant en Analytics
+(`CACHE#<namespace>`). kitchen-svc/invalidate_reference_cache lo incrementa
+al recibir Staff.Updated / Menu.Updated, y los lectores lo consultan como
+mucho cada CACHE_VERSION_TTL segundos.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from common import aws
+
+_MISSING = object()
+
+# tenant comodín para listados que no filtran por tenant (ej. list_products)
+ALL_TENANTS = "*"
+RECORD_TYPE = "cache_version"
+VERSION_TTL = float(os.environ.get("CACHE_VERSION_TTL", "10"))
+
+
+class TTLCache:
+    """Diccionario LRU con expiración por entrada; seguro entre hilos."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_load(self, key, loader):
+        """Devuelve el valor cacheado o lo carga con `loader()`. None no se cachea."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = loader()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+
+_versions = TTLCache(maxsize=1024, ttl=VERSION_TTL)
+# una por hilo: tenant_cached también se llama desde los hilos de run_parallel
+_version_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+
+
+def _version_key(namespace: str, tenant_id: str) -> dict:
+    return {"tenant_id": tenant_id, "id_metric": f"CACHE#{namespace}"}
+
+
+def current_version(namespace: str, tenant_id: str):
+    """Versión vigente del namespace para el tenant (None si no se pudo leer: solo aplica el TTL)."""
+    key = (namespace, tenant_id)
+    version = _versions.get(key, _MISSING)
+    if version is _MISSING:
+        try:
+            item = _version_table.get_item(
+                Key=_version_key(namespace, tenant_id),
+                ProjectionExpression="#v",
+                ExpressionAttributeNames={"#v": "version"},
+            ).get("Item") or {}
+            version = int(item.get("version", 0))
+        except Exception:
+            version = None
+        _versions.set(key, version)
+    return version
+
+
+def bump_version(namespace: str, tenant_id: str):
+    """Invalida las cachés del namespace/tenant en todos los contenedores."""
+    _version_table.update_item(
+        Key=_version_key(namespace, tenant_id),
+        UpdateExpression="SET record_type = :rt ADD #v :one",
+        ExpressionAttributeNames={"#v": "version"},
+        ExpressionAttributeValues={":rt": RECORD_TYPE, ":one": 1},
+    )
+    _versions.pop((namespace, tenant_id))
+
+
+def tenant_cached(cache: TTLCache, namespace: str, tenant_id: str, key, loader):
+    """get_or_load con clave (tenant, key, versión): al cambiar la versión la entrada vieja queda sin uso."""
+    version = current_version(namespace, tenant_id)
+    return cache.get_or_load((tenant_id, key, version), loader)
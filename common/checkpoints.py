@@ -0,0 +1,117 @@
+"""Marcas de avance (high-water mark) de los jobs incrementales, por tenant.
+
+Registro en Analytics (`CHECKPOINT#<job>`): `hwm` es el mayor timestamp ya
+procesado y `recent` los ids procesados en los últimos OVERLAP segundos antes
+de `hwm`. Cada corrida relee desde hwm - OVERLAP y saltea los de `recent`:
+así no se pierde un registro que se escribió un poco tarde con un timestamp
+anterior a la marca, ni se cuenta dos veces uno que ya salió.
+
+`advance` es condicional sobre `version`: si dos corridas toman la misma
+ventana, solo una publica. `advance_entry` hace lo mismo como parte de una
+transacción, para jobs que además escriben acumulados.
+"""
+import datetime
+
+from botocore.exceptions import ClientError
+
+from common import aws
+
+RECORD_TYPE = "checkpoint"
+PREFIX = "CHECKPOINT#"
+OVERLAP_SECONDS = 120
+
+
+def _table():
+    return aws.table("ANALYTICS_TABLE")
+
+
+def _key(tenant_id: str, job: str) -> dict:
+    return {"tenant_id": tenant_id, "id_metric": f"{PREFIX}{job}"}
+
+
+def load(tenant_id: str, job: str) -> dict:
+    """{hwm, recent, version} del job; vacío si nunca corrió."""
+    item = _table().get_item(Key=_key(tenant_id, job), ConsistentRead=True).get("Item") or {}
+    return {
+        "hwm": item.get("hwm"),
+        "recent": dict(item.get("recent") or {}),
+        "version": int(item.get("version", 0)),
+    }
+
+
+def window_start(checkpoint: dict) -> str | None:
+    """Desde dónde releer: hwm - OVERLAP_SECONDS (None: desde el principio)."""
+    if not checkpoint.get("hwm"):
+        return None
+    hwm = datetime.datetime.fromisoformat(checkpoint["hwm"])
+    return (hwm - datetime.timedelta(seconds=OVERLAP_SECONDS)).isoformat()
+
+
+def is_new(checkpoint: dict, record_id: str, ts: str) -> bool:
+    floor = window_start(checkpoint)
+    return record_id not in checkpoint["recent"] and (floor is None or ts >= floor)
+
+
+def _item(tenant_id: str, job: str, hwm, recent: dict, version: int) -> dict:
+    return {
+        **_key(tenant_id, job),
+        "record_type": RECORD_TYPE,
+        "hwm": hwm,
+        "recent": recent,
+        "version": version,
+        "updated_at": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+_CONDITION = "attribute_not_exists(id_metric) OR version = :v"
+
+
+def _put(tenant_id: str, job: str, hwm, recent: dict, version: int, expected: int) -> bool:
+    try:
+        _table().put_item(
+            Item=_item(tenant_id, job, hwm, recent, version),
+            ConditionExpression=_CONDITION,
+            ExpressionAttributeValues={":v": expected},
+        )
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+
+
+def _next(checkpoint: dict, processed: dict) -> dict:
+    hwm = max([ts for ts in processed.values()] + ([checkpoint["hwm"]] if checkpoint.get("hwm") else []))
+    new = {"hwm": hwm, "recent": {}, "version": checkpoint["version"] + 1}
+    floor = window_start(new)
+    new["recent"] = {rid: ts for rid, ts in {**checkpoint["recent"], **processed}.items() if ts >= floor}
+    return new
+
+
+def advance(tenant_id: str, job: str, checkpoint: dict, processed: dict) -> dict | None:
+    """Marca `processed` ({id: timestamp}) como hecho. None si otra corrida avanzó antes."""
+    new = _next(checkpoint, processed)
+    if not _put(tenant_id, job, new["hwm"], new["recent"], new["version"], checkpoint["version"]):
+        return None
+    return new
+
+
+def advance_entry(tenant_id: str, job: str, checkpoint: dict, processed: dict) -> tuple:
+    """(nueva marca, entrada `Put` de TransactWriteItems) para avanzar junto con otras escrituras.
+
+    Si otra corrida avanzó antes, la transacción se cancela por esta condición.
+    """
+    new = _next(checkpoint, processed)
+    return new, {
+        "Put": {
+            "TableName": _table().name,
+            "Item": _item(tenant_id, job, new["hwm"], new["recent"], new["version"]),
+            "ConditionExpression": _CONDITION,
+            "ExpressionAttributeValues": {":v": checkpoint["version"]},
+        }
+    }
+
+
+def restore(tenant_id: str, job: str, advanced: dict, previous: dict) -> bool:
+    """Vuelve a `previous` si nadie avanzó después de `advanced` (ej. falló la publicación)."""
+    return _put(tenant_id, job, previous.get("hwm"), previous["recent"], advanced["version"] + 1, advanced["version"])
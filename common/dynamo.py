@@ -0,0 +1,380 @@
+"""Acceso paginado a DynamoDB compartido por todos los handlers.
+
+`query`/`scan` devuelven como máximo 1 MB por llamada; estos generadores siguen
+`LastEvaluatedKey` hasta el final y entregan los items de a uno, de modo que el
+consumo de memoria no crece con el tamaño del tenant.
+"""
+import base64
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from common import aws
+
+# Segmentos por defecto para los scans paralelos (cada segmento usa un hilo y una conexión)
+SCAN_SEGMENTS = int(os.environ.get("SCAN_SEGMENTS", "3"))
+
+# Hilos de run_parallel (se reutilizan mientras el contenedor esté caliente)
+PARALLEL_WORKERS = int(os.environ.get("PARALLEL_WORKERS", "16"))
+
+_DONE = object()
+_POOL_PREFIX = "run-parallel"
+_pool = None
+_pool_lock = threading.Lock()
+_deserializer = TypeDeserializer()
+
+
+class ConsumedCapacity:
+    """Acumula capacidad consumida e items leídos a lo largo de una o varias llamadas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.capacity_units = 0.0
+        self.pages = 0
+        self.count = 0
+        self.scanned_count = 0
+        self.by_table = {}
+
+    def add(self, resp: dict):
+        consumed = resp.get("ConsumedCapacity") or []
+        # BatchGetItem / TransactWriteItems devuelven una lista, query/scan un dict
+        if not isinstance(consumed, list):
+            consumed = [consumed]
+        # puede recibir páginas desde varios hilos (iter_parallel_scan)
+        with self._lock:
+            self.pages += 1
+            self.count += int(resp.get("Count", 0) or 0)
+            self.scanned_count += int(resp.get("ScannedCount", 0) or 0)
+            for c in consumed:
+                units = float(c.get("CapacityUnits", 0) or 0)
+                self.capacity_units += units
+                name = c.get("TableName") or "?"
+                self.by_table[name] = self.by_table.get(name, 0.0) + units
+
+    def as_dict(self) -> dict:
+        return {
+            "capacity_units": round(self.capacity_units, 2),
+            "pages": self.pages,
+            "count": self.count,
+            "scanned_count": self.scanned_count,
+            "by_table": {k: round(v, 2) for k, v in self.by_table.items()},
+        }
+
+
+def projection_kwargs(attrs, names: dict | None = None) -> dict:
+    """Arma ProjectionExpression con placeholders (evita choques con palabras reservadas como `status`)."""
+    expr_names = dict(names or {})
+    parts = []
+    for i, attr in enumerate(attrs):
+        placeholder = f"#p{i}"
+        expr_names[placeholder] = attr
+        parts.append(placeholder)
+    return {"ProjectionExpression": ", ".join(parts), "ExpressionAttributeNames": expr_names}
+
+
+def iter_pages(operation, capacity: ConsumedCapacity | None = None, projection=None, **kwargs):
+    """Recorre todas las páginas de `operation` (query o scan) siguiendo LastEvaluatedKey."""
+    if projection:
+        kwargs.update(projection_kwargs(projection, kwargs.get("ExpressionAttributeNames")))
+    if capacity is not None:
+        kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+    while True:
+        resp = operation(**kwargs)
+        if capacity is not None:
+            capacity.add(resp)
+        yield resp
+        last_key = resp.get("LastEvaluatedKey")
+        if not last_key:
+            return
+        kwargs["ExclusiveStartKey"] = last_key
+
+
+def iter_query(table, capacity: ConsumedCapacity | None = None, projection=None, **kwargs):
+    """Generador de todos los items de un query, página por página."""
+    for page in iter_pages(table.query, capacity, projection, **kwargs):
+        yield from page.get("Items", [])
+
+
+def iter_scan(table, capacity: ConsumedCapacity | None = None, projection=None, **kwargs):
+    """Generador de todos los items de un scan, página por página."""
+    for page in iter_pages(table.scan, capacity, projection, **kwargs):
+        yield from page.get("Items", [])
+
+
+def _key_number(value):
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def encode_token(last_key: dict | None) -> str | None:
+    """LastEvaluatedKey -> token opaco (base64 url-safe) para el cliente."""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(",", ":"), sort_keys=True, default=_key_number)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_token(token: str) -> dict:
+    """Token de encode_token -> ExclusiveStartKey. ValueError si no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        key = json.loads(raw, parse_float=Decimal, parse_int=Decimal)
+    except Exception:
+        raise ValueError("token de paginación inválido")
+    if not isinstance(key, dict) or not key:
+        raise ValueError("token de paginación inválido")
+    return key
+
+
+def query_page(table, limit: int, token: str | None = None, capacity: ConsumedCapacity | None = None,
+               projection=None, **kwargs):
+    """Una página de un query: (items, next_token).
+
+    Con FilterExpression la página puede traer menos de `limit` items (Limit
+    cuenta los examinados); el cliente sigue mientras reciba next_token.
+    """
+    if token:
+        kwargs["ExclusiveStartKey"] = decode_token(token)
+    kwargs["Limit"] = limit
+    if projection:
+        kwargs.update(projection_kwargs(projection, kwargs.get("ExpressionAttributeNames")))
+    if capacity is not None:
+        kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+    resp = table.query(**kwargs)
+    if capacity is not None:
+        capacity.add(resp)
+    return resp.get("Items", []), encode_token(resp.get("LastEvaluatedKey"))
+
+
+def count_items(operation, capacity: ConsumedCapacity | None = None, **kwargs) -> int:
+    """Cuenta items con Select=COUNT sin transferir los atributos."""
+    kwargs["Select"] = "COUNT"
+    return sum(int(page.get("Count", 0) or 0) for page in iter_pages(operation, capacity, **kwargs))
+
+
+def batch_get_items(table, keys, projection=None, capacity: ConsumedCapacity | None = None,
+                    max_attempts: int = 6, consistent: bool = False) -> list:
+    """BatchGetItem en bloques de 100 claves, reintentando UnprocessedKeys con backoff.
+
+    Las claves duplicadas se envían una sola vez. El orden del resultado no
+    está garantizado.
+    """
+    client = table.meta.client
+    unique = []
+    seen = set()
+    for key in keys:
+        marker = tuple(sorted(key.items()))
+        if marker not in seen:
+            seen.add(marker)
+            unique.append(key)
+
+    request = {}
+    if projection:
+        request.update(projection_kwargs(projection))
+    if consistent:
+        request["ConsistentRead"] = True
+    extra = {"ReturnConsumedCapacity": "TOTAL"} if capacity is not None else {}
+
+    items = []
+    for start in range(0, len(unique), 100):
+        pending = {table.name: {**request, "Keys": unique[start:start + 100]}}
+        attempt = 0
+        while pending:
+            resp = client.batch_get_item(RequestItems=pending, **extra)
+            if capacity is not None:
+                capacity.add(resp)
+            items.extend(resp.get("Responses", {}).get(table.name, []))
+            pending = resp.get("UnprocessedKeys") or {}
+            if pending:
+                attempt += 1
+                if attempt >= max_attempts:
+                    raise RuntimeError(f"BatchGetItem sin procesar tras {attempt} intentos en {table.name}")
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+    return items
+
+
+def batch_write_items(table, items, capacity: ConsumedCapacity | None = None,
+                      max_attempts: int = 6) -> list:
+    """BatchWriteItem (puts) en bloques de 25, reintentando UnprocessedItems con backoff.
+
+    Devuelve los items que no se pudieron escribir tras `max_attempts` (lista
+    vacía si se escribieron todos), para que el llamador informe fallos parciales.
+    """
+    client = table.meta.client
+    extra = {"ReturnConsumedCapacity": "TOTAL"} if capacity is not None else {}
+    failed = []
+    for start in range(0, len(items), 25):
+        pending = {table.name: [{"PutRequest": {"Item": item}} for item in items[start:start + 25]]}
+        attempt = 0
+        while pending:
+            resp = client.batch_write_item(RequestItems=pending, **extra)
+            if capacity is not None:
+                capacity.add(resp)
+            pending = resp.get("UnprocessedItems") or {}
+            if pending:
+                attempt += 1
+                if attempt >= max_attempts:
+                    failed.extend(r["PutRequest"]["Item"] for r in pending.get(table.name, []))
+                    break
+                time.sleep(min(0.05 * (2 ** attempt), 1.0))
+    return failed
+
+
+def iter_parallel_scan(table, capacity: ConsumedCapacity | None = None, projection=None,
+                       total_segments: int | None = None, max_workers: int | None = None,
+                       buffer_pages: int = 8, **kwargs):
+    """Scan segmentado (Segment/TotalSegments) leído por un pool de hilos acotado.
+
+    Cada hilo usa el cliente de su propio recurso (aws.resource es por hilo:
+    el que arma las condiciones Key/Attr no se puede compartir) y una cola
+    acotada, de modo que los hilos no adelantan más de `buffer_pages`
+    páginas al consumidor. El orden de los items no está garantizado.
+    """
+    total_segments = total_segments or SCAN_SEGMENTS
+    if total_segments <= 1:
+        yield from iter_scan(table, capacity, projection, **kwargs)
+        return
+
+    table_name = table.name
+    pages = queue.Queue(maxsize=buffer_pages)
+    stop = threading.Event()
+
+    def put(value):
+        while not stop.is_set():
+            try:
+                pages.put(value, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def worker(segment):
+        try:
+            client = aws.resource("dynamodb").meta.client
+            for page in iter_pages(client.scan, capacity, projection, TableName=table_name,
+                                   Segment=segment, TotalSegments=total_segments, **kwargs):
+                if stop.is_set():
+                    return
+                put(page.get("Items", []))
+        except Exception as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or total_segments, total_segments))
+    try:
+        for segment in range(total_segments):
+            executor.submit(worker, segment)
+        pending = total_segments
+        while pending:
+            value = pages.get()
+            if value is _DONE:
+                pending -= 1
+            elif isinstance(value, Exception):
+                raise value
+            else:
+                yield from value
+    finally:
+        # si el consumidor corta antes (o hay error) los hilos dejan de leer
+        stop.set()
+        executor.shutdown(wait=False)
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=PARALLEL_WORKERS, thread_name_prefix=_POOL_PREFIX)
+    return _pool
+
+
+def run_parallel(tasks: dict, max_workers: int | None = None) -> dict:
+    """Ejecuta en paralelo funciones sin argumentos y devuelve {nombre: resultado}.
+
+    Usa un pool del contenedor cuyos hilos sobreviven entre invocaciones, así
+    cada uno crea su recurso de DynamoDB una sola vez. Las tareas deben leer y
+    escribir con lazy_table / aws.table (por hilo), no con un Table resuelto en
+    otro hilo. `max_workers` limita cuántas corren a la vez. Llamado desde una
+    tarea corre en serie (un pool acotado no puede esperar a sí mismo).
+    Si alguna falla se propaga la primera excepción.
+    """
+    if not tasks:
+        return {}
+    if threading.current_thread().name.startswith(_POOL_PREFIX):
+        return {name: fn() for name, fn in tasks.items()}
+    limit = threading.BoundedSemaphore(max_workers or len(tasks))
+
+    def run(fn):
+        try:
+            return fn()
+        finally:
+            limit.release()
+
+    futures = {}
+    for name, fn in tasks.items():
+        limit.acquire()
+        futures[name] = _executor().submit(run, fn)
+    return {name: f.result() for name, f in futures.items()}
+
+
+def deserialize_item(item: dict | None) -> dict | None:
+    """Item en formato crudo de DynamoDB (respuestas de error) -> dict de Python."""
+    if not item:
+        return None
+    return {k: _deserializer.deserialize(v) for k, v in item.items()}
+
+
+class TransactionCanceled(Exception):
+    """TransactWriteItems cancelada. `reasons` va alineada con los items enviados:
+    {"Code": "None" | "ConditionalCheckFailed" | ..., "Item": estado previo (si se pidió ALL_OLD)}.
+    """
+
+    def __init__(self, error: ClientError, reasons: list):
+        super().__init__(str(error))
+        self.error = error
+        self.reasons = reasons
+
+
+def _only_conflicts(reasons: list) -> bool:
+    codes = {r.get("Code") for r in reasons}
+    return "TransactionConflict" in codes and codes <= {"TransactionConflict", "None", None}
+
+
+def transact_write(items: list, capacity: ConsumedCapacity | None = None, conflict_retries: int = 0):
+    """TransactWriteItems con valores de Python (Decimal, dict...) como en Table.update_item.
+
+    Todas las escrituras se aplican o ninguna, en un solo viaje de red. Si la
+    transacción se cancela lanza TransactionCanceled con el motivo por item.
+    Con `conflict_retries`, una cancelación solo por TransactionConflict (otra
+    transacción sobre los mismos items, ej. los agregados del tenant) se
+    reintenta con backoff y jitter.
+    """
+    client = aws.resource("dynamodb").meta.client
+    extra = {"ReturnConsumedCapacity": "TOTAL"} if capacity is not None else {}
+    attempt = 0
+    while True:
+        try:
+            resp = client.transact_write_items(TransactItems=items, **extra)
+            break
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") != "TransactionCanceledException":
+                raise
+            reasons = [
+                {"Code": r.get("Code"), "Item": deserialize_item(r.get("Item"))}
+                for r in e.response.get("CancellationReasons", [])
+            ]
+            if attempt < conflict_retries and _only_conflicts(reasons):
+                attempt += 1
+                time.sleep(random.uniform(0, min(0.05 * (2 ** attempt), 1.0)))
+                continue
+            raise TransactionCanceled(e, reasons) from e
+    if capacity is not None:
+        capacity.add(resp)
+    return resp
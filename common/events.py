@@ -0,0 +1,90 @@
+"""Publicación en EventBridge en tandas que respetan los límites de PutEvents.
+
+PutEvents acepta hasta 10 entradas por llamada y 256 KB por request. Los
+jobs que emiten muchos registros los parten en entradas de hasta
+MAX_DETAIL_BYTES (10 entran juntas en un request) y las mandan de a 10;
+las entradas que EventBridge rechaza se reintentan con backoff.
+"""
+import json
+import os
+import time
+
+MAX_ENTRIES = 10
+MAX_REQUEST_BYTES = 256 * 1024
+# margen para Source / DetailType: 10 entradas de este tamaño entran en un request
+MAX_DETAIL_BYTES = 24 * 1024
+
+
+class PublishError(Exception):
+    """Entradas que EventBridge no aceptó tras los reintentos."""
+
+    def __init__(self, failed: list):
+        super().__init__(f"{len(failed)} eventos sin publicar")
+        self.failed = failed
+
+
+def entry(source: str, detail_type: str, detail: dict) -> dict:
+    return {
+        "Source": source,
+        "DetailType": detail_type,
+        "Detail": json.dumps(detail, separators=(",", ":")),
+        "EventBusName": os.environ["EVENT_BUS"],
+    }
+
+
+def chunk_records(records: list, base: dict, key: str, max_bytes: int = MAX_DETAIL_BYTES) -> list:
+    """Parte `records` en details {**base, key: [...]} de hasta `max_bytes` serializados."""
+    overhead = len(json.dumps({**base, key: []}, separators=(",", ":")).encode("utf-8"))
+    details, current, size = [], [], overhead
+    for record in records:
+        record_size = len(json.dumps(record, separators=(",", ":")).encode("utf-8")) + 1
+        if current and size + record_size > max_bytes:
+            details.append({**base, key: current})
+            current, size = [], overhead
+        current.append(record)
+        size += record_size
+    if current:
+        details.append({**base, key: current})
+    return details
+
+
+def _size(item: dict) -> int:
+    return sum(len(item.get(k, "").encode("utf-8")) for k in ("Source", "DetailType", "Detail"))
+
+
+def put_entries(eb, entries: list, max_attempts: int = 4) -> int:
+    """PutEvents de a MAX_ENTRIES (sin pasar MAX_REQUEST_BYTES). Devuelve cuántas se publicaron.
+
+    Lanza PublishError con las entradas que siguen fallando tras `max_attempts`.
+    """
+    batches, current, size = [], [], 0
+    for item in entries:
+        item_size = _size(item)
+        if current and (len(current) == MAX_ENTRIES or size + item_size > MAX_REQUEST_BYTES):
+            batches.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        batches.append(current)
+
+    for batch in batches:
+        pending, attempt = batch, 0
+        while pending:
+            resp = eb.put_events(Entries=pending)
+            if not resp.get("FailedEntryCount"):
+                break
+            pending = [item for item, result in zip(pending, resp.get("Entries", [])) if result.get("ErrorCode")]
+            attempt += 1
+            if attempt >= max_attempts:
+                raise PublishError(pending)
+            time.sleep(min(0.05 * (2 ** attempt), 1.0))
+    return len(entries)
+
+
+def publish(eb, source: str, detail_type: str, records: list, base: dict, key: str) -> int:
+    """Publica `records` en tantos eventos `detail_type` como haga falta; devuelve cuántos."""
+    details = chunk_records(records, base, key)
+    for i, detail in enumerate(details):
+        detail.update({"part": i + 1, "parts": len(details)})
+    return put_entries(eb, [entry(source, detail_type, detail) for detail in details])
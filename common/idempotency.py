@@ -0,0 +1,144 @@
+"""Idempotency-Key para los POST que crean pedidos.
+
+Los clientes móviles reintentan POST /orders ante un timeout. Con el header
+`Idempotency-Key`, el primer request toma la clave con un put condicional en
+IdempotencyKeys y al terminar guarda la respuesta; los reintentos reciben esa
+misma respuesta sin escribir en Orders ni publicar eventos.
+
+Estados de un registro:
+  - in_progress: hay una invocación procesando la clave (bloqueo hasta
+    `locked_until`, por si la Lambda muere a mitad de camino).
+  - completed: `status_code` y `response_body` de la respuesta original.
+Las respuestas 5xx no se guardan: se borra la clave para que el reintento
+vuelva a intentarlo. Por eso `produce` solo debe fallar (5xx o excepción)
+si no persistió nada; una vez guardado el pedido, los errores posteriores
+(ej. publicar el evento) se registran y la respuesta sigue siendo 2xx. DynamoDB expira los registros con TTL en `expires_at`.
+"""
+import hashlib
+import json
+import time
+
+from botocore.exceptions import ClientError
+
+from common import aws
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+RECORD_TTL = 24 * 3600
+# mayor que el timeout de las Lambdas (29s): si vence, la invocación original ya terminó o murió
+LOCK_SECONDS = 35
+
+
+def get_key(event):
+    """Valor del header Idempotency-Key (o None)."""
+    headers = event.get("headers", {}) or {}
+    key = headers.get(HEADER) or headers.get(HEADER.lower())
+    return key.strip() if isinstance(key, str) and key.strip() else None
+
+
+def request_hash(payload) -> str:
+    """Hash del body canónico, para detectar una clave reutilizada con otro pedido."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _is_conditional_failure(e: ClientError) -> bool:
+    return e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def _acquire(table, record_key, req_hash, now):
+    """Toma la clave si no existe, venció su TTL o quedó bloqueada por una invocación muerta."""
+    try:
+        table.put_item(
+            Item={
+                "idempotency_key": record_key,
+                "status": "in_progress",
+                "request_hash": req_hash,
+                "locked_until": now + LOCK_SECONDS,
+                "expires_at": now + RECORD_TTL,
+            },
+            ConditionExpression=(
+                "attribute_not_exists(idempotency_key) OR expires_at < :now"
+                " OR (#s = :in_progress AND locked_until < :now)"
+            ),
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":now": now, ":in_progress": "in_progress"},
+        )
+        return True
+    except ClientError as e:
+        if _is_conditional_failure(e):
+            return False
+        raise
+
+
+def _release(table, record_key):
+    try:
+        table.delete_item(Key={"idempotency_key": record_key})
+    except ClientError:
+        # sin borrar, el reintento espera a que venza locked_until
+        pass
+
+
+def _response(status_code, headers, payload):
+    return {"statusCode": status_code, "headers": headers, "body": json.dumps(payload)}
+
+
+def run(event, scope: str, payload, headers: dict, produce):
+    """Ejecuta `produce()` una sola vez por (scope, Idempotency-Key).
+
+    `scope` separa las claves por tenant/usuario; `payload` es el body del
+    request; `produce` devuelve la respuesta Lambda del handler. Sin header,
+    solo llama a `produce()`.
+    """
+    key = get_key(event)
+    if key is None:
+        return produce()
+    if len(key) > MAX_KEY_LENGTH:
+        return _response(400, headers, {"error": f"{HEADER} supera {MAX_KEY_LENGTH} caracteres"})
+
+    table = aws.table("IDEMPOTENCY_TABLE")
+    record_key = f"{scope}#{key}"
+    req_hash = request_hash(payload)
+    now = int(time.time())
+
+    if not _acquire(table, record_key, req_hash, now):
+        record = table.get_item(Key={"idempotency_key": record_key}, ConsistentRead=True).get("Item")
+        if record is None:
+            # la clave se liberó (5xx) entre el put y la lectura
+            if not _acquire(table, record_key, req_hash, now):
+                return _response(409, headers, {"error": "Solicitud en proceso, reintente en unos segundos"})
+        elif record.get("request_hash") != req_hash:
+            return _response(422, headers, {"error": f"{HEADER} ya usado con otro contenido"})
+        elif record.get("status") == "completed":
+            return {
+                "statusCode": int(record["status_code"]),
+                "headers": {**headers, "Idempotent-Replayed": "true"},
+                "body": record.get("response_body"),
+            }
+        else:
+            return _response(409, headers, {"error": "Solicitud en proceso, reintente en unos segundos"})
+
+    try:
+        response = produce()
+    except Exception:
+        _release(table, record_key)
+        raise
+
+    if response.get("statusCode", 500) >= 500:
+        _release(table, record_key)
+    else:
+        try:
+            table.update_item(
+                Key={"idempotency_key": record_key},
+                UpdateExpression="SET #s = :completed, status_code = :code, response_body = :body REMOVE locked_until",
+                ExpressionAttributeNames={"#s": "status"},
+                ExpressionAttributeValues={
+                    ":completed": "completed",
+                    ":code": response["statusCode"],
+                    ":body": response.get("body"),
+                },
+            )
+        except ClientError:
+            # el pedido ya se creó: se responde igual, la clave queda bloqueada hasta locked_until
+            pass
+    return response
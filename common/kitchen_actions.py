@@ -0,0 +1,139 @@
+"""Acciones del staff de cocina sobre un ticket: aceptar y empacar.
+
+Las usan los endpoints de a un pedido (accept_order, pack_order) y los de
+lote (accept_orders_batch, pack_orders_batch), para que las escrituras,
+el recibo y el workflow sean los mismos en ambos caminos.
+
+Cada acción es una transacción por pedido (Kitchen + copia del timeline +
+Orders, ver common.transitions). En lote se corren en paralelo con un pool
+acotado, los eventos salen de a 10 por PutEvents (common.events) y las
+ejecuciones de Step Functions se inician también en paralelo.
+"""
+import json
+import os
+
+from botocore.exceptions import ClientError
+
+from common import aws, events, timeline
+from common.cache import TTLCache
+from common.dynamo import run_parallel
+from common.transitions import transition_item, mirror_item, transact, TransitionError
+
+ACCEPTED = "en_preparacion"
+PACKED = "listo_para_entrega"
+# transacciones / llamadas simultáneas en un lote
+MAX_WORKERS = int(os.environ.get("KITCHEN_BATCH_WORKERS", "8"))
+
+# ARN de la state machine resuelto por nombre; se cachea en el contenedor caliente
+_sfn_arn_cache = TTLCache(maxsize=1, ttl=3600)
+
+
+def accept_steps(kitchen_table, orders_table, tenant_id: str, order_id: str, staff_id, now: str) -> list:
+    """Steps de `transact` para pasar el pedido a en_preparacion (solo un cocinero acepta)."""
+    kitchen_update = transition_item(
+        kitchen_table, {"tenant_id": tenant_id, "order_id": order_id}, ACCEPTED, now,
+        set_expr="list_id_staff = list_append(if_not_exists(list_id_staff, :empty), :sid), start_time = :now, accepted_by = :by, accepted_at = :now",
+        values={":sid": [staff_id], ":empty": [], ":by": staff_id},
+    )
+    return [
+        (kitchen_update, ACCEPTED, [mirror_item(kitchen_update, timeline.table(), timeline.stage_key(tenant_id, order_id, timeline.KITCHEN))]),
+        (transition_item(orders_table, {"tenant_id": tenant_id, "id_order": order_id}, ACCEPTED, now), ACCEPTED, []),
+    ]
+
+
+def pack_steps(kitchen_table, orders_table, tenant_id: str, order_id: str, staff_id, now: str) -> list:
+    """Steps de `transact` para pasar el pedido a listo_para_entrega."""
+    kitchen_update = transition_item(
+        kitchen_table, {"tenant_id": tenant_id, "order_id": order_id}, PACKED, now,
+        set_expr="end_time = :now, packed_at = :now, packed_by = if_not_exists(packed_by, :by)",
+        values={":by": staff_id or "unknown"},
+    )
+    return [
+        (kitchen_update, PACKED, [mirror_item(kitchen_update, timeline.table(), timeline.stage_key(tenant_id, order_id, timeline.KITCHEN))]),
+        (transition_item(orders_table, {"tenant_id": tenant_id, "id_order": order_id}, PACKED, now), PACKED, []),
+    ]
+
+
+def apply_many(build_steps, order_ids: list, max_workers: int = MAX_WORKERS) -> dict:
+    """Corre la transacción de cada pedido en paralelo; devuelve {order_id: resultado}.
+
+    build_steps(order_id) -> steps de `transact`. Resultado: {"statusCode": 200,
+    "applied": bool} (applied False si ya estaba en el estado destino, sin
+    evento nuevo) o {"statusCode": 404/409/500, "error": ...}.
+    """
+    def run(order_id):
+        try:
+            applied = transact(build_steps(order_id))
+            return {"statusCode": 200, "applied": applied[0]}
+        except TransitionError as e:
+            return {"statusCode": e.status_code, "error": e.error}
+        except ClientError as e:
+            return {"statusCode": 500, "error": str(e)}
+
+    return run_parallel({order_id: (lambda oid=order_id: run(oid)) for order_id in order_ids}, max_workers=max_workers)
+
+
+def publish_many(eb, detail_type: str, details: list) -> set:
+    """Publica un evento kitchen-svc por detail, de a 10 por PutEvents.
+
+    Devuelve los order_id cuyo evento no se pudo publicar.
+    """
+    failed = set()
+    for start in range(0, len(details), events.MAX_ENTRIES):
+        group = details[start:start + events.MAX_ENTRIES]
+        try:
+            events.put_entries(eb, [events.entry("kitchen-svc", detail_type, d) for d in group])
+        except events.PublishError as e:
+            failed.update(json.loads(entry["Detail"])["order_id"] for entry in e.failed)
+        except ClientError:
+            failed.update(d["order_id"] for d in group)
+    return failed
+
+
+def _resolve_sfn_arn(sfn):
+    target_name = os.environ.get("ORDER_SFN_NAME", "papasqueens-order-workflow")
+    paginator = sfn.get_paginator("list_state_machines")
+    for page in paginator.paginate():
+        for sm in page.get("stateMachines", []):
+            if sm.get("name") == target_name:
+                return sm.get("stateMachineArn")
+    return None
+
+
+def workflow_arn(sfn):
+    return os.environ.get("ORDER_SFN_ARN") or _sfn_arn_cache.get_or_load("arn", lambda: _resolve_sfn_arn(sfn))
+
+
+def start_workflows(tenant_id: str, order_ids: list, max_workers: int = MAX_WORKERS) -> set:
+    """Inicia el workflow de cada pedido aceptado (best-effort); devuelve los que fallaron."""
+    if not order_ids:
+        return set()
+    try:
+        sfn = aws.client("stepfunctions")
+        sfn_arn = workflow_arn(sfn)
+    except Exception:
+        return set(order_ids)
+    if not sfn_arn:
+        return set(order_ids)
+
+    def start(order_id):
+        try:
+            sfn.start_execution(stateMachineArn=sfn_arn, input=json.dumps({"id_order": order_id, "tenant_id": tenant_id}))
+            return True
+        except Exception:
+            # No romper flujo de cocina si falla Step Functions
+            return False
+
+    started = run_parallel({order_id: (lambda oid=order_id: start(oid)) for order_id in order_ids}, max_workers=max_workers)
+    return {order_id for order_id, ok in started.items() if not ok}
+
+
+def put_receipt(s3, tenant_id: str, order_id: str, pedido: dict, now: str):
+    """Sube el recibo de texto del pedido empacado a RECEIPTS_BUCKET."""
+    recibo = f"""RECIBO DE PEDIDO\nOrder ID: {order_id}\nTenant: {tenant_id}\nEstado: {pedido.get('status')}\nTiempos: {pedido.get('start_time')} a {now}\nPersonal asignado: {','.join(pedido.get('list_id_staff', []))}\n"""
+    s3.put_object(
+        Bucket=os.environ.get("RECEIPTS_BUCKET"),
+        Key=f"{tenant_id}/{order_id}/receipt.txt",
+        Body=recibo.encode("utf-8"),
+        ContentType="text/plain"
+    )
@@ -0,0 +1,218 @@
+"""Planificación de la cola de cocina.
+
+Al recibir un pedido, receive_order le calcula un plan al ticket de Kitchen:
+minutos de trabajo por estación según los productos (`prep_minutes` del menú,
+o el valor por defecto de su categoría), hora prometida y `start_by`, la
+última hora a la que se puede empezar sin atrasar la entrega. Mientras el
+ticket está en cola lleva `queue_tenant` y `queue_rank` ("start_by#order_id"):
+KitchenQueueIndex es disperso y ya viene ordenado, así que get_kitchen_queue
+lee solo los primeros k tickets. update_kitchen_queue saca el ticket de la
+cola cuando el pedido se empaca o se cancela (Order.Updated / Prepared / Cancelled).
+
+Los tickets creados antes de la cola planificada no tienen clave en el
+índice: `ensure_reconciled` los planifica la primera vez que un contenedor
+lee la cola del tenant (y luego cada RECONCILE_TTL segundos), así no
+desaparecen de la pantalla de cocina.
+
+Las estaciones trabajan en paralelo; dentro de una estación los tickets se
+hacen en el orden de la cola. `schedule` simula eso sobre los k tickets
+leídos para estimar cuándo sale cada uno y qué carga tiene cada estación.
+"""
+import datetime
+import math
+import os
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from common import aws
+from common.cache import TTLCache, tenant_cached
+from common.dynamo import iter_query
+
+QUEUE_INDEX = "KitchenQueueIndex"
+QUEUE_KEY = "queue_tenant"
+RANK_KEY = "queue_rank"
+QUEUED = ("recibido", "en_preparacion")
+PLAN_FIELDS = ("prep_minutes", "stations", "promised_at", "start_by")
+
+PROMISE_MINUTES = int(os.environ.get("KITCHEN_PROMISE_MINUTES", "30"))
+# minutos de reparto entre que cocina entrega y la hora prometida al cliente
+DELIVERY_MINUTES = int(os.environ.get("DELIVERY_MINUTES", "20"))
+DEFAULT_STATION = "general"
+DEFAULT_PREP_MINUTES = 8
+# categoría del menú -> (estación, minutos por unidad)
+CATEGORY_PLAN = {
+    "papas": ("freidora", 6),
+    "hamburguesas": ("plancha", 9),
+    "combos": ("plancha", 11),
+    "bebidas": ("barra", 1),
+    "postres": ("barra", 3),
+}
+
+# segundos hasta que un contenedor vuelve a buscar tickets sin plan del tenant
+RECONCILE_TTL = float(os.environ.get("KITCHEN_RECONCILE_TTL", "900"))
+
+_plan_cache = TTLCache(maxsize=64, ttl=300)
+_reconciled = TTLCache(maxsize=64, ttl=RECONCILE_TTL)
+
+
+def product_plan(product: dict) -> tuple[str, int]:
+    """(estación, minutos por unidad) de un producto del menú."""
+    station, minutes = CATEGORY_PLAN.get(product.get("categoria"), (DEFAULT_STATION, DEFAULT_PREP_MINUTES))
+    if product.get("prep_minutes") is not None:
+        minutes = int(math.ceil(float(product["prep_minutes"])))
+    return product.get("station") or station, minutes
+
+
+def _load_products(tenant_id):
+    return {
+        p["id_producto"]: product_plan(p)
+        for p in iter_query(
+            aws.table("MENU_TABLE"),
+            projection=["id_producto", "categoria", "prep_minutes", "station"],
+            KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+        )
+    }
+
+
+def menu_plans(tenant_id: str) -> dict:
+    """{id_producto: (estación, minutos)} del menú del tenant (cacheado en el namespace "menu")."""
+    return tenant_cached(_plan_cache, "menu", tenant_id, "plan", lambda: _load_products(tenant_id))
+
+
+def order_lines(order: dict) -> list:
+    """[(id_producto, qty)] de `items` o, si no hay, de list_id_products."""
+    lines = []
+    for it in order.get("items") or []:
+        if isinstance(it, dict) and (it.get("id_producto") or it.get("id")):
+            try:
+                qty = max(int(it.get("qty") or 1), 1)
+            except (TypeError, ValueError):
+                qty = 1
+            lines.append((it.get("id_producto") or it.get("id"), qty))
+    if lines:
+        return lines
+    counts = {}
+    for pid in order.get("list_id_products") or []:
+        counts[pid] = counts.get(pid, 0) + 1
+    return list(counts.items())
+
+
+def _parse(value):
+    try:
+        return datetime.datetime.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_plan(lines: list, products: dict, created_at: str | None = None, promised_at: str | None = None) -> dict:
+    """Plan del ticket: minutos por estación, total (la estación más cargada) y horarios."""
+    stations = {}
+    for pid, qty in lines:
+        station, minutes = products.get(pid, (DEFAULT_STATION, DEFAULT_PREP_MINUTES))
+        stations[station] = stations.get(station, 0) + minutes * qty
+    prep = max(stations.values()) if stations else DEFAULT_PREP_MINUTES
+    created = _parse(created_at) or datetime.datetime.utcnow()
+    promised = _parse(promised_at) or created + datetime.timedelta(minutes=PROMISE_MINUTES)
+    return {
+        "prep_minutes": prep,
+        "stations": stations or {DEFAULT_STATION: prep},
+        "promised_at": promised.isoformat(),
+        "start_by": (promised - datetime.timedelta(minutes=prep)).isoformat(),
+    }
+
+
+def kitchen_deadline(order: dict) -> str | None:
+    """Hora a la que cocina debe tener listo el pedido.
+
+    `ready_by` del pedido; en pedidos que solo guardaron `promised_at` (la
+    promesa al cliente, reparto incluido) se le descuenta DELIVERY_MINUTES.
+    """
+    if order.get("ready_by"):
+        return order["ready_by"]
+    promised = _parse(order.get("promised_at"))
+    return (promised - datetime.timedelta(minutes=DELIVERY_MINUTES)).isoformat() if promised else None
+
+
+def plan_order(tenant_id: str, order: dict) -> dict:
+    return build_plan(order_lines(order), menu_plans(tenant_id), order.get("created_at"), kitchen_deadline(order))
+
+
+def ticket_fields(tenant_id: str, order_id: str, plan: dict) -> dict:
+    """Atributos del ticket en cola: el plan más la clave de KitchenQueueIndex."""
+    return {**plan, QUEUE_KEY: tenant_id, RANK_KEY: f"{plan['start_by']}#{order_id}"}
+
+
+def enqueue(tenant_id: str, order_id: str, ticket: dict, order: dict) -> bool:
+    """Planifica un ticket anterior a la cola y lo agrega a KitchenQueueIndex.
+
+    Devuelve False si el ticket se borró mientras tanto.
+    """
+    plan = plan_order(tenant_id, {**order, "created_at": order.get("created_at") or ticket.get("updated_at")})
+    fields = ticket_fields(tenant_id, order_id, plan)
+    try:
+        aws.table("KITCHEN_TABLE").update_item(
+            Key={"tenant_id": tenant_id, "order_id": order_id},
+            UpdateExpression="SET " + ", ".join(f"#f{i} = :f{i}" for i in range(len(fields))),
+            ConditionExpression="attribute_exists(order_id)",
+            ExpressionAttributeNames={f"#f{i}": k for i, k in enumerate(fields)},
+            ExpressionAttributeValues={f":f{i}": v for i, v in enumerate(fields.values())},
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        return False
+    return True
+
+
+def reconcile(tenant_id: str) -> int:
+    """Agrega a la cola los tickets recibidos / en preparación del tenant que no tienen plan."""
+    kitchen_table = aws.table("KITCHEN_TABLE")
+    orders_table = aws.table("ORDERS_TABLE")
+    changed = 0
+    for status in QUEUED:
+        for ticket in iter_query(
+            kitchen_table,
+            IndexName="TenantStatusIndex",
+            KeyConditionExpression=Key("tenant_id").eq(tenant_id) & Key("status").eq(status),
+            FilterExpression=Attr(RANK_KEY).not_exists(),
+        ):
+            order = orders_table.get_item(Key={"tenant_id": tenant_id, "id_order": ticket["order_id"]}).get("Item") or {}
+            if order.get("status", status) not in QUEUED:
+                continue
+            if enqueue(tenant_id, ticket["order_id"], ticket, order):
+                changed += 1
+    return changed
+
+
+def ensure_reconciled(tenant_id: str):
+    """`reconcile` una vez por contenedor y tenant cada RECONCILE_TTL segundos."""
+    if _reconciled.get(tenant_id) is None:
+        reconcile(tenant_id)
+        _reconciled.set(tenant_id, True)
+
+
+def schedule(tickets: list, now: datetime.datetime | None = None) -> dict:
+    """Agrega `ready_estimate` / `late` a cada ticket (en el orden de la cola) y
+    devuelve {estación: minutos pendientes}.
+
+    Un ticket en preparación ya consumió el tiempo desde start_time.
+    """
+    now = now or datetime.datetime.utcnow()
+    free_at = {}
+    load = {}
+    for ticket in tickets:
+        stations = ticket.get("stations") or {DEFAULT_STATION: ticket.get("prep_minutes") or DEFAULT_PREP_MINUTES}
+        started = _parse(ticket.get("start_time")) if ticket.get("status") == "en_preparacion" else None
+        elapsed = (now - started).total_seconds() / 60 if started else 0
+        ready = now
+        for station, minutes in stations.items():
+            remaining = max(float(minutes) - elapsed, 0)
+            done = free_at.get(station, now) + datetime.timedelta(minutes=remaining)
+            free_at[station] = done
+            load[station] = load.get(station, 0) + remaining
+            ready = max(ready, done)
+        ticket["ready_estimate"] = ready.isoformat()
+        promised = _parse(ticket.get("promised_at"))
+        ticket["late"] = bool(promised and ready > promised)
+    return {station: round(minutes, 1) for station, minutes in load.items()}
@@ -0,0 +1,124 @@
+"""Tiempos por etapa del workflow guardados como sketches por tenant y por hora.
+
+Registros en Analytics (clave tenant_id, id_metric):
+- `KPI#<YYYY-MM-DDTHH>#<etapa>`: DDSketch de minutos de la etapa (ver common.sketch).
+- `KPI#<YYYY-MM-DDTHH>#responsables`: contadores `<campo>:<id_staff>`.
+
+La hora es la del fin de la etapa. Como el id empieza por la hora, una ventana
+de tiempo es un único query por rango sobre la clave de ordenamiento.
+"""
+import datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key
+from common.dynamo import iter_query
+from common.sketch import DDSketch
+
+RECORD_TYPE = "workflow_kpi"
+PREFIX = "KPI#"
+RESPONSABLES = "responsables"
+
+STAGES = ("recibido_a_aceptado", "aceptado_a_empacado", "empacado_a_salida", "salida_a_entregado")
+RESPONSABLE_FIELDS = ("accepted_by", "packed_by", "delivered_by")
+
+
+def parse_iso(ts):
+    try:
+        return datetime.datetime.fromisoformat(str(ts))
+    except Exception:
+        return None
+
+
+def hour_key(dt: datetime.datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H")
+
+
+def record_id(hour: str, name: str) -> str:
+    return f"{PREFIX}{hour}#{name}"
+
+
+def stage_observation(stage: str, start, end):
+    """(etapa, hora, minutos) si ambos timestamps son válidos y ordenados, si no None."""
+    start_dt, end_dt = parse_iso(start), parse_iso(end)
+    if not start_dt or not end_dt or end_dt < start_dt:
+        return None
+    return stage, hour_key(end_dt), (end_dt - start_dt).total_seconds() / 60
+
+
+def to_number(value):
+    """DynamoDB no acepta float: se guardan como Decimal."""
+    return Decimal(str(round(value, 4))) if isinstance(value, float) else value
+
+
+def _add_entry(table_name, tenant_id, id_metric, counters: dict, extra_set: dict) -> dict:
+    names, values, adds, sets = {}, {":rt": RECORD_TYPE}, [], ["record_type = :rt"]
+    for i, (attr, value) in enumerate(counters.items()):
+        names[f"#a{i}"] = attr
+        values[f":a{i}"] = to_number(value)
+        adds.append(f"#a{i} :a{i}")
+    for i, (attr, value) in enumerate(extra_set.items()):
+        names[f"#s{i}"] = attr
+        values[f":s{i}"] = value
+        sets.append(f"#s{i} = :s{i}")
+    return {
+        "Update": {
+            "TableName": table_name,
+            "Key": {"tenant_id": tenant_id, "id_metric": id_metric},
+            "UpdateExpression": "SET " + ", ".join(sets) + " ADD " + ", ".join(adds),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+    }
+
+
+def update_entries(table_name: str, tenant_id: str, observations, responsables) -> list:
+    """Entradas `Update` de TransactWriteItems.
+
+    observations: iterable de (etapa, hora, minutos) (None se ignora).
+    responsables: iterable de (campo, id_staff, hora).
+    """
+    sketches = {}
+    for obs in observations:
+        if not obs:
+            continue
+        stage, hour, minutes = obs
+        sketches.setdefault((hour, stage), DDSketch()).add(minutes)
+
+    counters = {}
+    for field, staff_id, hour in responsables:
+        if staff_id and hour:
+            c = counters.setdefault(hour, {})
+            c[f"{field}:{staff_id}"] = c.get(f"{field}:{staff_id}", 0) + 1
+
+    entries = []
+    for (hour, stage), sk in sketches.items():
+        entries.append(_add_entry(table_name, tenant_id, record_id(hour, stage), sk.to_attributes(), {"stage": stage, "hour": hour}))
+    for hour, c in counters.items():
+        entries.append(_add_entry(table_name, tenant_id, record_id(hour, RESPONSABLES), c, {"stage": RESPONSABLES, "hour": hour}))
+    return entries
+
+
+def load_window(table, tenant_id: str, start: datetime.datetime | None = None,
+                end: datetime.datetime | None = None, capacity=None):
+    """Combina los registros de la ventana [start, end] (horas completas; sin límites = todo).
+
+    Devuelve ({etapa: DDSketch}, {campo: {id_staff: n}}).
+    """
+    if start or end:
+        low = PREFIX + (hour_key(start) if start else "")
+        high = PREFIX + (hour_key(end) if end else "9999") + "#~"
+        key_cond = Key("tenant_id").eq(tenant_id) & Key("id_metric").between(low, high)
+    else:
+        key_cond = Key("tenant_id").eq(tenant_id) & Key("id_metric").begins_with(PREFIX)
+
+    sketches = {stage: DDSketch() for stage in STAGES}
+    responsables = {field: {} for field in RESPONSABLE_FIELDS}
+    for item in iter_query(table, capacity, KeyConditionExpression=key_cond):
+        stage = item.get("stage")
+        if stage in sketches:
+            sketches[stage].merge(DDSketch.from_item(item))
+        elif stage == RESPONSABLES:
+            for attr, value in item.items():
+                field, sep, staff_id = attr.partition(":")
+                if sep and field in responsables:
+                    responsables[field][staff_id] = responsables[field].get(staff_id, 0) + int(value)
+    return sketches, responsables
@@ -0,0 +1,195 @@
+"""Lecturas del menú sin recorrer MenuItems en cada request.
+
+Índice de categorías (TenantCategoryIndex): `tenant_categoria` =
+"tenant_id#categoria" y solo existe en productos disponibles. El índice es
+disperso, así que la vista del cliente de una categoría es un Query paginado
+que no lee productos ocultos ni de otros tenants. add/update/delete_menu_item
+mantienen el atributo al escribir.
+
+Snapshot del menú: kitchen-svc/build_menu_snapshot lo regenera con cada
+Menu.Updated y lo sube a MENU_BUCKET como JSON compacto en gzip, un objeto
+por vista ("all" y "available") cuyo nombre lleva el hash del contenido.
+`snapshots/<tenant>/menu.json` apunta a los vigentes; los listados lo sirven
+con ETag (o redirigen al objeto) sin consumir capacidad de DynamoDB.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from common import aws
+from common.cache import TTLCache
+
+CATEGORY_INDEX = "TenantCategoryIndex"
+CATEGORY_KEY = "tenant_categoria"
+
+SNAPSHOT_PREFIX = "snapshots"
+VIEWS = ("all", "available")
+# segundos que un contenedor reutiliza el puntero antes de volver a leerlo de S3
+SNAPSHOT_POINTER_TTL = float(os.environ.get("MENU_SNAPSHOT_TTL", "10"))
+PRESIGNED_TTL = 300
+
+_pointer_cache = TTLCache(maxsize=64, ttl=SNAPSHOT_POINTER_TTL)
+# por clave con hash: el contenido de un snapshot nunca cambia
+_snapshot_cache = TTLCache(maxsize=32, ttl=3600)
+
+
+def category_key(tenant_id: str, categoria: str) -> str:
+    return f"{tenant_id}#{categoria}"
+
+
+def category_value(item: dict) -> str | None:
+    """Valor de `tenant_categoria` que le corresponde a `item` (None: fuera del índice)."""
+    if item.get("available") is not True or not item.get("categoria"):
+        return None
+    return category_key(item["tenant_id"], item["categoria"])
+
+
+def sync_category_kwargs(item: dict) -> dict | None:
+    """Argumentos de update_item que dejan `tenant_categoria` acorde a `item`; None si ya lo está.
+
+    `item` es el producto completo (ej. el ALL_NEW de la escritura anterior).
+
+    Condicionado a updated_at: si otra escritura se cruzó, esa hace su propio ajuste.
+    """
+    value = category_value(item)
+    if item.get(CATEGORY_KEY) == value:
+        return None
+    kwargs = {
+        "Key": {"tenant_id": item["tenant_id"], "id_producto": item["id_producto"]},
+        "ConditionExpression": "updated_at = :u",
+        "ExpressionAttributeNames": {"#k": CATEGORY_KEY},
+        "ExpressionAttributeValues": {":u": item.get("updated_at")},
+    }
+    if value is None:
+        kwargs["UpdateExpression"] = "REMOVE #k"
+    else:
+        kwargs["UpdateExpression"] = "SET #k = :k"
+        kwargs["ExpressionAttributeValues"][":k"] = value
+    return kwargs
+
+
+def pointer_key(tenant_id: str) -> str:
+    return f"{SNAPSHOT_PREFIX}/{tenant_id}/menu.json"
+
+
+def _plain(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, dict):
+        return {k: _plain(v) for k, v in obj.items() if k != CATEGORY_KEY}
+    if isinstance(obj, list):
+        return [_plain(v) for v in obj]
+    return obj
+
+
+def render_snapshot(items: list) -> tuple[bytes, str]:
+    """(JSON compacto en gzip, hash del contenido). Mismo menú -> mismos bytes y hash."""
+    rows = sorted((_plain(item) for item in items), key=lambda item: item.get("id_producto", ""))
+    raw = json.dumps(rows, separators=(",", ":"), sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return gzip.compress(raw, mtime=0), hashlib.sha256(raw).hexdigest()[:32]
+
+
+def _read_pointer(tenant_id: str) -> dict | None:
+    try:
+        resp = aws.client("s3").get_object(Bucket=os.environ["MENU_BUCKET"], Key=pointer_key(tenant_id))
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    return json.loads(resp["Body"].read())
+
+
+def publish_snapshot(tenant_id: str, items: list) -> tuple[dict, bool]:
+    """Sube las vistas de `items` (el menú completo del tenant) y mueve el puntero.
+
+    Devuelve (puntero, cambió). Las vistas que no cambiaron no se vuelven a subir.
+    """
+    s3 = aws.client("s3")
+    bucket = os.environ["MENU_BUCKET"]
+    previous = _read_pointer(tenant_id) or {}
+    views = {}
+    for view in VIEWS:
+        rows = items if view == "all" else [item for item in items if item.get("available") is True]
+        body, etag = render_snapshot(rows)
+        key = f"{SNAPSHOT_PREFIX}/{tenant_id}/{view}-{etag}.json.gz"
+        if previous.get("views", {}).get(view, {}).get("key") != key:
+            s3.put_object(
+                Bucket=bucket, Key=key, Body=body,
+                ContentType="application/json", ContentEncoding="gzip",
+                CacheControl="public, max-age=31536000, immutable",
+            )
+        views[view] = {"key": key, "etag": etag, "count": len(rows)}
+    if previous.get("views") == views:
+        return previous, False
+
+    pointer = {"tenant_id": tenant_id, "built_at": datetime.datetime.utcnow().isoformat(), "views": views}
+    s3.put_object(
+        Bucket=bucket, Key=pointer_key(tenant_id), Body=json.dumps(pointer).encode("utf-8"),
+        ContentType="application/json", CacheControl="no-cache",
+    )
+    _pointer_cache.set(tenant_id, pointer)
+    return pointer, True
+
+
+def drop_snapshot(tenant_id: str):
+    """Borra el puntero del tenant: los listados vuelven a leer MenuItems hasta el próximo build."""
+    aws.client("s3").delete_object(Bucket=os.environ["MENU_BUCKET"], Key=pointer_key(tenant_id))
+    _pointer_cache.pop(tenant_id)
+
+
+def current_snapshot(tenant_id: str) -> dict | None:
+    """Puntero vigente del tenant (cacheado unos segundos); None si todavía no hay snapshot."""
+    return _pointer_cache.get_or_load(tenant_id, lambda: _read_pointer(tenant_id))
+
+
+def snapshot_body(pointer: dict, view: str) -> str:
+    """JSON de la vista tal como se guardó (listo para devolver sin re-serializar)."""
+    key = pointer["views"][view]["key"]
+
+    def load():
+        resp = aws.client("s3").get_object(Bucket=os.environ["MENU_BUCKET"], Key=key)
+        return gzip.decompress(resp["Body"].read()).decode("utf-8")
+
+    return _snapshot_cache.get_or_load(key, load)
+
+
+def snapshot_url(pointer: dict, view: str) -> str:
+    return aws.client("s3").generate_presigned_url(
+        "get_object",
+        Params={"Bucket": os.environ["MENU_BUCKET"], "Key": pointer["views"][view]["key"]},
+        ExpiresIn=PRESIGNED_TTL,
+    )
+
+
+def _if_none_match(event) -> str | None:
+    headers = event.get("headers", {}) or {}
+    raw = headers.get("If-None-Match") or headers.get("if-none-match")
+    if not raw:
+        return None
+    raw = raw.strip()
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    return raw.strip('"')
+
+
+def snapshot_response(event, tenant_id: str, view: str, headers: dict) -> dict | None:
+    """Respuesta de un listado desde el snapshot: 304 si el cliente ya tiene el
+    ETag, 302 al objeto en S3 con ?redirect=1, si no 200 con el JSON.
+    None si el tenant aún no tiene snapshot (el llamador lee MenuItems).
+    """
+    pointer = current_snapshot(tenant_id)
+    if not pointer or view not in pointer.get("views", {}):
+        return None
+    etag = pointer["views"][view]["etag"]
+    headers = {**headers, "ETag": f'"{etag}"', "Access-Control-Expose-Headers": "ETag"}
+    if _if_none_match(event) == etag:
+        return {"statusCode": 304, "headers": headers, "body": ""}
+    qs = event.get("queryStringParameters") or {}
+    if (qs.get("redirect") or "").lower() in ("1", "true"):
+        return {"statusCode": 302, "headers": {**headers, "Location": snapshot_url(pointer, view)}, "body": ""}
+    return {"statusCode": 200, "headers": headers, "body": snapshot_body(pointer, view)}
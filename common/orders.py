@@ -0,0 +1,178 @@
+"""Validación, precios y armado del item de Orders, compartido por create_order y create_orders_batch.
+
+Los precios salen del menú del tenant (MenuItems), no del cliente. El índice
+de precios se guarda por contenedor en el namespace "menu" de common.cache,
+así que Menu.Updated lo invalida igual que a los listados del menú.
+"""
+import datetime
+import uuid
+from decimal import Decimal
+
+from boto3.dynamodb.conditions import Key
+
+from common import aws, prep_model
+from common.aggregates import order_total
+from common.cache import TTLCache, tenant_cached
+from common.dynamo import iter_query
+
+_price_cache = TTLCache(maxsize=64, ttl=300)
+
+
+class OrderValidationError(Exception):
+    """Pedido rechazado: `error` va al cliente, `log_message`/`details` al log."""
+
+    def __init__(self, status_code: int, error: str, log_message: str, details: dict | None = None):
+        super().__init__(error)
+        self.status_code = status_code
+        self.error = error
+        self.log_message = log_message
+        self.details = details or {}
+
+
+def _load_prices(tenant_id):
+    table = aws.table("MENU_TABLE")
+    return {
+        m["id_producto"]: m
+        for m in iter_query(
+            table,
+            projection=["id_producto", "nombre", "precio", "available"],
+            KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+        )
+    }
+
+
+def menu_prices(tenant_id: str) -> dict:
+    """{id_producto: {nombre, precio, available}} del menú del tenant (cacheado)."""
+    return tenant_cached(_price_cache, "menu", tenant_id, "precios", lambda: _load_prices(tenant_id))
+
+
+def _order_lines(items, list_id_products):
+    """[(id_producto, qty, item_cliente)]: de `items` si traen id_producto, si no de list_id_products."""
+    lines = []
+    for it in items:
+        if isinstance(it, dict) and (it.get("id_producto") or it.get("id")):
+            lines.append((it.get("id_producto") or it.get("id"), it.get("qty") or 1, it))
+    if lines:
+        return lines
+    counts = {}
+    for pid in list_id_products:
+        counts[pid] = counts.get(pid, 0) + 1
+    return [(pid, qty, {}) for pid, qty in counts.items()]
+
+
+def price_items(items, list_id_products, prices: dict):
+    """Items con el precio y nombre del menú, y el subtotal. OrderValidationError si un producto no se vende."""
+    priced = []
+    subtotal = Decimal("0")
+    for pid, qty, client_item in _order_lines(items, list_id_products):
+        try:
+            qty = int(qty)
+        except (TypeError, ValueError):
+            qty = 0
+        if qty < 1:
+            raise OrderValidationError(400, f"Cantidad inválida para {pid}", "Pedido con cantidad inválida", {"id_producto": pid})
+        product = prices.get(pid)
+        if not product or product.get("available") is False:
+            raise OrderValidationError(400, f"Producto no disponible: {pid}", "Pedido con producto fuera del menú", {"id_producto": pid})
+        precio = Decimal(str(product.get("precio") or 0))
+        line = {k: v for k, v in client_item.items() if k not in ("id", "price")}
+        line.update({"id_producto": pid, "nombre": product.get("nombre"), "precio": precio, "qty": qty})
+        priced.append(line)
+        subtotal += precio * qty
+    return priced, subtotal
+
+
+def _normalize_items(items):
+    normalized_items = []
+    for it in items:
+        if not isinstance(it, dict):
+            continue
+        ni = dict(it)
+        if "precio" in ni and not isinstance(ni["precio"], Decimal):
+            try:
+                ni["precio"] = Decimal(str(ni["precio"]))
+            except Exception:
+                # Si no se puede convertir, lo dejamos como está para no romper todo el pedido
+                pass
+        normalized_items.append(ni)
+    return normalized_items
+
+
+def build_order_item(body: dict, user_info: dict, now: str | None = None) -> dict:
+    """Valida y cotiza el pedido y devuelve el item a guardar (status "recibido").
+
+    KeyError si falta tenant_id / id_customer / list_id_products;
+    OrderValidationError para el resto de rechazos.
+    """
+    tenant_id = body["tenant_id"]
+    id_customer = body["id_customer"]
+    list_id_products = body["list_id_products"]
+    items = body.get("items") or []
+    delivery_address = body.get("delivery_address") or body.get("address") or body.get("direccion")
+    customer_name = body.get("customer_name") or body.get("name")
+    dest_lat = body.get("dest_lat") or body.get("lat")
+    dest_lng = body.get("dest_lng") or body.get("lng")
+
+    if not list_id_products:
+        raise OrderValidationError(400, "Debe incluir productos", "Intento de crear pedido sin productos", {"id_customer": id_customer})
+
+    if (user_info.get("type") or "").lower() == "customer":
+        # Validar que los clientes tengan dirección de entrega registrada
+        if not delivery_address or not str(delivery_address).strip():
+            raise OrderValidationError(400, "Direccion de entrega requerida", "Cliente intenta crear pedido sin direccion", {
+                "id_customer": id_customer,
+                "tenant_id": tenant_id,
+            })
+
+    if user_info.get("type") == "customer" and id_customer != user_info.get("id"):
+        raise OrderValidationError(403, "Solo puedes crear pedidos para tu propia cuenta", "Cliente intenta crear pedido para otro cliente", {
+            "id_customer_requested": id_customer,
+            "id_customer_authenticated": user_info.get("id"),
+        })
+
+    now = now or datetime.datetime.utcnow().isoformat()
+    item = {
+        "id_order": str(uuid.uuid4()),
+        "tenant_id": tenant_id,
+        "id_customer": id_customer,
+        # clave de TenantCustomerIndex (historial paginado del cliente)
+        "tenant_customer": f"{tenant_id}#{id_customer}",
+        "list_id_products": list_id_products,
+        "status": "recibido",
+        "created_at": now,
+        "updated_at": now,
+        "staff_confirmed_delivered": False,
+        "customer_confirmed_delivered": False,
+    }
+    if delivery_address:
+        item["delivery_address"] = delivery_address
+    if customer_name:
+        item["customer_name"] = customer_name
+    if dest_lat is not None and dest_lng is not None:
+        try:
+            # DynamoDB no acepta floats nativos; usamos Decimal para coordenadas
+            item["dest_lat"] = Decimal(str(dest_lat))
+            item["dest_lng"] = Decimal(str(dest_lng))
+        except Exception:
+            # Si no se pueden convertir, no rompemos toda la creación del pedido
+            pass
+
+    prices = menu_prices(tenant_id)
+    if prices:
+        priced, subtotal = price_items(items, list_id_products, prices)
+    else:
+        # tenant sin menú cargado en MenuItems: se conservan los precios enviados
+        priced = _normalize_items(items)
+        subtotal = order_total(priced)
+    if priced:
+        item["items"] = priced
+    # el total se calcula una sola vez acá; recibo y analytics leen este atributo
+    item["subtotal"] = subtotal
+    item["total"] = subtotal
+    # hora prometida según el modelo de preparación del tenant (O(items), sin leer historial)
+    try:
+        item.update(prep_model.eta_fields(tenant_id, item))
+    except Exception:
+        # sin estimación el pedido se crea igual; cocina usa su plazo por defecto
+        pass
+    return item
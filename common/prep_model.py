@@ -0,0 +1,243 @@
+"""Modelo de minutos de preparación por producto, aprendido de Kitchen (start_time -> end_time).
+
+Por tenant, un modelo lineal: minutos ≈ intercept + Σ coef[id_producto] * qty.
+Se guarda compacto en Analytics (`MODEL#prep`: un número por producto visto)
+y se mantiene de dos formas:
+
+- incremental: analytics-svc/update_prep_model aplica un paso de mínimos
+  cuadrados normalizado (NLMS) con cada Order.Prepared;
+- offline: analytics-svc/rebuild_prep_model ajusta una regresión ridge sobre
+  el historial del tenant (invocación manual, ej. al inicializar).
+
+Un producto sin coeficiente usa los minutos por unidad del plan de cocina
+(common.kitchen_queue). `estimate` y `order_eta` cuestan O(items) con el
+modelo cacheado: no leen historial.
+"""
+import datetime
+import math
+from decimal import Decimal
+
+from common import aws, kitchen_queue
+from common.cache import TTLCache
+from common.dynamo import TransactionCanceled, transact_write
+from common.kpis import parse_iso
+
+RECORD_TYPE = "prep_model"
+MODEL_ID = "MODEL#prep"
+LEARNING_RATE = 0.2
+RIDGE_LAMBDA = 1.0
+# observaciones fuera de rango (ticket olvidado abierto, reloj mal) no entrenan
+MAX_MINUTES = 180
+# minutos de reparto que se suman a la preparación para la hora prometida
+DELIVERY_MINUTES = kitchen_queue.DELIVERY_MINUTES
+
+_model_cache = TTLCache(maxsize=64, ttl=300)
+_EMPTY = {"intercept": 0, "coef": {}, "n": 0}
+
+
+def _table():
+    return aws.table("ANALYTICS_TABLE")
+
+
+def _decimal(value: float) -> Decimal:
+    return Decimal(str(round(value, 4)))
+
+
+def load_model(tenant_id: str, consistent: bool = False) -> dict:
+    """{intercept, coef, n, version} del tenant; modelo vacío si todavía no hay."""
+    item = _table().get_item(
+        Key={"tenant_id": tenant_id, "id_metric": MODEL_ID},
+        ConsistentRead=consistent,
+    ).get("Item")
+    if not item:
+        return dict(_EMPTY)
+    return {
+        "intercept": float(item.get("intercept", 0)),
+        "coef": {pid: float(v) for pid, v in (item.get("coef") or {}).items()},
+        "n": int(item.get("n", 0)),
+        "version": int(item.get("version", 0)),
+    }
+
+
+def cached_model(tenant_id: str) -> dict:
+    return _model_cache.get_or_load(tenant_id, lambda: load_model(tenant_id))
+
+
+def _model_item(tenant_id: str, model: dict, version: int) -> dict:
+    return {
+        "tenant_id": tenant_id,
+        "id_metric": MODEL_ID,
+        "record_type": RECORD_TYPE,
+        "intercept": _decimal(model["intercept"]),
+        "coef": {pid: _decimal(v) for pid, v in model["coef"].items()},
+        "n": model["n"],
+        "version": version,
+        "updated_at": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+_VERSION_CONDITION = "attribute_not_exists(id_metric) OR version = :v"
+
+
+def save_model(tenant_id: str, model: dict, expected_version: int | None = None):
+    """Guarda el modelo; con `expected_version` falla (ConditionalCheckFailed) si otro lo cambió antes."""
+    kwargs = {}
+    if expected_version is not None:
+        kwargs = {
+            "ConditionExpression": _VERSION_CONDITION,
+            "ExpressionAttributeValues": {":v": expected_version},
+        }
+    _table().put_item(
+        Item=_model_item(tenant_id, model, (expected_version or model.get("version") or 0) + 1),
+        **kwargs,
+    )
+    _model_cache.pop(tenant_id)
+
+
+def _prior(products: dict, pid) -> float:
+    return float(products.get(pid, (None, kitchen_queue.DEFAULT_PREP_MINUTES))[1])
+
+
+def predict(model: dict, lines: list, products: dict) -> float:
+    coef = model["coef"]
+    return model["intercept"] + sum(coef.get(pid, _prior(products, pid)) * qty for pid, qty in lines)
+
+
+def observe(model: dict, lines: list, minutes: float, products: dict) -> dict | None:
+    """Modelo tras un paso NLMS con la observación; None si la observación no sirve."""
+    if not lines or not (0 < minutes <= MAX_MINUTES):
+        return None
+    coef = dict(model["coef"])
+    for pid, _ in lines:
+        coef.setdefault(pid, _prior(products, pid))
+    error = minutes - predict({**model, "coef": coef}, lines, products)
+    step = LEARNING_RATE * error / (1 + sum(qty * qty for _, qty in lines))
+    for pid, qty in lines:
+        coef[pid] = max(coef[pid] + step * qty, 0)
+    return {**model, "intercept": model["intercept"] + step, "coef": coef, "n": model["n"] + 1}
+
+
+def _solve(matrix: list, vector: list) -> list:
+    """Eliminación gaussiana con pivoteo parcial (matriz simétrica definida positiva de ridge)."""
+    n = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        for r in range(col + 1, n):
+            factor = a[r][col] / a[col][col]
+            for c in range(col, n + 1):
+                a[r][c] -= factor * a[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        x[r] = (a[r][n] - sum(a[r][c] * x[c] for c in range(r + 1, n))) / a[r][r]
+    return x
+
+
+def fit(observations: list, products: dict) -> dict:
+    """Ridge sobre [(lines, minutos)], con los coeficientes tirando hacia el plan de cocina."""
+    observations = [(lines, y) for lines, y in observations if lines and 0 < y <= MAX_MINUTES]
+    pids = sorted({pid for lines, _ in observations for pid, _ in lines})
+    if not observations:
+        return dict(_EMPTY)
+    index = {pid: i + 1 for i, pid in enumerate(pids)}
+    size = len(pids) + 1
+    xtx = [[0.0] * size for _ in range(size)]
+    xty = [0.0] * size
+    for lines, y in observations:
+        row = {0: 1.0}
+        for pid, qty in lines:
+            row[index[pid]] = row.get(index[pid], 0) + qty
+        for i, xi in row.items():
+            xty[i] += xi * y
+            for j, xj in row.items():
+                xtx[i][j] += xi * xj
+    for pid, i in index.items():
+        xtx[i][i] += RIDGE_LAMBDA
+        xty[i] += RIDGE_LAMBDA * _prior(products, pid)
+    xtx[0][0] += RIDGE_LAMBDA
+    beta = _solve(xtx, xty)
+    return {
+        "intercept": beta[0],
+        "coef": {pid: max(beta[i], 0) for pid, i in index.items()},
+        "n": len(observations),
+    }
+
+
+def estimate(tenant_id: str, lines: list) -> int:
+    """Minutos de preparación estimados para las líneas [(id_producto, qty)] del pedido."""
+    model = cached_model(tenant_id)
+    products = kitchen_queue.menu_plans(tenant_id)
+    return max(int(math.ceil(predict(model, lines, products))), 1)
+
+
+def eta_fields(tenant_id: str, order: dict) -> dict:
+    """prep_estimate, ready_by (plazo de cocina) y promised_at (al cliente) para guardar en el pedido al crearlo."""
+    prep = estimate(tenant_id, kitchen_queue.order_lines(order))
+    created = parse_iso(order.get("created_at")) or datetime.datetime.utcnow()
+    ready_by = created + datetime.timedelta(minutes=prep)
+    return {
+        "prep_estimate": prep,
+        "ready_by": ready_by.isoformat(),
+        "promised_at": (ready_by + datetime.timedelta(minutes=DELIVERY_MINUTES)).isoformat(),
+    }
+
+
+def order_eta(tenant_id: str, order: dict) -> dict:
+    """{prep_minutes, ready_at, promised_at} del pedido; usa lo guardado al crearlo si existe."""
+    prep = order.get("prep_estimate")
+    prep = int(prep) if prep is not None else estimate(tenant_id, kitchen_queue.order_lines(order))
+    created = parse_iso(order.get("created_at")) or datetime.datetime.utcnow()
+    eta = {
+        "prep_minutes": prep,
+        "ready_at": order.get("ready_by") or (created + datetime.timedelta(minutes=prep)).isoformat(),
+    }
+    if order.get("promised_at"):
+        eta["promised_at"] = order["promised_at"]
+    return eta
+
+
+class AlreadyObserved(Exception):
+    """La marca que acompaña a la observación ya estaba puesta (evento repetido)."""
+
+
+class ModelConflict(Exception):
+    """Otras escrituras cambiaron el modelo en cada uno de los reintentos."""
+
+
+def update_with(tenant_id: str, lines: list, minutes: float, mark: dict, retries: int = 5) -> dict | None:
+    """Aplica una observación al modelo guardado con control de concurrencia optimista.
+
+    `mark` es un `Update` condicional de TransactWriteItems (ej. prep_observed
+    en el ticket) que se escribe en la misma transacción que el modelo: la
+    observación cuenta una sola vez y nunca queda marcada sin entrenar. Lanza
+    AlreadyObserved si la condición de la marca falla y ModelConflict si se
+    agotan los reintentos. None si la observación no sirve para entrenar.
+    """
+    products = kitchen_queue.menu_plans(tenant_id)
+    for _ in range(retries):
+        model = load_model(tenant_id, consistent=True)
+        updated = observe(model, lines, minutes, products)
+        if updated is None:
+            return None
+        version = model.get("version", 0)
+        put = {
+            "Put": {
+                "TableName": _table().name,
+                "Item": _model_item(tenant_id, updated, version + 1),
+                "ConditionExpression": _VERSION_CONDITION,
+                "ExpressionAttributeValues": {":v": version},
+            }
+        }
+        try:
+            transact_write([put, mark], conflict_retries=retries)
+        except TransactionCanceled as e:
+            codes = [r.get("Code") for r in e.reasons]
+            if len(codes) > 1 and codes[1] == "ConditionalCheckFailed":
+                raise AlreadyObserved()
+            if codes and codes[0] == "ConditionalCheckFailed":
+                continue
+            raise e.error
+        _model_cache.pop(tenant_id)
+        return {**updated, "version": version + 1}
+    raise ModelConflict(f"Modelo de {tenant_id} modificado en {retries} intentos")
@@ -0,0 +1,91 @@
+"""Sketch de cuantiles tipo DDSketch (error relativo acotado y mergeable).
+
+Cada valor positivo cae en el bucket `ceil(log_gamma(x))`; los cuantiles se
+estiman con error relativo <= RELATIVE_ACCURACY. Como los buckets son
+contadores, dos sketches se combinan sumándolos, y en DynamoDB se pueden
+actualizar con `ADD` sin leer el registro.
+"""
+import math
+
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# Valores por debajo de esto (incluye 0 y negativos) van al bucket cero
+MIN_VALUE = 1e-6
+
+BIN_PREFIX = "b_"
+COUNT_ATTR = "n"
+SUM_ATTR = "total"
+ZERO_ATTR = "z"
+
+
+def bucket_index(value: float) -> int:
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bucket_value(index: int) -> float:
+    # punto medio (en escala relativa) del bucket (gamma^(i-1), gamma^i]
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class DDSketch:
+    def __init__(self):
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float, weight: int = 1):
+        value = float(value)
+        if value < MIN_VALUE:
+            self.zero += weight
+        else:
+            i = bucket_index(value)
+            self.bins[i] = self.bins.get(i, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+
+    def merge(self, other: "DDSketch"):
+        for i, c in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if rank < seen:
+                return bucket_value(i)
+        return bucket_value(max(self.bins))
+
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0
+
+    @classmethod
+    def from_item(cls, item: dict) -> "DDSketch":
+        """Reconstruye el sketch desde un registro de DynamoDB (atributos b_<i>, n, total, z)."""
+        sk = cls()
+        for k, v in item.items():
+            if k.startswith(BIN_PREFIX):
+                sk.bins[int(k[len(BIN_PREFIX):])] = int(v)
+        sk.zero = int(item.get(ZERO_ATTR, 0))
+        sk.count = int(item.get(COUNT_ATTR, 0))
+        sk.sum = float(item.get(SUM_ATTR, 0))
+        return sk
+
+    def to_attributes(self) -> dict:
+        """Atributos (nombre -> número) que representan el sketch; se aplican con ADD."""
+        attrs = {f"{BIN_PREFIX}{i}": c for i, c in self.bins.items()}
+        if self.zero:
+            attrs[ZERO_ATTR] = self.zero
+        attrs[COUNT_ATTR] = self.count
+        attrs[SUM_ATTR] = self.sum
+        return attrs
@@ -0,0 +1,101 @@
+"""Timeline de un pedido: colección de items por `tenant_id#id_order` en OrderTimeline.
+
+Cocina y reparto copian acá su registro completo cada vez que lo cambian
+(sk "KITCHEN" y "DELIVERY"), así get_order y get_order_status leen todo el
+seguimiento con un solo Query en vez de Kitchen.get_item + Delivery/OrderIndex.
+Kitchen y Delivery siguen siendo la fuente de verdad: la copia es best-effort
+y los lectores vuelven a esas tablas si el pedido no tiene timeline.
+
+El item "STATUS" lleva un contador `version` que sube con cada evento de
+estado del pedido (orders-svc/bump_status_version) y con cada ubicación
+nueva del repartidor; get_order_status lo usa como ETag.
+"""
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from common import aws
+
+KITCHEN = "KITCHEN"
+DELIVERY = "DELIVERY"
+# versión de estado para GET /orders/{id}/status (ETag / long-poll)
+STATUS = "STATUS"
+_KEY_ATTRS = ("order_key", "sk")
+
+
+def order_key(tenant_id: str, id_order: str) -> str:
+    return f"{tenant_id}#{id_order}"
+
+
+def table():
+    return aws.table("ORDER_TIMELINE_TABLE")
+
+
+def stage_key(tenant_id: str, id_order: str, stage: str) -> dict:
+    return {"order_key": order_key(tenant_id, id_order), "sk": stage}
+
+
+def record(tenant_id: str, id_order: str, stage: str, item: dict) -> bool:
+    """Guarda `item` (registro de Kitchen o Delivery) como etapa `stage` del pedido.
+
+    No pisa una copia más nueva (updated_at mayor) si dos escrituras se cruzan.
+    """
+    if not (tenant_id and id_order and item):
+        return False
+    snapshot = dict(item)
+    snapshot.update({"order_key": order_key(tenant_id, id_order), "sk": stage})
+    kwargs = {"Item": snapshot}
+    if snapshot.get("updated_at"):
+        kwargs.update(
+            ConditionExpression="attribute_not_exists(sk) OR attribute_not_exists(updated_at) OR updated_at <= :u",
+            ExpressionAttributeValues={":u": snapshot["updated_at"]},
+        )
+    try:
+        table().put_item(**kwargs)
+        return True
+    except ClientError:
+        # copia desactualizada o error de red: los lectores caen a Kitchen/Delivery
+        return False
+
+
+def load(tenant_id: str, id_order: str) -> dict:
+    """{stage: registro} del pedido con un solo Query (sin order_key/sk)."""
+    resp = table().query(
+        KeyConditionExpression=Key("order_key").eq(order_key(tenant_id, id_order))
+    )
+    return {
+        item["sk"]: {k: v for k, v in item.items() if k not in _KEY_ATTRS}
+        for item in resp.get("Items", [])
+    }
+
+
+def get_stage(tenant_id: str, id_order: str, stage: str, consistent: bool = False) -> dict | None:
+    resp = table().get_item(
+        Key=stage_key(tenant_id, id_order, stage),
+        ConsistentRead=consistent,
+    )
+    item = resp.get("Item")
+    if item is None:
+        return None
+    return {k: v for k, v in item.items() if k not in _KEY_ATTRS}
+
+
+def bump_status(tenant_id: str, id_order: str, fields: dict) -> int:
+    """Incrementa la versión de estado del pedido (item STATUS) y guarda `fields`.
+
+    Devuelve la versión nueva. get_order_status responde 304 mientras no cambie.
+    """
+    names = {f"#f{i}": k for i, k in enumerate(fields)}
+    values = {f":f{i}": v for i, v in enumerate(fields.values())}
+    update = "ADD version :one"
+    kwargs = {}
+    if names:
+        update = "SET " + ", ".join(f"{n} = {v}" for n, v in zip(names, values)) + " " + update
+        kwargs["ExpressionAttributeNames"] = names
+    resp = table().update_item(
+        Key=stage_key(tenant_id, id_order, STATUS),
+        UpdateExpression=update,
+        ExpressionAttributeValues={**values, ":one": 1},
+        ReturnValues="UPDATED_NEW",
+        **kwargs,
+    )
+    return int(resp["Attributes"]["version"])
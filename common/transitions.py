@@ -0,0 +1,183 @@
+"""Grafo de estados de un pedido y transiciones con escritura condicional.
+
+Orders y Kitchen usan los mismos estados:
+
+    recibido -> en_preparacion -> listo_para_entrega -> en_camino -> entregado
+    recibido -> cancelado
+
+Cada transición es un único update_item con ConditionExpression sobre el
+estado actual y ReturnValues=ALL_NEW, sin leer el item antes. Si dos acciones
+del staff compiten, gana una y la otra recibe 409 en vez de pisarla. Cuando la
+condición falla, ReturnValuesOnConditionCheckFailure trae el item tal como
+estaba para explicar el rechazo sin otra lectura.
+
+Cuando un cambio toca varias tablas (Kitchen + Orders, Delivery + Orders),
+`transact` lo escribe con una sola TransactWriteItems: o se aplican todas las
+condiciones y escrituras o ninguna, y las tablas no quedan desfasadas.
+"""
+import re
+
+from botocore.exceptions import ClientError
+
+from common.dynamo import TransactionCanceled, deserialize_item, transact_write
+
+FLOW = ("recibido", "en_preparacion", "listo_para_entrega", "en_camino", "entregado")
+CANCELLED = "cancelado"
+STATUSES = FLOW + (CANCELLED,)
+
+# estado actual -> estados a los que puede pasar
+TRANSITIONS = {
+    "recibido": ("en_preparacion", CANCELLED),
+    "en_preparacion": ("listo_para_entrega",),
+    "listo_para_entrega": ("en_camino",),
+    "en_camino": ("entregado",),
+}
+
+
+class TransitionError(Exception):
+    """Transición rechazada: 404 si el item no existe, 409 si el estado actual no lo permite."""
+
+    def __init__(self, status_code: int, error: str, current: dict | None = None):
+        super().__init__(error)
+        self.status_code = status_code
+        self.error = error
+        self.current = current or {}
+
+
+def allowed_from(target: str) -> list:
+    """Estados desde los que se puede pasar a `target`."""
+    return [status for status, nexts in TRANSITIONS.items() if target in nexts]
+
+
+def update_kwargs(key: dict, target: str, now: str, set_expr: str = "", values: dict | None = None,
+                  condition: str = "", names: dict | None = None) -> dict:
+    """Argumentos de update_item (o de un Update de TransactWriteItems) para pasar `key` a `target`.
+
+    `set_expr` agrega asignaciones al SET (ej. "accepted_by = :by") y
+    `condition` otra condición que se combina con AND (ej. "id_customer = :c").
+    """
+    sources = allowed_from(target)
+    if not sources:
+        raise ValueError(f"Estado destino inválido: {target}")
+    placeholders = [f":from{i}" for i in range(len(sources))]
+    expression = "SET #s = :to, updated_at = :now" + (f", {set_expr}" if set_expr else "")
+    cond = f"attribute_exists(tenant_id) AND #s IN ({', '.join(placeholders)})"
+    if condition:
+        cond += f" AND ({condition})"
+    return {
+        "Key": key,
+        "UpdateExpression": expression,
+        "ConditionExpression": cond,
+        "ExpressionAttributeNames": {"#s": "status", **(names or {})},
+        "ExpressionAttributeValues": {
+            ":to": target,
+            ":now": now,
+            **dict(zip(placeholders, sources)),
+            **(values or {}),
+        },
+    }
+
+
+def rejection(current: dict | None, target: str) -> tuple[dict, bool]:
+    """Interpreta un ConditionalCheckFailed a partir del item previo.
+
+    Si el item ya estaba en `target` (reintento de la misma acción) devuelve
+    (item, False); si no, lanza TransitionError.
+    """
+    if not current:
+        raise TransitionError(404, "Pedido no encontrado")
+    status = current.get("status")
+    if status == target:
+        return current, False
+    raise TransitionError(409, f"No se puede pasar de '{status}' a '{target}'", current)
+
+
+def transition(table, key: dict, target: str, now: str, set_expr: str = "", values: dict | None = None,
+               condition: str = "", names: dict | None = None) -> tuple[dict, bool]:
+    """Pasa el item `key` de `table` al estado `target` con una sola escritura condicional.
+
+    Devuelve (item ALL_NEW, True), o (item actual, False) si ya estaba en
+    `target`. Lanza TransitionError si no existe o el salto no está permitido;
+    con `condition`, un item que no la cumple también da 409 (el llamador
+    puede mirar `e.current` para distinguir el motivo).
+    """
+    kwargs = update_kwargs(key, target, now, set_expr, values, condition, names)
+    try:
+        resp = table.update_item(
+            **kwargs,
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+        current = deserialize_item(e.response.get("Item"))
+        if current and condition and current.get("status") in allowed_from(target):
+            # el estado permitía el salto: falló la condición extra
+            raise TransitionError(409, "El pedido no cumple la condición de la acción", current)
+        return rejection(current, target)
+    return resp.get("Attributes", {}), True
+
+
+def transition_item(table, key: dict, target: str, now: str, **opts) -> dict:
+    """La transición como item de TransactWriteItems (mismos argumentos que `transition`)."""
+    return {"Update": {
+        "TableName": table.name,
+        **update_kwargs(key, target, now, **opts),
+        "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+    }}
+
+
+def mirror_item(item: dict, table, key: dict) -> dict:
+    """El mismo SET de `item` aplicado sin condición a otro registro (ej. la copia en el timeline)."""
+    update = item["Update"]
+    expression = update["UpdateExpression"]
+    used = set(re.findall(r"[#:]\w+", expression))
+    mirror = {
+        "TableName": table.name,
+        "Key": key,
+        "UpdateExpression": expression,
+        "ExpressionAttributeValues": {k: v for k, v in update["ExpressionAttributeValues"].items() if k in used},
+    }
+    names = {k: v for k, v in update.get("ExpressionAttributeNames", {}).items() if k in used}
+    if names:
+        mirror["ExpressionAttributeNames"] = names
+    return {"Update": mirror}
+
+
+def transact(steps: list) -> list:
+    """Aplica varias escrituras en una sola TransactWriteItems: todas o ninguna.
+
+    steps: [(item, target, mirrors)]: `item` de TransactWriteItems, `target` el
+    estado al que lleva (None si no es una transición del grafo) y `mirrors`
+    items que solo se escriben junto con él. Un step cuyo item ya estaba en
+    `target` (reintento, o tablas desfasadas) se saca y se reintenta con el
+    resto. Devuelve, por step, si se aplicó. TransitionError si algún item
+    no existe o no puede hacer el salto.
+    """
+    applied = [False] * len(steps)
+    pending = list(range(len(steps)))
+    while pending:
+        batch = [(i, entry) for i in pending for entry in (steps[i][0], *steps[i][2])]
+        try:
+            transact_write([entry for _, entry in batch])
+        except TransactionCanceled as e:
+            done = set()
+            for (i, entry), reason in zip(batch, e.reasons):
+                if reason.get("Code") != "ConditionalCheckFailed":
+                    continue
+                if entry is not steps[i][0] or steps[i][1] is None:
+                    if not reason.get("Item"):
+                        raise TransitionError(404, "Pedido no encontrado")
+                    raise TransitionError(409, "El pedido no cumple la condición de la acción", reason.get("Item"))
+                rejection(reason.get("Item"), steps[i][1])
+                done.add(i)
+            if not done:
+                # TransactionConflict / Throttling: sin condición fallida que explicar
+                raise e.error
+            pending = [i for i in pending if i not in done]
+            continue
+        for i in pending:
+            applied[i] = True
+        break
+    return applied
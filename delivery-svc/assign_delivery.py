@@ -1,15 +1,16 @@
 import json
-import boto3
 import os
 import datetime
 from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query
+from common.transitions import transition_item, mirror_item, transact, TransitionError
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
-staff_table = dynamo.Table(os.environ["STAFF_TABLE"])
-eb = boto3.client("events")
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+staff_table = aws.lazy_table(os.environ["STAFF_TABLE"])
+eb = aws.lazy_client("events")
 
 
 def handler(event, context):
@@ -79,19 +80,20 @@ def handler(event, context):
                     "body": json.dumps({"error": "id_staff inválido: requiere rol 'delivery' activo y tenant válido"}),
                 }
         else:
-            staff_resp = staff_table.scan(
-                FilterExpression=Attr("tenant_id").eq(tenant_id)
-                & Attr("role").eq("delivery")
-                & Attr("status").eq("activo")
-            )
-            riders = staff_resp.get("Items", [])
-            if not riders:
+            rider = next(iter_query(
+                staff_table,
+                projection=["id_staff"],
+                IndexName="TenantRoleStatusIndex",
+                KeyConditionExpression=Key("tenant_id").eq(tenant_id) & Key("role_status").eq("delivery#activo"),
+                Limit=1,
+            ), None)
+            if not rider:
                 return {
                     "statusCode": 404,
                     "headers": cors_headers,
                     "body": json.dumps({"error": "No hay repartidores disponibles"}),
                 }
-            chosen_staff = riders[0]["id_staff"]
+            chosen_staff = rider["id_staff"]
 
         # Validar tenant del delivery
         d_resp = delivery_table.get_item(Key={"tenant_id": tenant_id, "id_delivery": id_delivery})
@@ -103,15 +105,17 @@ def handler(event, context):
                 "body": json.dumps({"error": "Entrega no encontrada para el tenant"}),
             }
 
-        # Verificar si el repartidor ya tiene alguna entrega activa (no entregada)
-        active_resp = delivery_table.scan(
-            FilterExpression=
-                Attr("tenant_id").eq(tenant_id)
-                & Attr("id_staff").eq(chosen_staff)
-                & Attr("status").ne("delivered")
-                & Attr("status").ne("entregado"),
-        )
-        if active_resp.get("Items"):
+        # Verificar si el repartidor ya tiene alguna entrega activa (no entregada), con
+        # cualquier estado: query por id_staff sobre StaffStatusIndex (solo claves)
+        active = next(iter_query(
+            delivery_table,
+            IndexName="StaffStatusIndex",
+            KeyConditionExpression=Key("id_staff").eq(chosen_staff),
+            FilterExpression=Attr("tenant_id").eq(tenant_id)
+            & Attr("status").ne("delivered")
+            & Attr("status").ne("entregado"),
+        ), None)
+        if active:
             return {
                 "statusCode": 400,
                 "headers": cors_headers,
@@ -120,31 +124,37 @@ def handler(event, context):
 
         now = datetime.datetime.utcnow().isoformat()
 
-        delivery_table.update_item(
-            Key={"tenant_id": tenant_id, "id_delivery": id_delivery},
-            UpdateExpression="SET id_staff=:s, #s=:st, assigned_at=:a, updated_at=:u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={
+        order_id = d_item.get("id_order") or id_order
+        delivery_update = {"Update": {
+            "TableName": delivery_table.name,
+            "Key": {"tenant_id": tenant_id, "id_delivery": id_delivery},
+            "UpdateExpression": "SET id_staff=:s, #s=:st, assigned_at=:a, updated_at=:u",
+            # no se reasigna una entrega que ya salió
+            "ConditionExpression": "attribute_exists(id_delivery) AND #s IN (:listo, :st)",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {
                 ":s": chosen_staff,
                 ":st": "asignado",
                 ":a": now,
                 ":u": now,
+                ":listo": "listo_para_entrega",
             },
-        )
-
-        # También actualizamos la orden principal a 'en_camino' para que el cliente vea el avance
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }}
+        steps = [(delivery_update, None, [])]
+        if order_id:
+            # Delivery, la orden principal ('en_camino', para que el cliente vea el avance) y la
+            # copia del timeline en una sola transacción: no quedan desfasadas si algo falla
+            steps[0][2].append(mirror_item(delivery_update, timeline.table(), timeline.stage_key(tenant_id, order_id, timeline.DELIVERY)))
+            steps.append((transition_item(orders_table, {"tenant_id": tenant_id, "id_order": order_id}, "en_camino", now), "en_camino", []))
         try:
-            order_id = d_item.get("id_order") or id_order
-            if order_id:
-                orders_table.update_item(
-                    Key={"tenant_id": tenant_id, "id_order": order_id},
-                    UpdateExpression="SET #s = :s, updated_at = :u",
-                    ExpressionAttributeNames={"#s": "status"},
-                    ExpressionAttributeValues={":s": "en_camino", ":u": now},
-                )
-        except Exception:
-            # No rompemos todo el flujo si por alguna razón no se puede actualizar la orden
-            pass
+            transact(steps)
+        except TransitionError as e:
+            return {
+                "statusCode": e.status_code,
+                "headers": cors_headers,
+                "body": json.dumps({"error": e.error}),
+            }
 
         # Incluir siempre id_order en el evento si existe, para facilitar métricas
         event_detail = {
@@ -1,12 +1,60 @@
-import json, boto3, os, datetime, uuid
+import json, os, datetime
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Attr, Key
+from common.transitions import transition_item, mirror_item, transact, TransitionError
+from common import aws, timeline
+
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
+s3 = aws.lazy_client("s3")
+
+
+def save_receipt(bucket, key, tenant_id, id_order, id_delivery, now):
+    """Construye un recibo simple de la orden y lo sube a `key`; devuelve False si falla."""
+    try:
+        order_resp = orders_table.get_item(Key={"tenant_id": tenant_id, "id_order": id_order})
+        order_item = order_resp.get("Item", {}) or {}
+
+        customer_name = order_item.get("customer_name") or order_item.get("name")
+        items_list = order_item.get("items") or []
+
+        # create_order guarda el total cotizado con el menú; las órdenes anteriores se suman acá
+        stored_total = order_item.get("total")
+        total = float(stored_total) if stored_total is not None else 0.0
+        sanitized_items = []
+        for it in items_list:
+            if not isinstance(it, dict):
+                continue
+            precio = it.get("precio") or it.get("price") or 0
+            qty = it.get("qty") or 1
+            if stored_total is None:
+                try:
+                    total += float(precio) * float(qty)
+                except Exception:
+                    pass
+            sanitized_items.append({
+                "id_producto": it.get("id_producto") or it.get("id") or it.get("sku"),
+                "nombre": it.get("nombre") or it.get("name"),
+                "precio": float(precio) if isinstance(precio, (int, float)) else float(str(precio)) if precio is not None else 0.0,
+                "qty": qty,
+            })
+
+        receipt = {
+            "id_order": id_order,
+            "id_delivery": id_delivery,
+            "tenant_id": tenant_id,
+            "customer_name": customer_name,
+            "total_paid": round(total, 2),
+            "currency": "PEN",
+            "items": sanitized_items,
+            "delivered_at": now,
+        }
+        s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(receipt, default=str), ContentType="application/json")
+        return True
+    except Exception:
+        return False
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
-s3 = boto3.client("s3")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -37,76 +85,50 @@ def handler(event, context):
         id_delivery = delivery["id_delivery"]
         now = datetime.datetime.utcnow().isoformat()
 
-        # Construir un recibo simple de la orden
-        receipt_url = None
-        try:
-            order_resp = orders_table.get_item(Key={"tenant_id": tenant_id, "id_order": id_order})
-            order_item = order_resp.get("Item", {}) or {}
-
-            customer_name = order_item.get("customer_name") or order_item.get("name")
-            items_list = order_item.get("items") or []
+        # clave fija por pedido: el recibo se sube recién cuando la transición aplica
+        bucket = os.environ.get("RECEIPTS_BUCKET")
+        receipt_key = f"{tenant_id}/{id_order}/delivery.json"
+        receipt_url = f"https://{bucket}.s3.amazonaws.com/{receipt_key}" if bucket else None
 
-            total = 0.0
-            sanitized_items = []
-            for it in items_list:
-                if not isinstance(it, dict):
-                    continue
-                precio = it.get("precio") or it.get("price") or 0
-                qty = it.get("qty") or 1
-                try:
-                    total += float(precio) * float(qty)
-                except Exception:
-                    pass
-                sanitized_items.append({
-                    "id_producto": it.get("id_producto") or it.get("id") or it.get("sku"),
-                    "nombre": it.get("nombre") or it.get("name"),
-                    "precio": float(precio) if isinstance(precio, (int, float)) else float(str(precio)) if precio is not None else 0.0,
-                    "qty": qty,
-                })
-
-            receipt = {
-                "id_order": id_order,
-                "id_delivery": id_delivery,
-                "tenant_id": tenant_id,
-                "customer_name": customer_name,
-                "total_paid": round(total, 2),
-                "currency": "PEN",
-                "items": sanitized_items,
-                "delivered_at": now,
-            }
-
-            bucket = os.environ["RECEIPTS_BUCKET"]
-            key = f"{tenant_id}/{id_order}/receipt_{uuid.uuid4()}.json"
-            s3.put_object(Bucket=bucket, Key=key, Body=json.dumps(receipt, default=str), ContentType="application/json")
-            receipt_url = f"https://{bucket}.s3.amazonaws.com/{key}"
-        except Exception:
-            # Si falla la generación del recibo, no bloqueamos la confirmación de entrega
-            receipt_url = None
-
-        delivery_table.update_item(
-            Key={"tenant_id": tenant_id, "id_delivery": id_delivery},
-            UpdateExpression="SET #s=:s, tiempo_llegada=:t, delivered_by=:by, receipt_url=:r, updated_at=:u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={
+        delivery_update = {"Update": {
+            "TableName": delivery_table.name,
+            "Key": {"tenant_id": tenant_id, "id_delivery": id_delivery},
+            "UpdateExpression": "SET #s=:s, tiempo_llegada=:t, delivered_by=:by, receipt_url=:r, updated_at=:u",
+            "ConditionExpression": "#s IN (:asignado, :en_camino)",
+            "ExpressionAttributeNames": {"#s": "status"},
+            "ExpressionAttributeValues": {
                 ":s": "entregado",
                 ":t": now,
                 ":by": staff_id or delivery.get("id_staff", "unknown"),
                 ":r": receipt_url,
                 ":u": now,
+                ":asignado": "asignado",
+                ":en_camino": "en_camino",
             },
-        )
-
-        # Mantener sincronizado el pedido principal en Orders
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }}
+        # Delivery, Orders y la copia del timeline en una sola transacción (todas o ninguna)
         try:
-            orders_table.update_item(
-                Key={"tenant_id": tenant_id, "id_order": id_order},
-                UpdateExpression="SET #s = :s, updated_at = :u",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":s": "entregado", ":u": now},
-            )
-        except Exception:
-            # No rompemos el flujo si la actualización de Orders falla por alguna razón
-            pass
+            applied = transact([
+                (delivery_update, "entregado", [mirror_item(delivery_update, timeline.table(), timeline.stage_key(tenant_id, id_order, timeline.DELIVERY))]),
+                (transition_item(orders_table, {"tenant_id": tenant_id, "id_order": id_order}, "entregado", now), "entregado", []),
+            ])
+        except TransitionError as e:
+            return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+        if not applied[0]:
+            # reintento: la entrega ya estaba confirmada, sin Order.Delivered duplicado
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Entrega confirmada", "receipt_url": delivery.get("receipt_url")})}
+
+        if receipt_url and not save_receipt(bucket, receipt_key, tenant_id, id_order, id_delivery, now):
+            # Si falla el recibo no se deshace la entrega; solo se quita el enlace
+            receipt_url = None
+            try:
+                delivery_table.update_item(
+                    Key={"tenant_id": tenant_id, "id_delivery": id_delivery},
+                    UpdateExpression="REMOVE receipt_url",
+                )
+            except ClientError:
+                pass
 
         eb.put_events(
             Entries=[
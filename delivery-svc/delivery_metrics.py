@@ -1,39 +1,128 @@
-import json, boto3, os, datetime
-from boto3.dynamodb.conditions import Attr
+import json, os, datetime
+from decimal import Decimal
+from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
+from common.dynamo import ConsumedCapacity, TransactionCanceled, iter_query, transact_write
+from common.logger import log_info
+from common import aws, checkpoints, events
+
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+analytics_table = aws.lazy_table(os.environ["ANALYTICS_TABLE"])
+eb = aws.lazy_client("events")
+
+JOB = "delivery_metrics"
+RECORD_TYPE = "delivery_rollup"
+TOTAL_ID = "DELIVERY#TOTAL"
+STAFF_PREFIX = "DELIVERY#STAFF#"
+# entregas por corrida; si hay más, la próxima sigue desde la marca
+MAX_DELIVERIES = 1000
+# TransactWriteItems admite 100 items: marca + total del tenant + repartidores
+MAX_RIDERS = 98
+
+
+def rollup_entry(tenant_id, id_metric, entregas, minutos, ultima):
+    return {
+        "Update": {
+            "TableName": analytics_table.name,
+            "Key": {"tenant_id": tenant_id, "id_metric": id_metric},
+            "UpdateExpression": "SET record_type = :rt, ultima_entrega = :u ADD entregas :e, minutos_total :m",
+            "ExpressionAttributeValues": {
+                ":rt": RECORD_TYPE,
+                ":u": ultima,
+                ":e": entregas,
+                ":m": Decimal(str(round(minutos, 2))),
+            },
+        }
+    }
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-eb = boto3.client("events")
 
 def handler(event, context):
+    """Acumula las entregas completadas desde la última corrida del tenant y publica Delivery.MetricsUpdated.
+
+    Lee TenantArrivalIndex desde la marca de avance (common.checkpoints) en vez
+    de escanear Delivery, suma en memoria por tenant (`DELIVERY#TOTAL`) y por
+    repartidor (`DELIVERY#STAFF#<id_staff>`), y escribe los acumulados junto con
+    la marca en una sola transacción. Corre con cada Order.Delivered o a mano
+    con {"tenant_id": ...}.
+    """
     try:
-        resp = delivery_table.scan(FilterExpression=Attr("status").eq("entregado"))
-        metrics = []
-        for item in resp.get("Items", []):
-            if item.get("tiempo_salida") and item.get("tiempo_llegada"):
-                start = datetime.datetime.fromisoformat(item["tiempo_salida"])
-                end = datetime.datetime.fromisoformat(item["tiempo_llegada"])
-                dur = (end - start).total_seconds() / 60.0
-                metrics.append({
-                    "order_id": item["id_order"],
-                    "tenant_id": item["tenant_id"],
-                    "id_staff": item.get("id_staff"),
-                    "tiempo_entrega": dur
-                })
+        detail = (event or {}).get("detail") or event or {}
+        tenant_id = detail.get("tenant_id")
+        if not tenant_id:
+            return {"statusCode": 400, "body": json.dumps({"error": "Evento sin tenant_id"})}
 
+        capacity = ConsumedCapacity()
+        checkpoint = checkpoints.load(tenant_id, JOB)
+        key_cond = Key("tenant_id").eq(tenant_id)
+        since = checkpoints.window_start(checkpoint)
+        if since:
+            key_cond = key_cond & Key("tiempo_llegada").gte(since)
+        delivered = iter_query(
+            delivery_table,
+            capacity,
+            projection=["id_delivery", "id_order", "id_staff", "tiempo_salida", "tiempo_llegada"],
+            IndexName="TenantArrivalIndex",
+            KeyConditionExpression=key_cond,
+            FilterExpression=Attr("status").eq("entregado"),
+        )
+
+        metrics, processed, riders = [], {}, {}
+        total = [0, 0.0]
+        for item in delivered:
+            if len(processed) >= MAX_DELIVERIES:
+                break
+            if not checkpoints.is_new(checkpoint, item["id_delivery"], item["tiempo_llegada"]):
+                continue
+            staff = item.get("id_staff")
+            if staff and staff not in riders and len(riders) >= MAX_RIDERS:
+                # el resto queda para la próxima corrida (el índice viene ordenado por llegada)
+                break
+            processed[item["id_delivery"]] = item["tiempo_llegada"]
+            if not item.get("tiempo_salida"):
+                continue
+            start = datetime.datetime.fromisoformat(item["tiempo_salida"])
+            end = datetime.datetime.fromisoformat(item["tiempo_llegada"])
+            dur = (end - start).total_seconds() / 60.0
+            metrics.append({
+                "order_id": item["id_order"],
+                "id_staff": staff,
+                "tiempo_entrega": round(dur, 2)
+            })
+            total[0] += 1
+            total[1] += dur
+            if staff:
+                acc = riders.setdefault(staff, [0, 0.0])
+                acc[0] += 1
+                acc[1] += dur
+
+        if not processed:
+            return {"statusCode": 200, "body": json.dumps({"processed": 0})}
+
+        advanced, entry = checkpoints.advance_entry(tenant_id, JOB, checkpoint, processed)
+        items = [entry]
+        if total[0]:
+            items.append(rollup_entry(tenant_id, TOTAL_ID, total[0], total[1], advanced["hwm"]))
+        for staff, (count, minutos) in riders.items():
+            items.append(rollup_entry(tenant_id, f"{STAFF_PREFIX}{staff}", count, minutos, advanced["hwm"]))
+        try:
+            transact_write(items, capacity)
+        except TransactionCanceled as e:
+            if e.reasons and e.reasons[0].get("Code") == "ConditionalCheckFailed":
+                # otra corrida tomó estas entregas
+                return {"statusCode": 200, "body": json.dumps({"processed": 0, "skipped": len(processed)})}
+            raise e.error
+
+        # los acumulados ya quedaron: si el evento falla no se vuelve atrás la marca
+        published = 0
         if metrics:
-            eb.put_events(
-                Entries=[
-                    {
-                        "Source": "delivery-svc",
-                        "DetailType": "Delivery.MetricsUpdated",
-                        "Detail": json.dumps(metrics),
-                        "EventBusName": os.environ["EVENT_BUS"]
-                    }
-                ]
-            )
-
-        return {"statusCode": 200, "body": json.dumps({"processed": len(metrics)})}
+            published = events.publish(eb, "delivery-svc", "Delivery.MetricsUpdated", metrics, {"tenant_id": tenant_id}, "metrics")
+
+        log_info("Métricas de delivery acumuladas", event, context, {
+            "tenant_id": tenant_id, "processed": len(processed), "riders": len(riders), "events": published,
+            "hwm": advanced["hwm"], "consumed_capacity": capacity.as_dict(),
+        })
+        return {"statusCode": 200, "body": json.dumps({"processed": len(metrics), "riders": len(riders), "events": published})}
+    except events.PublishError as e:
+        return {"statusCode": 502, "body": json.dumps({"error": str(e)})}
     except ClientError as e:
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
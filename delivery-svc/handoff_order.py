@@ -1,10 +1,10 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Attr, Key
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-eb = boto3.client("events")
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+eb = aws.lazy_client("events")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -33,11 +33,13 @@ def handler(event, context):
             return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Entrega no encontrada"})}
 
         delivery = items[0]
-        delivery_table.update_item(
+        resp = delivery_table.update_item(
             Key={"tenant_id": tenant_id, "id_delivery": delivery["id_delivery"]},
             UpdateExpression="SET status=:s, tiempo_salida=:t, handoff_by=:by, updated_at=:u",
-            ExpressionAttributeValues={":s": "en_camino", ":t": now, ":by": staff_id or "unknown", ":u": now}
+            ExpressionAttributeValues={":s": "en_camino", ":t": now, ":by": staff_id or "unknown", ":u": now},
+            ReturnValues="ALL_NEW",
         )
+        timeline.record(tenant_id, id_order, timeline.DELIVERY, resp.get("Attributes"))
 
         eb.put_events(
             Entries=[
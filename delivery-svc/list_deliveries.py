@@ -1,11 +1,10 @@
 import json, os
-import boto3
 from decimal import Decimal
 from boto3.dynamodb.conditions import Attr
 from botocore.exceptions import ClientError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
 
 
 def to_serializable(obj):
@@ -1,9 +1,26 @@
-import json, boto3, os
-from boto3.dynamodb.conditions import Attr
+import json, os
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query
+from common.cache import TTLCache, tenant_cached
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-staff_table = dynamo.Table(os.environ["STAFF_TABLE"])
+staff_table = aws.lazy_table(os.environ["STAFF_TABLE"])
+
+# Repartidores activos por tenant; se invalida con Staff.Updated / Staff.StatusUpdated
+_riders_cache = TTLCache(maxsize=64, ttl=60)
+
+
+def _load_riders(tenant_id):
+    # TenantRoleStatusIndex: role_status = "<role>#<status>"
+    riders = []
+    for role in ("repartidor", "delivery"):
+        riders.extend(iter_query(
+            staff_table,
+            IndexName="TenantRoleStatusIndex",
+            KeyConditionExpression=Key("tenant_id").eq(tenant_id) & Key("role_status").eq(f"{role}#activo")
+        ))
+    return riders
 
 
 def handler(event, context):
@@ -25,12 +42,7 @@ def handler(event, context):
 
         # Soportar tanto el rol antiguo 'repartidor' como el nuevo 'delivery',
         # y filtrar solo personal activo.
-        resp = staff_table.scan(
-            FilterExpression=
-                Attr("tenant_id").eq(tenant_id)
-                & Attr("role").is_in(["repartidor", "delivery"])
-                & Attr("status").eq("activo")
-        )
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
+        riders = tenant_cached(_riders_cache, "staff", tenant_id, "riders", lambda: _load_riders(tenant_id))
+        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(riders)}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
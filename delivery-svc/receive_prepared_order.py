@@ -1,9 +1,9 @@
-import json, boto3, os, uuid, datetime
+import json, os, uuid, datetime
 from botocore.exceptions import ClientError
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
 
 def handler(event, context):
     try:
@@ -27,11 +27,10 @@ def handler(event, context):
         item = {
             "id_delivery": id_delivery,
             "id_order": order_id,
-            "id_staff": None,
             "direccion": direccion,
             "customer_name": customer_name,
             "tiempo_salida": None,
-            "tiempo_llegada": None,
+            # tiempo_llegada se escribe al entregar (clave de TenantArrivalIndex: no puede ser null)
             "status": "listo_para_entrega",
             "tenant_id": tenant_id,
             "created_at": now,
@@ -43,6 +42,7 @@ def handler(event, context):
             item["dest_lng"] = dest_lng
 
         delivery_table.put_item(Item=item)
+        timeline.record(tenant_id, order_id, timeline.DELIVERY, item)
         return {"statusCode": 200, "body": json.dumps({"message": "Entrega creada", "id_delivery": id_delivery})}
     except KeyError as e:
         return {"statusCode": 400, "body": json.dumps({"error": f"Campo faltante: {e}"})}
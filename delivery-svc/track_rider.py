@@ -1,8 +1,8 @@
-import json, boto3, os
+import json, os
 from botocore.exceptions import ClientError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -1,9 +1,9 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
-eb = boto3.client("events")
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+eb = aws.lazy_client("events")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -49,12 +49,14 @@ def handler(event, context):
             update_expr += ", tiempo_llegada = :tl"
             expr_attr_values[":tl"] = now
 
-        delivery_table.update_item(
+        resp = delivery_table.update_item(
             Key={"tenant_id": tenant_id, "id_delivery": id_delivery},
             UpdateExpression=update_expr,
             ExpressionAttributeNames=expr_attr_names,
             ExpressionAttributeValues=expr_attr_values,
+            ReturnValues="ALL_NEW",
         )
+        timeline.record(tenant_id, id_order, timeline.DELIVERY, resp.get("Attributes"))
 
         event_type = "Order.EnRoute" if new_status == "en_camino" else "Order.Delivered" if new_status == "entregado" else "Delivery.Updated"
 
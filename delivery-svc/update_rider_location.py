@@ -1,9 +1,9 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
 
 def handler(event, context):
     """Actualiza la última ubicación GPS del repartidor para un delivery en_camino."""
@@ -57,14 +57,22 @@ def handler(event, context):
             "timestamp": now
         }
         
-        delivery_table.update_item(
+        resp = delivery_table.update_item(
             Key={"tenant_id": tenant_id, "id_delivery": id_delivery},
             UpdateExpression="SET last_location = :loc, updated_at = :u",
             ExpressionAttributeValues={
                 ":loc": last_location,
                 ":u": now
-            }
+            },
+            ReturnValues="ALL_NEW",
         )
+        # el mapa de seguimiento lee la ubicación desde el timeline
+        timeline.record(tenant_id, id_order, timeline.DELIVERY, resp.get("Attributes"))
+        try:
+            # la ubicación es parte de GET /orders/{id}/status: nueva versión para los clientes en long-poll
+            timeline.bump_status(tenant_id, id_order, {"updated_at": now})
+        except ClientError:
+            pass
         
         return {
             "statusCode": 200,
@@ -1,8 +1,9 @@
-import json, boto3, os
+import json, os
 from botocore.exceptions import ClientError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-staff_table = dynamo.Table(os.environ["STAFF_TABLE"])
+staff_table = aws.lazy_table(os.environ["STAFF_TABLE"])
+eb = aws.lazy_client("events")
 
 
 def handler(event, context):
@@ -27,12 +28,36 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
+        staff = staff_table.get_item(
+            Key={"tenant_id": tenant_id, "id_staff": id_staff},
+            ProjectionExpression="#r",
+            ExpressionAttributeNames={"#r": "role"},
+        ).get("Item")
+        if not staff:
+            return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Repartidor no encontrado"})}
+
+        # role_status es la clave de TenantRoleStatusIndex y se mantiene junto con status
         staff_table.update_item(
             Key={"tenant_id": tenant_id, "id_staff": id_staff},
-            UpdateExpression="SET #s=:s",
+            UpdateExpression="SET #s=:s, role_status=:rs",
             ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": status}
+            ExpressionAttributeValues={":s": status, ":rs": f"{staff.get('role', 'staff')}#{status}"}
         )
+
+        # Invalida la caché de repartidores (Staff.Updated dispararía también collect_staff_metrics)
+        try:
+            eb.put_events(
+                Entries=[
+                    {
+                        "Source": "delivery-svc",
+                        "DetailType": "Staff.StatusUpdated",
+                        "Detail": json.dumps({"id_staff": id_staff, "tenant_id": tenant_id, "status": status}),
+                        "EventBusName": os.environ["EVENT_BUS"]
+                    }
+                ]
+            )
+        except Exception:
+            pass
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Estado de repartidor actualizado"})}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
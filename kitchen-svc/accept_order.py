@@ -1,10 +1,12 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common.kitchen_actions import accept_steps, workflow_arn
+from common.transitions import transact, TransitionError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -30,31 +32,15 @@ def handler(event, context):
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
         now = datetime.datetime.utcnow().isoformat()
-        table.update_item(
-            Key={"tenant_id": tenant_id, "order_id": order_id},
-            UpdateExpression="SET #s = :s, list_id_staff = list_append(if_not_exists(list_id_staff, :empty), :sid), start_time = :st, accepted_by = :by, accepted_at = :st, updated_at = :u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={
-                ":s": "en_preparacion",
-                ":sid": [staff_id],
-                ":empty": [],
-                ":st": now,
-                ":by": staff_id,
-                ":u": now,
-            },
-        )
-
-        # Mantener sincronizada la tabla Orders con el estado de cocina
+        # Kitchen, Orders y la copia del timeline en una sola transacción: solo un cocinero
+        # acepta (condición sobre el estado) y Orders no queda desfasado si algo falla
         try:
-            orders_table.update_item(
-                Key={"tenant_id": tenant_id, "id_order": order_id},
-                UpdateExpression="SET #s = :s, updated_at = :u",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":s": "en_preparacion", ":u": now},
-            )
-        except Exception:
-            # No rompemos el flujo de cocina si fallara esta actualización
-            pass
+            applied = transact(accept_steps(table, orders_table, tenant_id, order_id, staff_id, now))
+        except TransitionError as e:
+            return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+        if not applied[0]:
+            # reintento: el pedido ya estaba aceptado, sin evento ni workflow duplicados
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Pedido en preparación", "order_id": order_id})}
 
         eb.put_events(
             Entries=[
@@ -69,18 +55,8 @@ def handler(event, context):
 
         # Iniciar Step Functions (best-effort) cuando cocina acepta el pedido
         try:
-            sfn = boto3.client("stepfunctions")
-            sfn_arn = os.environ.get("ORDER_SFN_ARN")
-            if not sfn_arn:
-                target_name = os.environ.get("ORDER_SFN_NAME", "papasqueens-order-workflow")
-                paginator = sfn.get_paginator("list_state_machines")
-                for page in paginator.paginate():
-                    for sm in page.get("stateMachines", []):
-                        if sm.get("name") == target_name:
-                            sfn_arn = sm.get("stateMachineArn")
-                            break
-                    if sfn_arn:
-                        break
+            sfn = aws.client("stepfunctions")
+            sfn_arn = workflow_arn(sfn)
 
             if sfn_arn:
                 sfn_input = {"id_order": order_id, "tenant_id": tenant_id}
@@ -0,0 +1,78 @@
+import json, os, datetime
+from botocore.exceptions import ClientError
+from common.kitchen_actions import accept_steps, apply_many, publish_many, start_workflows
+from common.logger import log_info, log_error
+from common import aws
+
+table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
+
+MAX_ORDERS = 50
+
+
+def handler(event, context):
+    """POST /kitchen/orders/batch/accept: acepta varios tickets en una solicitud, con resultado por pedido.
+
+    Body: {"order_ids": ["...", ...], "id_staff": "..."}. Cada pedido es la
+    misma transacción que POST /kitchen/orders/{order_id}/accept; se corren en
+    paralelo, Order.Updated sale de a 10 por PutEvents y los workflows se
+    inician en paralelo (best-effort).
+    """
+    headers_in = event.get("headers", {}) or {}
+    cors_headers = {
+        "Access-Control-Allow-Origin": headers_in.get("Origin") or headers_in.get("origin") or "*",
+        "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization",
+        "Access-Control-Allow-Methods": "OPTIONS,POST",
+        "Content-Type": "application/json",
+    }
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        qs = event.get("queryStringParameters") or {}
+        staff_id = body.get("id_staff") or headers_in.get("X-User-Id") or headers_in.get("x-user-id")
+        tenant_id = headers_in.get("X-Tenant-Id") or headers_in.get("x-tenant-id") or qs.get("tenant_id")
+
+        if not tenant_id:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
+        order_ids = body.get("order_ids")
+        if not isinstance(order_ids, list) or not order_ids or not all(isinstance(o, str) and o for o in order_ids):
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Debe incluir una lista de pedidos en 'order_ids'"})}
+        # un mismo pedido dos veces chocaría consigo mismo en paralelo
+        order_ids = list(dict.fromkeys(order_ids))
+        if len(order_ids) > MAX_ORDERS:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": f"Máximo {MAX_ORDERS} pedidos por solicitud"})}
+
+        now = datetime.datetime.utcnow().isoformat()
+        outcomes = apply_many(lambda oid: accept_steps(table, orders_table, tenant_id, oid, staff_id, now), order_ids)
+
+        # reintentos (ya aceptados) no repiten evento ni workflow
+        accepted = [oid for oid in order_ids if outcomes[oid].get("applied")]
+        not_published = publish_many(eb, "Order.Updated", [
+            {"order_id": oid, "tenant_id": tenant_id, "status": "en_preparacion"} for oid in accepted
+        ])
+        if not_published:
+            log_error("Pedidos aceptados sin evento Order.Updated", None, event, context, {"order_ids": sorted(not_published)})
+        not_started = start_workflows(tenant_id, accepted)
+
+        results = []
+        for oid in order_ids:
+            result = {"order_id": oid, **outcomes[oid]}
+            if result.get("applied"):
+                result["event_published"] = oid not in not_published
+                result["workflow_started"] = oid not in not_started
+            results.append(result)
+        failed = sum(1 for r in results if r["statusCode"] != 200)
+        log_info("Pedidos aceptados en lote", event, context, {
+            "tenant_id": tenant_id, "accepted": len(accepted), "failed": failed, "workflows_failed": len(not_started),
+        })
+        return {
+            "statusCode": 200 if not failed else 207,
+            "headers": cors_headers,
+            "body": json.dumps({"accepted": len(accepted), "failed": failed, "results": results}),
+        }
+
+    except json.JSONDecodeError:
+        return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Body JSON inválido"})}
+    except ClientError as e:
+        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
@@ -1,10 +1,11 @@
-import json, boto3, os, uuid, datetime, base64
+import json, os, uuid, datetime, base64
 from common.jwt_utils import verify_jwt
 from botocore.exceptions import ClientError
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["MENU_TABLE"])
-s3 = boto3.client("s3")
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+s3 = aws.lazy_client("s3")
+eb = aws.lazy_client("events")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -54,7 +55,25 @@ def handler(event, context):
             "created_at": now,
             "updated_at": now
         }
+        category = menu.category_value(item)
+        if category:
+            item[menu.CATEGORY_KEY] = category
         table.put_item(Item=item)
+
+        # Avisar del cambio de menú (invalida cachés de listados); no bloquea la respuesta
+        try:
+            eb.put_events(
+                Entries=[
+                    {
+                        "Source": "kitchen-svc",
+                        "DetailType": "Menu.Updated",
+                        "Detail": json.dumps({"tenant_id": tenant_id, "id_producto": id_producto, "action": "created"}),
+                        "EventBusName": os.environ["EVENT_BUS"]
+                    }
+                ]
+            )
+        except Exception:
+            pass
         return {"statusCode": 201, "headers": cors_headers, "body": json.dumps({"message": "Producto agregado", "id_producto": id_producto})}
 
     except KeyError as e:
@@ -0,0 +1,48 @@
+import json, os
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from common.dynamo import ConsumedCapacity, iter_parallel_scan
+from common.logger import log_info
+from common import aws, menu
+
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+
+
+def handler(event, context):
+    """Completa tenant_categoria en productos creados antes de TenantCategoryIndex (invocación manual).
+
+    Solo toca los productos disponibles que aún no lo tienen, así que se puede
+    relanzar si se corta por timeout. `tenant_id` en el evento limita el backfill a un tenant.
+    """
+    try:
+        tenant_id = (event or {}).get("tenant_id")
+        capacity = ConsumedCapacity()
+
+        pending = Attr(menu.CATEGORY_KEY).not_exists() & Attr("available").eq(True) & Attr("categoria").exists()
+        if tenant_id:
+            pending = pending & Attr("tenant_id").eq(tenant_id)
+
+        updated = 0
+        for item in iter_parallel_scan(table, capacity, projection=["tenant_id", "id_producto", "categoria"], FilterExpression=pending):
+            try:
+                table.update_item(
+                    Key={"tenant_id": item["tenant_id"], "id_producto": item["id_producto"]},
+                    UpdateExpression="SET #k = :k",
+                    # se saltea si el producto se ocultó o se borró durante el backfill
+                    ConditionExpression="available = :t AND categoria = :c",
+                    ExpressionAttributeNames={"#k": menu.CATEGORY_KEY},
+                    ExpressionAttributeValues={
+                        ":k": menu.category_key(item["tenant_id"], item["categoria"]),
+                        ":t": True,
+                        ":c": item["categoria"],
+                    },
+                )
+                updated += 1
+            except ClientError as e:
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+
+        log_info("Backfill de TenantCategoryIndex", event, context, {"tenant_id": tenant_id, "updated": updated, "consumed_capacity": capacity.as_dict()})
+        return {"statusCode": 200, "body": json.dumps({"message": "Backfill completado", "updated": updated})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -0,0 +1,39 @@
+import json, os
+from botocore.exceptions import ClientError
+from boto3.dynamodb.conditions import Key
+from common.dynamo import iter_query
+from common.logger import log_info, log_error
+from common import aws, menu
+
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+
+
+def handler(event, context):
+    """Regenera el snapshot del menú del tenant en MENU_BUCKET (Menu.Updated o invocación manual).
+
+    Lee el menú completo con lectura consistente, así el snapshot refleja el
+    cambio que disparó el evento. Corre con concurrencia 1 (functions.yml):
+    dos cambios seguidos no pueden dejar el puntero en el más viejo.
+
+    Si el build falla se borra el puntero (los listados leen MenuItems, nunca
+    un menú viejo) y se relanza el error para que Lambda reintente el evento.
+    """
+    detail = (event or {}).get("detail") or event or {}
+    tenant_id = detail.get("tenant_id")
+    if not tenant_id:
+        return {"statusCode": 400, "body": json.dumps({"error": "Evento sin tenant_id"})}
+
+    try:
+        items = list(iter_query(table, KeyConditionExpression=Key("tenant_id").eq(tenant_id), ConsistentRead=True))
+        pointer, changed = menu.publish_snapshot(tenant_id, items)
+        etags = {view: ref["etag"] for view, ref in pointer["views"].items()}
+
+        log_info("Snapshot del menú", event, context, {"tenant_id": tenant_id, "items": len(items), "changed": changed, "etags": etags})
+        return {"statusCode": 200, "body": json.dumps({"tenant_id": tenant_id, "changed": changed, "etags": etags})}
+    except ClientError as e:
+        log_error("Falló el snapshot del menú", e, event, context, {"tenant_id": tenant_id})
+        try:
+            menu.drop_snapshot(tenant_id)
+        except ClientError as drop_error:
+            log_error("No se pudo borrar el puntero del snapshot", drop_error, event, context, {"tenant_id": tenant_id})
+        raise
@@ -1,9 +1,10 @@
-import json, boto3, os
+import json, os
 from common.jwt_utils import verify_jwt
 from botocore.exceptions import ClientError
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["MENU_TABLE"])
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+eb = aws.lazy_client("events")
 
 
 def handler(event, context):
@@ -40,9 +41,26 @@ def handler(event, context):
 
         table.update_item(
             Key={"tenant_id": tenant_id, "id_producto": id_producto},
-            UpdateExpression="SET available = :a",
+            # fuera de TenantCategoryIndex (el índice solo tiene productos disponibles)
+            UpdateExpression="SET available = :a REMOVE #k",
+            ExpressionAttributeNames={"#k": menu.CATEGORY_KEY},
             ExpressionAttributeValues={":a": False}
         )
+
+        # Avisar del cambio de menú (invalida cachés de listados); no bloquea la respuesta
+        try:
+            eb.put_events(
+                Entries=[
+                    {
+                        "Source": "kitchen-svc",
+                        "DetailType": "Menu.Updated",
+                        "Detail": json.dumps({"tenant_id": tenant_id, "id_producto": id_producto, "action": "disabled"}),
+                        "EventBusName": os.environ["EVENT_BUS"]
+                    }
+                ]
+            )
+        except Exception:
+            pass
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Producto desactivado"})}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -1,11 +1,16 @@
-import json, boto3, os
+import json, os
+from itertools import islice
 from decimal import Decimal
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query, batch_get_items
+from common import aws, kitchen_queue
 
-dynamo = boto3.resource("dynamodb")
-kitchen_table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
 
 
 def to_serializable(obj):
@@ -21,6 +26,30 @@ def to_serializable(obj):
         return [to_serializable(v) for v in obj]
     return obj
 
+def read_queue(tenant_id, limit, station=None):
+    """Los primeros `limit` tickets en cola, ya ordenados por start_by (KitchenQueueIndex).
+
+    Un ticket que salió de la cola pero aún no perdió la clave se descarta por estado.
+    """
+    cond = Attr("status").is_in(list(kitchen_queue.QUEUED))
+    if station:
+        cond = cond & Attr(f"stations.{station}").exists()
+    return list(islice(iter_query(
+        kitchen_table,
+        IndexName=kitchen_queue.QUEUE_INDEX,
+        KeyConditionExpression=Key(kitchen_queue.QUEUE_KEY).eq(tenant_id),
+        FilterExpression=cond,
+        Limit=limit,
+    ), limit))
+
+def by_station(items, load):
+    """Tickets agrupados por estación, para preparar en tanda lo de cada una."""
+    stations = {name: {"pending_minutes": minutes, "order_ids": []} for name, minutes in load.items()}
+    for it in items:
+        for name in (it.get("stations") or {}):
+            stations.setdefault(name, {"pending_minutes": 0, "order_ids": []})["order_ids"].append(it.get("order_id"))
+    return stations
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
@@ -34,27 +63,47 @@ def handler(event, context):
         qs = event.get("queryStringParameters") or {}
         tenant_id = headers_in.get("X-Tenant-Id") or headers_in.get("x-tenant-id") or qs.get("tenant_id") or "default"
 
-        resp = kitchen_table.scan(
-            FilterExpression=Attr("status").is_in(["recibido", "en_preparacion"]) & Attr("tenant_id").eq(tenant_id)
-        )
-        items = resp.get("Items", [])
+        try:
+            limit = max(1, min(int(qs.get("limit") or DEFAULT_LIMIT), MAX_LIMIT))
+        except ValueError:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "limit debe ser un número"})}
+
+        # tickets anteriores a la cola planificada: se planifican en la primera lectura
+        # del contenedor; si falla se reintenta en la próxima
+        try:
+            kitchen_queue.ensure_reconciled(tenant_id)
+        except ClientError:
+            pass
+
+        # O(k): solo los primeros `limit` tickets de la cola planificada
+        items = read_queue(tenant_id, limit, qs.get("station"))
 
-        # Enriquecer con info de cliente desde Orders si falta
+        # Enriquecer con info de cliente desde Orders si falta (receive_order ya la copia,
+        # esto cubre tickets antiguos): un solo BatchGetItem para todos los pedidos faltantes
+        missing = []
         for it in items:
             has_name = bool(it.get("customer_name") or it.get("customer"))
             has_addr = bool(it.get("delivery_address"))
-            if has_name and has_addr:
-                continue
-
             order_id = it.get("order_id") or it.get("id_order") or it.get("id")
-            if not order_id:
-                continue
+            if order_id and not (has_name and has_addr):
+                missing.append((it, order_id, has_name, has_addr))
+
+        orders_by_id = {}
+        if missing:
             try:
-                o_resp = orders_table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
-                o_item = o_resp.get("Item") or {}
+                orders_by_id = {
+                    o["id_order"]: o
+                    for o in batch_get_items(
+                        orders_table,
+                        [{"tenant_id": tenant_id, "id_order": order_id} for _, order_id, _, _ in missing],
+                        projection=["id_order", "customer_name", "customer", "name", "delivery_address", "address", "direccion"],
+                    )
+                }
             except Exception:
-                o_item = {}
+                orders_by_id = {}
 
+        for it, order_id, has_name, has_addr in missing:
+            o_item = orders_by_id.get(order_id)
             if o_item:
                 if not has_name:
                     name = o_item.get("customer_name") or o_item.get("customer") or o_item.get("name")
@@ -65,10 +114,12 @@ def handler(event, context):
                     if addr:
                         it["delivery_address"] = addr
 
-        def keyf(x):
-            return (x.get("created_at") or x.get("start_time") or "")
-        items.sort(key=keyf)
+        # hora estimada de salida según la carga de cada estación
+        load = kitchen_queue.schedule(items)
 
+        if qs.get("view") == "stations":
+            result = {"items": items, "stations": by_station(items, load)}
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(result))}
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(items))}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -0,0 +1,28 @@
+import json
+from botocore.exceptions import ClientError
+from common.cache import ALL_TENANTS, bump_version
+
+# detail-type -> namespace de caché afectado
+NAMESPACES = {
+    "Staff.Updated": "staff",
+    "Staff.StatusUpdated": "staff",
+    "Menu.Updated": "menu",
+}
+
+
+def handler(event, context):
+    try:
+        detail = event.get("detail", {}) or {}
+        namespace = NAMESPACES.get(event.get("detail-type"))
+        tenant_id = detail.get("tenant_id")
+        if not namespace or not tenant_id:
+            return {"statusCode": 400, "body": json.dumps({"error": "Evento sin namespace o tenant_id"})}
+
+        bump_version(namespace, tenant_id)
+        # list_products cachea el listado de todos los tenants
+        if namespace == "menu":
+            bump_version(namespace, ALL_TENANTS)
+
+        return {"statusCode": 200, "body": json.dumps({"message": "Caché invalidada", "namespace": namespace, "tenant_id": tenant_id})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -1,10 +1,15 @@
-import json, boto3, os
+import json, os
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Key
 from decimal import Decimal
+from common.dynamo import iter_query
+from common.cache import TTLCache, tenant_cached
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["MENU_TABLE"])
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+
+# Menú por tenant; se invalida con Menu.Updated (ver common/cache.py)
+_menu_cache = TTLCache(maxsize=64, ttl=300)
 
 
 def _convert_decimals(obj):
@@ -37,11 +42,19 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        resp = table.query(
+        # Snapshot precalculado en S3 (ETag / ?redirect=1); si el tenant aún no
+        # tiene o S3 falla, se arma desde MenuItems como antes
+        try:
+            snapshot = menu.snapshot_response(event, tenant_id, "all", cors_headers)
+        except ClientError:
+            snapshot = None
+        if snapshot:
+            return snapshot
+
+        safe_items = tenant_cached(_menu_cache, "menu", tenant_id, "all", lambda: _convert_decimals(list(iter_query(
+            table,
             KeyConditionExpression=Key("tenant_id").eq(tenant_id)
-        )
-        items = resp.get("Items", [])
-        safe_items = _convert_decimals(items)
+        ))))
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(safe_items)}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -1,9 +1,14 @@
-import json, boto3, os
+import json, os
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from common.dynamo import iter_query
+from common.cache import TTLCache, tenant_cached
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["STAFF_TABLE"])
+table = aws.lazy_table(os.environ["STAFF_TABLE"])
+
+# Staff por tenant; se invalida con Staff.Updated (ver common/cache.py)
+_staff_cache = TTLCache(maxsize=64, ttl=60)
 
 
 def handler(event, context):
@@ -23,9 +28,10 @@ def handler(event, context):
 
         # La tabla Staff tiene como clave de partición tenant_id, así que podemos
         # consultar directamente sin usar un índice secundario.
-        resp = table.query(
+        items = tenant_cached(_staff_cache, "staff", tenant_id, "all", lambda: list(iter_query(
+            table,
             KeyConditionExpression=Key("tenant_id").eq(tenant_id)
-        )
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
+        )))
+        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(items)}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -1,13 +1,12 @@
-import json, boto3, os, uuid, datetime
+import json, os, uuid, datetime
 from botocore.exceptions import ClientError
 import base64
-import bcrypt
 from common.jwt_utils import verify_jwt
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["STAFF_TABLE"])
-eb = boto3.client("events")
-s3 = boto3.client("s3")
+table = aws.lazy_table(os.environ["STAFF_TABLE"])
+eb = aws.lazy_client("events")
+s3 = aws.lazy_client("s3")
 
 def _cors(event):
     headers_in = event.get("headers", {}) or {}
@@ -20,6 +19,7 @@ def _cors(event):
 
 
 def hash_password(password):
+    import bcrypt  # import diferido: fuera del cold start
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
@@ -51,7 +51,7 @@ def manage_staff(event, context):
 
         now = datetime.datetime.utcnow().isoformat()
         
-        existing_staff = table.get_item(Key={"id_staff": id_staff}).get("Item")
+        existing_staff = table.get_item(Key={"tenant_id": tenant_id, "id_staff": id_staff}).get("Item")
         is_new = existing_staff is None
         
         # validate role
@@ -65,6 +65,8 @@ def manage_staff(event, context):
             "role": role,
             "email": email,
             "status": status,
+            # clave de TenantRoleStatusIndex
+            "role_status": f"{role}#{status}",
             "updated_at": now
         }
         
@@ -1,11 +1,13 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
 import base64
+from common.kitchen_actions import pack_steps, put_receipt
+from common.transitions import transact, TransitionError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
 
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
@@ -31,37 +33,20 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
 
-        table.update_item(
-            Key={"tenant_id": tenant_id, "order_id": order_id},
-            UpdateExpression="SET #s = :s, end_time = :et, packed_at = :et, packed_by = if_not_exists(packed_by, :by), updated_at = :u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": "listo_para_entrega", ":et": now, ":by": staff_id or "unknown", ":u": now}
-        )
-
+        # Kitchen, Orders y la copia del timeline en una sola transacción (todas o ninguna)
         try:
-            orders_table.update_item(
-                Key={"tenant_id": tenant_id, "id_order": order_id},
-                UpdateExpression="SET #s = :s, updated_at = :u",
-                ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":s": "listo_para_entrega", ":u": now}
-            )
-        except Exception:
-            pass
+            applied = transact(pack_steps(table, orders_table, tenant_id, order_id, staff_id, now))
+        except TransitionError as e:
+            return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+        if not applied[0]:
+            # reintento: ya estaba empacado, no se repite el recibo ni Order.Prepared
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Pedido listo para entrega", "order_id": order_id})}
 
-        resp = table.get_item(Key={"tenant_id": tenant_id, "order_id": order_id})
+        resp = table.get_item(Key={"tenant_id": tenant_id, "order_id": order_id}, ConsistentRead=True)
         pedido = resp.get("Item", {})
         tenant_id = pedido.get("tenant_id", "default")
 
-        recibo = f"""RECIBO DE PEDIDO\nOrder ID: {order_id}\nTenant: {tenant_id}\nEstado: {pedido.get('status')}\nTiempos: {pedido.get('start_time')} a {now}\nPersonal asignado: {','.join(pedido.get('list_id_staff', []))}\n"""
-
-        s3 = boto3.client("s3")
-        key = f"{tenant_id}/{order_id}/receipt.txt"
-        s3.put_object(
-            Bucket=os.environ.get("RECEIPTS_BUCKET"),
-            Key=key,
-            Body=recibo.encode("utf-8"),
-            ContentType="text/plain"
-        )
+        put_receipt(aws.client("s3"), tenant_id, order_id, pedido, now)
 
         eb.put_events(
             Entries=[
@@ -0,0 +1,100 @@
+import json, os, datetime
+from botocore.exceptions import ClientError
+from common.dynamo import batch_get_items, run_parallel
+from common.kitchen_actions import pack_steps, apply_many, publish_many, put_receipt, MAX_WORKERS
+from common.logger import log_info, log_error
+from common import aws
+
+table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
+
+MAX_ORDERS = 50
+
+
+def save_receipts(tenant_id, tickets, now):
+    """Sube los recibos en paralelo; devuelve los order_id cuyo recibo falló."""
+    s3 = aws.client("s3")
+
+    def save(ticket):
+        try:
+            put_receipt(s3, tenant_id, ticket["order_id"], ticket, now)
+            return True
+        except ClientError:
+            return False
+
+    saved = run_parallel({t["order_id"]: (lambda t=t: save(t)) for t in tickets}, max_workers=MAX_WORKERS)
+    return {oid for oid, ok in saved.items() if not ok}
+
+
+def handler(event, context):
+    """POST /kitchen/orders/batch/pack: empaca varios tickets en una solicitud, con resultado por pedido.
+
+    Body: {"order_ids": ["...", ...], "id_staff": "..."}. Cada pedido es la
+    misma transacción que POST /kitchen/orders/{order_id}/pack; se corren en
+    paralelo, los tickets empacados se releen con un BatchGetItem, los recibos
+    se suben en paralelo y Order.Prepared sale de a 10 por PutEvents.
+    """
+    headers_in = event.get("headers", {}) or {}
+    cors_headers = {
+        "Access-Control-Allow-Origin": headers_in.get("Origin") or headers_in.get("origin") or "*",
+        "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization",
+        "Access-Control-Allow-Methods": "OPTIONS,POST",
+        "Content-Type": "application/json",
+    }
+
+    try:
+        body = json.loads(event.get("body") or "{}")
+        qs = event.get("queryStringParameters") or {}
+        staff_id = body.get("id_staff") or headers_in.get("X-User-Id") or headers_in.get("x-user-id")
+        tenant_id = headers_in.get("X-Tenant-Id") or headers_in.get("x-tenant-id") or qs.get("tenant_id")
+
+        if not tenant_id:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
+        order_ids = body.get("order_ids")
+        if not isinstance(order_ids, list) or not order_ids or not all(isinstance(o, str) and o for o in order_ids):
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Debe incluir una lista de pedidos en 'order_ids'"})}
+        # un mismo pedido dos veces chocaría consigo mismo en paralelo
+        order_ids = list(dict.fromkeys(order_ids))
+        if len(order_ids) > MAX_ORDERS:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": f"Máximo {MAX_ORDERS} pedidos por solicitud"})}
+
+        now = datetime.datetime.utcnow().isoformat()
+        outcomes = apply_many(lambda oid: pack_steps(table, orders_table, tenant_id, oid, staff_id, now), order_ids)
+
+        # reintentos (ya empacados) no repiten recibo ni Order.Prepared
+        packed = [oid for oid in order_ids if outcomes[oid].get("applied")]
+        not_saved, not_published = set(), set()
+        if packed:
+            tickets = batch_get_items(
+                table,
+                [{"tenant_id": tenant_id, "order_id": oid} for oid in packed],
+                projection=["order_id", "status", "start_time", "list_id_staff"],
+                consistent=True,
+            )
+            not_saved = save_receipts(tenant_id, tickets, now)
+            if not_saved:
+                log_error("Pedidos empacados sin recibo", None, event, context, {"order_ids": sorted(not_saved)})
+            not_published = publish_many(eb, "Order.Prepared", [{"order_id": oid, "tenant_id": tenant_id} for oid in packed])
+            if not_published:
+                log_error("Pedidos empacados sin evento Order.Prepared", None, event, context, {"order_ids": sorted(not_published)})
+
+        results = []
+        for oid in order_ids:
+            result = {"order_id": oid, **outcomes[oid]}
+            if result.get("applied"):
+                result["receipt_saved"] = oid not in not_saved
+                result["event_published"] = oid not in not_published
+            results.append(result)
+        failed = sum(1 for r in results if r["statusCode"] != 200)
+        log_info("Pedidos empacados en lote", event, context, {"tenant_id": tenant_id, "packed": len(packed), "failed": failed})
+        return {
+            "statusCode": 200 if not failed else 207,
+            "headers": cors_headers,
+            "body": json.dumps({"packed": len(packed), "failed": failed, "results": results}),
+        }
+
+    except json.JSONDecodeError:
+        return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Body JSON inválido"})}
+    except ClientError as e:
+        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
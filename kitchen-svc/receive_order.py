@@ -1,9 +1,9 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common import aws, kitchen_queue, timeline
 
-dynamo = boto3.resource("dynamodb")
-kitchen_table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
 
 def handler(event, context):
     try:
@@ -26,20 +26,35 @@ def handler(event, context):
             "list_id_staff": [],
             "status": "recibido",
             "start_time": None,
-            "end_time": None,
+            # end_time se escribe al empacar (clave de TenantEndTimeIndex: no puede ser null)
             "updated_at": now,
         }
 
-        # Copiar algunos campos útiles para la UI de cocina
+        # Copiar algunos campos útiles para la UI de cocina (la cola no necesita leer Orders)
         if order_item:
-            if order_item.get("customer_name"):
-                item["customer_name"] = order_item["customer_name"]
-            if order_item.get("delivery_address"):
-                item["delivery_address"] = order_item["delivery_address"]
+            name = order_item.get("customer_name") or order_item.get("customer") or order_item.get("name")
+            if name:
+                item["customer_name"] = name
+            addr = order_item.get("delivery_address") or order_item.get("address") or order_item.get("direccion")
+            if addr:
+                item["delivery_address"] = addr
             if order_item.get("id_customer"):
                 item["id_customer"] = order_item["id_customer"]
+            # para los KPIs de tiempo recibido -> aceptado
+            if order_item.get("created_at"):
+                item["order_created_at"] = order_item["created_at"]
+
+        # Plan de cocina (minutos por estación, hora prometida) y lugar en KitchenQueueIndex
+        order_for_plan = {**order_item, "created_at": order_item.get("created_at") or now}
+        try:
+            plan = kitchen_queue.plan_order(tenant_id, order_for_plan)
+        except ClientError:
+            # sin menú no se frena la cocina: tiempos por defecto
+            plan = kitchen_queue.build_plan(kitchen_queue.order_lines(order_for_plan), {}, order_for_plan["created_at"])
+        item.update(kitchen_queue.ticket_fields(tenant_id, order_id, plan))
 
         kitchen_table.put_item(Item=item)
+        timeline.record(tenant_id, order_id, timeline.KITCHEN, item)
         return {"statusCode": 200, "body": json.dumps({"message": "Pedido recibido en cocina", "order_id": order_id})}
 
     except KeyError as e:
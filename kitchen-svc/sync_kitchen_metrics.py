@@ -1,37 +1,79 @@
-import json, boto3, os, datetime
-from boto3.dynamodb.conditions import Attr
+import json, os, datetime
+from itertools import islice
+from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
+from common.dynamo import ConsumedCapacity, iter_query
+from common.logger import log_info
+from common import aws, checkpoints, events
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+eb = aws.lazy_client("events")
+
+JOB = "kitchen_metrics"
+# tickets por corrida; si hay más, la próxima sigue desde la marca
+MAX_TICKETS = 1000
 
 def handler(event, context):
+    """Publica Kitchen.MetricsUpdated con los tickets terminados desde la última corrida del tenant.
+
+    Lee TenantEndTimeIndex desde la marca de avance (common.checkpoints) en vez
+    de escanear Kitchen, y reparte los tiempos en eventos que respetan los
+    límites de PutEvents. Corre con cada Order.Prepared o a mano con {"tenant_id": ...}.
+    """
     try:
-        resp = table.scan(FilterExpression=Attr("status").eq("listo_para_entrega"))
-        metrics = []
-        for item in resp.get("Items", []):
-            if item.get("start_time") and item.get("end_time"):
+        detail = (event or {}).get("detail") or event or {}
+        tenant_id = detail.get("tenant_id")
+        if not tenant_id:
+            return {"statusCode": 400, "body": json.dumps({"error": "Evento sin tenant_id"})}
+
+        capacity = ConsumedCapacity()
+        checkpoint = checkpoints.load(tenant_id, JOB)
+        key_cond = Key("tenant_id").eq(tenant_id)
+        since = checkpoints.window_start(checkpoint)
+        if since:
+            key_cond = key_cond & Key("end_time").gte(since)
+        finished = iter_query(
+            table,
+            capacity,
+            projection=["order_id", "start_time", "end_time"],
+            IndexName="TenantEndTimeIndex",
+            KeyConditionExpression=key_cond,
+        )
+
+        metrics, processed = [], {}
+        for item in islice((it for it in finished if checkpoints.is_new(checkpoint, it["order_id"], it["end_time"])), MAX_TICKETS):
+            processed[item["order_id"]] = item["end_time"]
+            if item.get("start_time"):
                 start = datetime.datetime.fromisoformat(item["start_time"])
                 end = datetime.datetime.fromisoformat(item["end_time"])
-                dur = (end - start).total_seconds() / 60.0
                 metrics.append({
                     "order_id": item["order_id"],
-                    "tenant_id": item["tenant_id"],
-                    "tiempo_total": dur
+                    "tiempo_total": round((end - start).total_seconds() / 60.0, 2)
                 })
 
-        if metrics:
-            eb.put_events(
-                Entries=[
-                    {
-                        "Source": "kitchen-svc",
-                        "DetailType": "Kitchen.MetricsUpdated",
-                        "Detail": json.dumps(metrics),
-                        "EventBusName": os.environ["EVENT_BUS"]
-                    }
-                ]
-            )
-        return {"statusCode": 200, "body": json.dumps({"processed": len(metrics)})}
+        if not processed:
+            return {"statusCode": 200, "body": json.dumps({"processed": 0})}
+
+        advanced = checkpoints.advance(tenant_id, JOB, checkpoint, processed)
+        if advanced is None:
+            # otra corrida tomó estos tickets
+            return {"statusCode": 200, "body": json.dumps({"processed": 0, "skipped": len(processed)})}
+
+        published = 0
+        try:
+            if metrics:
+                published = events.publish(eb, "kitchen-svc", "Kitchen.MetricsUpdated", metrics, {"tenant_id": tenant_id}, "metrics")
+        except (ClientError, events.PublishError):
+            # devolver la ventana para que la próxima corrida la reintente
+            checkpoints.restore(tenant_id, JOB, advanced, checkpoint)
+            raise
+
+        log_info("Métricas de cocina sincronizadas", event, context, {
+            "tenant_id": tenant_id, "processed": len(processed), "events": published,
+            "hwm": advanced["hwm"], "consumed_capacity": capacity.as_dict(),
+        })
+        return {"statusCode": 200, "body": json.dumps({"processed": len(metrics), "events": published})}
+    except events.PublishError as e:
+        return {"statusCode": 502, "body": json.dumps({"error": str(e)})}
     except ClientError as e:
-        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -0,0 +1,60 @@
+import json, os
+from botocore.exceptions import ClientError
+from common import aws, kitchen_queue
+
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def sync_ticket(tenant_id, order_id, ticket, order):
+    """Pone o saca el ticket de KitchenQueueIndex según el estado de Kitchen y de Orders.
+
+    Devuelve "queued", "removed" o None si no había nada que cambiar.
+    """
+    queued = ticket.get("status") in kitchen_queue.QUEUED and order.get("status", ticket.get("status")) in kitchen_queue.QUEUED
+    key = {"tenant_id": tenant_id, "order_id": order_id}
+    try:
+        if queued and not ticket.get(kitchen_queue.RANK_KEY):
+            # ticket anterior a la cola planificada
+            return "queued" if kitchen_queue.enqueue(tenant_id, order_id, ticket, order) else None
+        if not queued and ticket.get(kitchen_queue.QUEUE_KEY):
+            kitchen_table.update_item(
+                Key=key,
+                UpdateExpression="REMOVE #q",
+                ConditionExpression="attribute_exists(order_id)",
+                ExpressionAttributeNames={"#q": kitchen_queue.QUEUE_KEY},
+            )
+            return "removed"
+    except ClientError as e:
+        # el ticket se borró mientras tanto
+        if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+            raise
+    return None
+
+
+def handler(event, context):
+    """Mantiene la cola planificada de cocina con Order.Updated / Order.Prepared / Order.Cancelled.
+
+    Con solo `tenant_id` (invocación manual) agrega a la cola los tickets que
+    todavía no tienen plan.
+    """
+    try:
+        detail = (event or {}).get("detail") or event or {}
+        tenant_id = detail.get("tenant_id")
+        order_id = detail.get("id_order") or detail.get("order_id")
+        if not tenant_id:
+            return {"statusCode": 400, "body": json.dumps({"error": "Evento sin tenant_id"})}
+        if not order_id:
+            changed = kitchen_queue.reconcile(tenant_id)
+            return {"statusCode": 200, "body": json.dumps({"tenant_id": tenant_id, "changed": changed})}
+
+        key = {"tenant_id": tenant_id, "order_id": order_id}
+        ticket = kitchen_table.get_item(Key=key, ConsistentRead=True).get("Item")
+        if not ticket:
+            return {"statusCode": 404, "body": json.dumps({"error": "Ticket no encontrado"})}
+        order = orders_table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id}, ConsistentRead=True).get("Item") or {}
+
+        result = sync_ticket(tenant_id, order_id, ticket, order)
+        return {"statusCode": 200, "body": json.dumps({"order_id": order_id, "queue": result})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -1,9 +1,10 @@
-import json, boto3, os, datetime
+import json, os, datetime
 from common.jwt_utils import verify_jwt
 from botocore.exceptions import ClientError
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["MENU_TABLE"])
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+eb = aws.lazy_client("events")
 
 
 def handler(event, context):
@@ -50,13 +51,40 @@ def handler(event, context):
         update_expr.append("updated_at = :u")
         expr_values[":u"] = datetime.datetime.utcnow().isoformat()
 
-        table.update_item(
+        resp = table.update_item(
             Key={"tenant_id": tenant_id, "id_producto": id_producto},
             UpdateExpression="SET " + ", ".join(update_expr),
             ExpressionAttributeNames=expr_names,
-            ExpressionAttributeValues=expr_values
+            ExpressionAttributeValues=expr_values,
+            ReturnValues="ALL_NEW"
         )
 
+        # Si cambió categoria o available, mover el producto en TenantCategoryIndex
+        if "categoria" in body or "available" in body:
+            sync = menu.sync_category_kwargs(resp.get("Attributes", {}))
+            if sync:
+                try:
+                    table.update_item(**sync)
+                except ClientError as e:
+                    # otra actualización se cruzó y ajusta el índice ella misma
+                    if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                        raise
+
+        # Avisar del cambio de menú (invalida cachés de listados); no bloquea la respuesta
+        try:
+            eb.put_events(
+                Entries=[
+                    {
+                        "Source": "kitchen-svc",
+                        "DetailType": "Menu.Updated",
+                        "Detail": json.dumps({"tenant_id": tenant_id, "id_producto": id_producto, "action": "updated"}),
+                        "EventBusName": os.environ["EVENT_BUS"]
+                    }
+                ]
+            )
+        except Exception:
+            pass
+
         return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Producto actualizado"})}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
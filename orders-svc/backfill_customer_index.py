@@ -0,0 +1,43 @@
+import json, os
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+from common.dynamo import ConsumedCapacity, iter_parallel_scan
+from common.logger import log_info
+from common import aws
+
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def handler(event, context):
+    """Completa tenant_customer en órdenes creadas antes de TenantCustomerIndex (invocación manual).
+
+    Solo toca las órdenes que aún no lo tienen, así que se puede relanzar si
+    se corta por timeout. `tenant_id` en el evento limita el backfill a un tenant.
+    """
+    try:
+        tenant_id = (event or {}).get("tenant_id")
+        capacity = ConsumedCapacity()
+
+        pending = Attr("tenant_customer").not_exists() & Attr("id_customer").exists()
+        if tenant_id:
+            pending = pending & Attr("tenant_id").eq(tenant_id)
+
+        updated = 0
+        for order in iter_parallel_scan(table, capacity, projection=["tenant_id", "id_order", "id_customer"], FilterExpression=pending):
+            try:
+                table.update_item(
+                    Key={"tenant_id": order["tenant_id"], "id_order": order["id_order"]},
+                    UpdateExpression="SET tenant_customer = :tc",
+                    ConditionExpression="attribute_exists(id_order)",
+                    ExpressionAttributeValues={":tc": f"{order['tenant_id']}#{order['id_customer']}"},
+                )
+                updated += 1
+            except ClientError as e:
+                # la orden se borró durante el backfill
+                if e.response.get("Error", {}).get("Code") != "ConditionalCheckFailedException":
+                    raise
+
+        log_info("Backfill de TenantCustomerIndex", event, context, {"tenant_id": tenant_id, "updated": updated, "consumed_capacity": capacity.as_dict()})
+        return {"statusCode": 200, "body": json.dumps({"message": "Backfill completado", "updated": updated})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
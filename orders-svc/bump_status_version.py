@@ -0,0 +1,34 @@
+import json, os
+from botocore.exceptions import ClientError
+from common import aws, timeline
+
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+
+def handler(event, context):
+    """Sube la versión de estado del pedido ante cada evento de cambio (EventBridge).
+
+    Copia status / id_customer / updated_at de Orders al item STATUS del timeline,
+    así get_order_status puede responder 304 (o seguir esperando en long-poll)
+    leyendo solo ese item. Lee Orders en vez de confiar en el orden de los eventos.
+    """
+    try:
+        detail = event.get("detail", {}) or {}
+        tenant_id = detail.get("tenant_id")
+        id_order = detail.get("id_order") or detail.get("order_id")
+        if not tenant_id or not id_order:
+            return {"statusCode": 400, "body": json.dumps({"error": "Evento sin tenant_id o id_order"})}
+
+        order = table.get_item(
+            Key={"tenant_id": tenant_id, "id_order": id_order},
+            ProjectionExpression="id_customer, #s, updated_at",
+            ExpressionAttributeNames={"#s": "status"},
+            ConsistentRead=True,
+        ).get("Item")
+        if not order:
+            return {"statusCode": 404, "body": json.dumps({"error": "Pedido no encontrado"})}
+
+        version = timeline.bump_status(tenant_id, id_order, order)
+        return {"statusCode": 200, "body": json.dumps({"id_order": id_order, "version": version})}
+    except ClientError as e:
+        return {"statusCode": 500, "body": json.dumps({"error": str(e)})}
@@ -1,9 +1,10 @@
-import json, os, boto3, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common.transitions import transition, TransitionError, CANCELLED
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
 
 def get_user_info(event):
     """Extrae información del usuario desde headers"""
@@ -46,30 +47,27 @@ def handler(event, context):
         user_info = get_user_info(event)
         tenant_id = get_tenant_id(event)
         
-        order_resp = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
-        order_item = order_resp.get("Item")
-        if not order_item:
-            return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Pedido no encontrado"})}
-        
-        if user_info.get("type") == "staff":
-            pass
-        elif user_info.get("type") == "customer":
-            if order_item.get("id_customer") != user_info.get("id"):
-                return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Solo puedes cancelar tus propios pedidos"})}
-        else:
+        is_customer = user_info.get("type") == "customer"
+        if user_info.get("type") != "staff" and not is_customer:
             return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"error": "Información de usuario no válida"})}
         
-        current_status = order_item.get("status")
-        if current_status in ["en_preparacion", "listo_para_entrega", "en_camino", "entregado"]:
-            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "No se puede cancelar un pedido que ya está en preparación o más avanzado"})}
-        
+        # Una sola escritura condicional: solo se cancela desde 'recibido' y, si es
+        # cliente, solo su propio pedido (la condición reemplaza al get_item previo)
         now = datetime.datetime.utcnow().isoformat()
-        table.update_item(
-            Key={"tenant_id": tenant_id, "id_order": order_id},
-            UpdateExpression="SET #s=:s, updated_at=:u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": "cancelado", ":u": now}
-        )
+        kwargs = {"condition": "id_customer = :cust", "values": {":cust": user_info.get("id")}} if is_customer else {}
+        try:
+            order_item, changed = transition(table, {"tenant_id": tenant_id, "id_order": order_id}, CANCELLED, now, **kwargs)
+        except TransitionError as e:
+            if e.status_code == 409 and is_customer and e.current.get("id_customer") != user_info.get("id"):
+                return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Solo puedes cancelar tus propios pedidos"})}
+            if e.status_code == 409:
+                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "No se puede cancelar un pedido que ya está en preparación o más avanzado"})}
+            return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+        if is_customer and order_item.get("id_customer") != user_info.get("id"):
+            return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Solo puedes cancelar tus propios pedidos"})}
+        if not changed:
+            # ya estaba cancelado (reintento): sin evento duplicado
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Pedido cancelado"})}
         eb.put_events(
             Entries=[
                 {
@@ -1,9 +1,9 @@
-import json, os, boto3, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common import aws
 
 
-dynamo = boto3.resource("dynamodb")
-orders_table = dynamo.Table(os.environ["ORDERS_TABLE"])
+orders_table = aws.lazy_table(os.environ["ORDERS_TABLE"])
 
 
 def handler(event, context):
@@ -1,14 +1,13 @@
-import json, uuid, os, datetime
-from decimal import Decimal
-import boto3
+import json, os
 from botocore.exceptions import ClientError
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from common.logger import log_info, log_error
+from common.orders import build_order_item, OrderValidationError
+from common import aws, events, idempotency
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
 
 def get_user_info(event):
     """Extrae información del usuario desde headers"""
@@ -26,11 +25,35 @@ def get_user_info(event):
         "id": user_id
     }
 
+def create_order(body, user_info, event, context, cors_headers):
+    """Valida, guarda y publica Order.Created; devuelve la respuesta HTTP."""
+    try:
+        item = build_order_item(body, user_info)
+    except OrderValidationError as e:
+        log_error(e.log_message, None, event, context, e.details)
+        return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+    order_id = item["id_order"]
+    tenant_id = item["tenant_id"]
+
+    log_info("Guardando pedido en DynamoDB", event, context, {"order_id": order_id, "tenant_id": tenant_id})
+    table.put_item(Item=item)
+
+    log_info("Enviando evento Order.Created", event, context, {"order_id": order_id})
+    try:
+        events.put_entries(eb, [events.entry("orders-svc", "Order.Created", {"id_order": order_id, "tenant_id": tenant_id})])
+    except (ClientError, events.PublishError) as e:
+        # el pedido ya está guardado: se responde 201 (y la Idempotency-Key queda completada)
+        # para que el reintento del cliente no cree un segundo pedido
+        log_error("Pedido guardado sin evento Order.Created", e, event, context, {"order_id": order_id, "tenant_id": tenant_id})
+
+    log_info("Pedido creado exitosamente", event, context, {"order_id": order_id})
+    return {"statusCode": 201, "headers": cors_headers, "body": json.dumps({"id_order": order_id, "status": "recibido", "total": float(item["total"])})}
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
         "Access-Control-Allow-Origin": headers_in.get("Origin") or headers_in.get("origin") or "*",
-        "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization",
+        "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization,Idempotency-Key",
         "Access-Control-Allow-Methods": "OPTIONS,POST",
         "Content-Type": "application/json",
     }
@@ -52,95 +75,10 @@ def handler(event, context):
         else:
             body = body_raw or {}
 
-        tenant_id = body["tenant_id"]
-        id_customer = body["id_customer"]
-        list_id_products = body["list_id_products"]
-        items = body.get("items") or []
-        delivery_address = body.get("delivery_address") or body.get("address") or body.get("direccion")
-        customer_name = body.get("customer_name") or body.get("name")
-        dest_lat = body.get("dest_lat") or body.get("lat")
-        dest_lng = body.get("dest_lng") or body.get("lng")
-
-        if not list_id_products:
-            log_error("Intento de crear pedido sin productos", None, event, context, {"id_customer": id_customer})
-            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Debe incluir productos"})}
-
-        # Validar que los clientes tengan dirección de entrega registrada
-        if (user_info.get("type") or "").lower() == "customer":
-            if not delivery_address or not str(delivery_address).strip():
-                log_error("Cliente intenta crear pedido sin direccion", None, event, context, {
-                    "id_customer": id_customer,
-                    "tenant_id": tenant_id,
-                })
-                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Direccion de entrega requerida"})}
-        
-        if user_info.get("type") == "customer":
-            if id_customer != user_info.get("id"):
-                log_error("Cliente intenta crear pedido para otro cliente", None, event, context, {
-                    "id_customer_requested": id_customer,
-                    "id_customer_authenticated": user_info.get("id")
-                })
-                return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Solo puedes crear pedidos para tu propia cuenta"})}
-
-        order_id = str(uuid.uuid4())
-        now = datetime.datetime.utcnow().isoformat()
-
-        item = {
-            "id_order": order_id,
-            "tenant_id": tenant_id,
-            "id_customer": id_customer,
-            "list_id_products": list_id_products,
-            "status": "recibido",
-            "created_at": now,
-            "updated_at": now,
-            "staff_confirmed_delivered": False,
-            "customer_confirmed_delivered": False,
-        }
-        if delivery_address:
-            item["delivery_address"] = delivery_address
-        if customer_name:
-            item["customer_name"] = customer_name
-        if dest_lat is not None and dest_lng is not None:
-            try:
-                # DynamoDB no acepta floats nativos; usamos Decimal para coordenadas
-                item["dest_lat"] = Decimal(str(dest_lat))
-                item["dest_lng"] = Decimal(str(dest_lng))
-            except Exception:
-                # Si no se pueden convertir, no rompemos toda la creación del pedido
-                pass
-        if items:
-            normalized_items = []
-            for it in items:
-                if not isinstance(it, dict):
-                    continue
-                ni = dict(it)
-                if "precio" in ni and not isinstance(ni["precio"], Decimal):
-                    try:
-                        ni["precio"] = Decimal(str(ni["precio"]))
-                    except Exception:
-                        # Si no se puede convertir, lo dejamos como está para no romper todo el pedido
-                        pass
-                normalized_items.append(ni)
-            if normalized_items:
-                item["items"] = normalized_items
-
-        log_info("Guardando pedido en DynamoDB", event, context, {"order_id": order_id, "tenant_id": tenant_id})
-        table.put_item(Item=item)
-
-        log_info("Enviando evento Order.Created", event, context, {"order_id": order_id})
-        eb.put_events(
-            Entries=[
-                {
-                    "Source": "orders-svc",
-                    "DetailType": "Order.Created",
-                    "Detail": json.dumps({"id_order": order_id, "tenant_id": tenant_id}),
-                    "EventBusName": os.environ["EVENT_BUS"]
-                }
-            ]
-        )
-
-        log_info("Pedido creado exitosamente", event, context, {"order_id": order_id})
-        return {"statusCode": 201, "headers": cors_headers, "body": json.dumps({"id_order": order_id, "status": "recibido"})}
+        # con Idempotency-Key, un reintento del cliente devuelve la respuesta original sin crear otro pedido
+        tenant_scope = body.get("tenant_id") or headers_in.get("X-Tenant-Id") or headers_in.get("x-tenant-id") or "-"
+        scope = f"{tenant_scope}#{user_info.get('id') or '-'}"
+        return idempotency.run(event, scope, body, cors_headers, lambda: create_order(body, user_info, event, context, cors_headers))
 
     except KeyError as e:
         log_error(f"Campo faltante en request: {e}", e, event, context)
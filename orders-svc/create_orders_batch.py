@@ -0,0 +1,158 @@
+import json, os, datetime
+from botocore.exceptions import ClientError
+from common.logger import log_info, log_error
+from common.orders import build_order_item, OrderValidationError
+from common.dynamo import batch_write_items
+from common import aws, events, idempotency
+
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
+
+MAX_ORDERS = 100
+
+
+def get_user_info(event):
+    """Extrae información del usuario desde headers"""
+    headers = event.get("headers", {}) or {}
+    user_type = headers.get("X-User-Type") or headers.get("x-user-type")
+    user_id = headers.get("X-User-Id") or headers.get("x-user-id")
+
+    if not user_type:
+        query_params = event.get("queryStringParameters") or {}
+        user_type = query_params.get("user_type")
+        user_id = query_params.get("user_id")
+
+    return {
+        "type": user_type,
+        "id": user_id
+    }
+
+
+def publish_created(orders):
+    """Publica Order.Created de a 10 entradas por PutEvents (common.events, con reintentos).
+
+    Devuelve el set de id_order cuyo evento no se pudo publicar.
+    """
+    failed = set()
+    for start in range(0, len(orders), events.MAX_ENTRIES):
+        group = orders[start:start + events.MAX_ENTRIES]
+        try:
+            events.put_entries(eb, [
+                events.entry("orders-svc", "Order.Created", {"id_order": o["id_order"], "tenant_id": o["tenant_id"]})
+                for o in group
+            ])
+        except events.PublishError as e:
+            failed.update(json.loads(entry["Detail"])["id_order"] for entry in e.failed)
+        except ClientError:
+            failed.update(o["id_order"] for o in group)
+    return failed
+
+
+def create_batch(orders, default_tenant, user_info, event, context, cors_headers):
+    """Valida, guarda y publica cada pedido del lote; devuelve la respuesta HTTP con el resultado por pedido."""
+    now = datetime.datetime.utcnow().isoformat()
+    log_info("Iniciando creación de pedidos en lote", event, context, {"orders": len(orders), "tenant_id": default_tenant})
+
+    # 1) validar cada pedido por separado
+    results = []
+    valid = []
+    for index, order in enumerate(orders):
+        if not isinstance(order, dict):
+            results.append({"index": index, "statusCode": 400, "error": "Pedido inválido"})
+            continue
+        if default_tenant and not order.get("tenant_id"):
+            order = {**order, "tenant_id": default_tenant}
+        try:
+            item = build_order_item(order, user_info, now)
+        except KeyError as e:
+            results.append({"index": index, "statusCode": 400, "error": f"Campo faltante: {e}"})
+            continue
+        except OrderValidationError as e:
+            log_error(e.log_message, None, event, context, {**e.details, "index": index})
+            results.append({"index": index, "statusCode": e.status_code, "error": e.error})
+            continue
+        except (TypeError, ValueError, ArithmeticError) as e:
+            # línea mal formada (ej. precio o qty que no son números): falla solo este pedido
+            log_error("Pedido inválido en lote", e, event, context, {"index": index})
+            results.append({"index": index, "statusCode": 400, "error": "Pedido inválido"})
+            continue
+        result = {"index": index, "id_order": item["id_order"], "statusCode": 201, "total": float(item["total"])}
+        results.append(result)
+        valid.append((item, result))
+
+    # 2) escribir los válidos con BatchWriteItem (25 por llamada, reintenta no procesados)
+    written = []
+    if valid:
+        try:
+            unprocessed = {i["id_order"] for i in batch_write_items(table, [item for item, _ in valid])}
+        except ClientError as e:
+            log_error("Error de DynamoDB al guardar pedidos en lote", e, event, context)
+            unprocessed = {item["id_order"] for item, _ in valid}
+        for item, result in valid:
+            if item["id_order"] in unprocessed:
+                result.update({"statusCode": 500, "error": "No se pudo guardar el pedido"})
+                result.pop("id_order")
+                result.pop("total")
+            else:
+                written.append(item)
+
+    # 3) publicar Order.Created de los pedidos guardados
+    if written:
+        not_published = publish_created(written)
+        if not_published:
+            log_error("Pedidos guardados sin evento Order.Created", None, event, context, {"id_orders": sorted(not_published)})
+        for item, result in valid:
+            if result["statusCode"] == 201:
+                result["event_published"] = item["id_order"] not in not_published
+
+    created = len(written)
+    failed = len(results) - created
+    log_info("Pedidos en lote procesados", event, context, {"created": created, "failed": failed})
+    return {
+        "statusCode": 201 if not failed else 207,
+        "headers": cors_headers,
+        "body": json.dumps({"created": created, "failed": failed, "results": results}),
+    }
+
+
+def handler(event, context):
+    """POST /orders/batch: crea varios pedidos (call center, agregadores) con resultado por pedido.
+
+    Body: {"tenant_id": "...", "orders": [{...mismo formato que POST /orders...}]}.
+    Los pedidos sin tenant_id usan el del body o el header X-Tenant-Id.
+    """
+    headers_in = event.get("headers", {}) or {}
+    cors_headers = {
+        "Access-Control-Allow-Origin": headers_in.get("Origin") or headers_in.get("origin") or "*",
+        "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization,Idempotency-Key",
+        "Access-Control-Allow-Methods": "OPTIONS,POST",
+        "Content-Type": "application/json",
+    }
+
+    try:
+        user_info = get_user_info(event)
+        body_raw = event.get("body", "{}")
+        if isinstance(body_raw, str):
+            body = json.loads(body_raw or "{}")
+        else:
+            body = body_raw or {}
+
+        orders = body.get("orders")
+        if not isinstance(orders, list) or not orders:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Debe incluir una lista de pedidos en 'orders'"})}
+        if len(orders) > MAX_ORDERS:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": f"Máximo {MAX_ORDERS} pedidos por solicitud"})}
+
+        default_tenant = body.get("tenant_id") or headers_in.get("X-Tenant-Id") or headers_in.get("x-tenant-id")
+        # con Idempotency-Key, reenviar el mismo lote devuelve los resultados originales
+        scope = f"{default_tenant or '-'}#{user_info.get('id') or '-'}"
+        return idempotency.run(event, scope, body, cors_headers, lambda: create_batch(orders, default_tenant, user_info, event, context, cors_headers))
+
+    except json.JSONDecodeError:
+        return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "Body JSON inválido"})}
+    except ClientError as e:
+        log_error("Error al crear pedidos en lote", e, event, context)
+        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
+    except Exception as e:
+        log_error("Error inesperado al crear pedidos en lote", e, event, context)
+        return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": "Error interno del servidor"})}
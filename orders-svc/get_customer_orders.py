@@ -1,10 +1,16 @@
-import json, os, boto3
+import json, os
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key, Attr
 from botocore.exceptions import ClientError
+from common.dynamo import decode_token, query_page
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# campos de la vista de lista (proyectados en TenantCustomerIndex)
+LIST_FIELDS = ["id_order", "tenant_id", "id_customer", "status", "created_at", "updated_at", "items", "delivery_address"]
 
 def get_user_info(event):
     """Extrae información del usuario desde headers o query params"""
@@ -46,6 +52,68 @@ def to_serializable(obj):
         return [to_serializable(v) for v in obj]
     return obj
 
+def parse_page_params(qs):
+    """limit, rango de fechas (from/to, ISO) y next_token de la query string."""
+    try:
+        limit = int(qs.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("limit debe ser un número")
+    date_from = qs.get("from")
+    date_to = qs.get("to")
+    # una fecha sola como "to" incluye todo ese día
+    if date_to and len(date_to) == 10:
+        date_to += "T23:59:59.999999"
+    if date_from and date_to and date_from > date_to:
+        raise ValueError("from debe ser anterior a to")
+    return {
+        "limit": max(1, min(limit, MAX_LIMIT)),
+        "from": date_from,
+        "to": date_to,
+        "token": qs.get("next_token"),
+    }
+
+
+def customer_page(tenant_id, id_customer, page):
+    """Historial del cliente en el tenant, más nuevo primero, desde TenantCustomerIndex."""
+    tenant_customer = f"{tenant_id}#{id_customer}"
+    if page["token"] and decode_token(page["token"]).get("tenant_customer") != tenant_customer:
+        raise ValueError("next_token no corresponde a este cliente")
+
+    key_cond = Key("tenant_customer").eq(tenant_customer)
+    if page["from"] and page["to"]:
+        key_cond = key_cond & Key("created_at").between(page["from"], page["to"])
+    elif page["from"]:
+        key_cond = key_cond & Key("created_at").gte(page["from"])
+    elif page["to"]:
+        key_cond = key_cond & Key("created_at").lte(page["to"])
+
+    return query_page(
+        table,
+        page["limit"],
+        page["token"],
+        projection=LIST_FIELDS,
+        IndexName="TenantCustomerIndex",
+        KeyConditionExpression=key_cond,
+        ScanIndexForward=False,
+    )
+
+
+def tenant_page(tenant_id, page):
+    """Órdenes del tenant (vista de staff); el rango de fechas se aplica como filtro."""
+    if page["token"] and decode_token(page["token"]).get("tenant_id") != tenant_id:
+        raise ValueError("next_token no corresponde a este tenant")
+
+    kwargs = {"KeyConditionExpression": Key("tenant_id").eq(tenant_id)}
+    if page["from"] or page["to"]:
+        created = Attr("created_at")
+        kwargs["FilterExpression"] = (
+            created.between(page["from"], page["to"]) if page["from"] and page["to"]
+            else created.gte(page["from"]) if page["from"]
+            else created.lte(page["to"])
+        )
+    return query_page(table, page["limit"], page["token"], projection=LIST_FIELDS, **kwargs)
+
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
@@ -63,37 +131,38 @@ def handler(event, context):
             return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"error": "Información de usuario no proporcionada"})}
         
         utype = (user_info.get("type") or '').lower()
-        
-        # Staff: si especifica tenant_id, solo órdenes de ese tenant; si no, todas (multi-tenant admin)
-        if utype == "staff":
-            if tenant_id:
-                resp = table.query(
-                    KeyConditionExpression=Key("tenant_id").eq(tenant_id)
-                )
-            else:
-                resp = table.scan()
-            items = resp.get("Items", [])
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(items))}
-        
-        # Customer: requiere id_customer y tenant_id; usamos GSI por cliente y filtramos por tenant
+        if utype not in ("staff", "customer"):
+            return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Tipo de usuario no válido"})}
+        if not tenant_id:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
+
+        qs = event.get("queryStringParameters") or {}
+        path_params = event.get("pathParameters") or {}
+        try:
+            page = parse_page_params(qs)
+        except ValueError as e:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
+
+        # Customer: solo su propio historial. Staff: el cliente pedido con ?id_customer=,
+        # si no, todas las órdenes del tenant (paginadas; ya no hay scan multi-tenant)
         if utype == "customer":
-            id_customer = user_info.get("id")
-            if not id_customer:
-                path_params = event.get("pathParameters") or {}
-                id_customer = path_params.get("id_customer")
-            
+            id_customer = user_info.get("id") or path_params.get("id_customer")
             if not id_customer:
                 return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "ID de cliente no proporcionado"})}
-            if not tenant_id:
-                return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
-            
-            resp = table.query(
-                IndexName="CustomerIndex",
-                KeyConditionExpression=Key("id_customer").eq(id_customer)
-            )
-            items = [x for x in resp.get("Items", []) if x.get("tenant_id") == tenant_id]
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(items))}
-        
-        return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Tipo de usuario no válido"})}
+        else:
+            id_customer = qs.get("id_customer")
+
+        try:
+            if id_customer:
+                items, next_token = customer_page(tenant_id, id_customer, page)
+            else:
+                items, next_token = tenant_page(tenant_id, page)
+        except ValueError as e:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
+
+        result = {"items": items}
+        if next_token:
+            result["next_token"] = next_token
+        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(result))}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
@@ -1,14 +1,15 @@
-import json, os, boto3
+import json, os
 from decimal import Decimal
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 from common.jwt_utils import verify_jwt
+from common.dynamo import run_parallel
+from common import aws, timeline
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
-users_table = dynamo.Table(os.environ.get("USERS_TABLE", "papasqueens-users"))
-kitchen_table = dynamo.Table(os.environ["KITCHEN_TABLE"])
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+users_table = aws.lazy_table(os.environ.get("USERS_TABLE", "papasqueens-users"))
+kitchen_table = aws.lazy_table(os.environ["KITCHEN_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
 
 def get_user_info(event):
     """Extrae información del usuario desde headers o query params"""
@@ -79,6 +80,34 @@ def check_authorization(user_info, order_item, action="read"):
     
     return False, "Tipo de usuario no válido"
 
+def read_timeline(tenant_id, order_id):
+    try:
+        return timeline.load(tenant_id, order_id)
+    except ClientError:
+        # sin timeline se cae a leer Kitchen y Delivery
+        return {}
+
+def read_workflow(tenant_id, order_id):
+    """Registros de Kitchen y Delivery del pedido leyendo cada tabla."""
+    # Kitchen (clave: tenant_id + order_id)
+    try:
+        k_resp = kitchen_table.get_item(Key={"tenant_id": tenant_id, "order_id": order_id})
+        k = k_resp.get("Item") or {}
+    except Exception:
+        k = {}
+
+    # Delivery (buscar por id_order usando índice y filtrando por tenant)
+    try:
+        d_query = delivery_table.query(
+            IndexName="OrderIndex",
+            KeyConditionExpression=Key("id_order").eq(order_id)
+        )
+        d_items = [x for x in d_query.get("Items", []) if x.get("tenant_id") == tenant_id]
+        d = d_items[0] if d_items else {}
+    except Exception:
+        d = {}
+    return k, d
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
@@ -98,8 +127,12 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
         
-        response = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
-        item = response.get("Item")
+        # pedido y timeline (cocina + reparto) en paralelo: un solo viaje de red
+        reads = run_parallel({
+            "order": lambda: table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id}).get("Item"),
+            "timeline": lambda: read_timeline(tenant_id, order_id),
+        })
+        item = reads["order"]
         if not item:
             return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Pedido no encontrado"})}
         
@@ -107,33 +140,25 @@ def handler(event, context):
         if not authorized:
             return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": error_msg})}
         
+        stages = reads["timeline"]
+        if timeline.KITCHEN in stages or timeline.DELIVERY in stages:
+            k = stages.get(timeline.KITCHEN) or {}
+            d = stages.get(timeline.DELIVERY) or {}
+        else:
+            # pedidos sin timeline (anteriores a OrderTimeline): se leen Kitchen y Delivery
+            k, d = read_workflow(tenant_id, order_id)
+
         # Construir historial a partir de Kitchen y Delivery
         history = []
         if item.get("created_at"):
             history.append({"step": "recibido", "at": item.get("created_at"), "by": item.get("id_customer")})
 
-        # Kitchen (clave: tenant_id + order_id)
-        try:
-            k_resp = kitchen_table.get_item(Key={"tenant_id": tenant_id, "order_id": order_id})
-            k = k_resp.get("Item") or {}
-        except Exception:
-            k = {}
         if k:
             if k.get("accepted_at"):
                 history.append({"step": "aceptado", "at": k.get("accepted_at"), "by": k.get("accepted_by")})
             if k.get("packed_at") or k.get("end_time"):
                 history.append({"step": "empacado", "at": k.get("packed_at") or k.get("end_time"), "by": k.get("packed_by")})
 
-        # Delivery (buscar por id_order usando índice y filtrando por tenant)
-        try:
-            d_query = delivery_table.query(
-                IndexName="OrderIndex",
-                KeyConditionExpression=Key("id_order").eq(order_id)
-            )
-            d_items = [x for x in d_query.get("Items", []) if x.get("tenant_id") == tenant_id]
-            d = d_items[0] if d_items else {}
-        except Exception:
-            d = {}
         if d:
             if d.get("assigned_at"):
                 history.append({"step": "asignado", "at": d.get("assigned_at"), "by": d.get("id_staff")})
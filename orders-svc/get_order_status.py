@@ -1,10 +1,16 @@
-import json, os, boto3
+import json, os, time
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Attr, Key
+from common import aws, prep_model, timeline
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
-delivery_table = dynamo.Table(os.environ["DELIVERY_TABLE"])
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+delivery_table = aws.lazy_table(os.environ["DELIVERY_TABLE"])
+
+# long-poll: API Gateway corta a los 29 s
+MAX_WAIT_SECONDS = 20
+# relecturas con backoff (1, 2, 4, 5, 5... s): a lo sumo ~6 lecturas por espera
+POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 5.0
 
 def get_user_info(event):
     headers = event.get("headers", {})
@@ -51,12 +57,62 @@ def check_authorization(user_info, order_item):
     
     return False, "Tipo de usuario no válido"
 
+def get_since_version(event):
+    """Versión que ya tiene el cliente: If-None-Match (ETag) o ?since_version=."""
+    headers = event.get("headers", {}) or {}
+    qs = event.get("queryStringParameters") or {}
+    raw = headers.get("If-None-Match") or headers.get("if-none-match") or qs.get("since_version")
+    if not raw:
+        return None
+    raw = raw.strip()
+    if raw.startswith("W/"):
+        raw = raw[2:]
+    try:
+        return int(raw.strip('"'))
+    except ValueError:
+        return None
+
+def get_wait_seconds(event, context):
+    """Segundos de long-poll pedidos con ?wait=, acotados por el tiempo que le queda a la Lambda."""
+    qs = event.get("queryStringParameters") or {}
+    try:
+        wait = min(max(float(qs.get("wait") or 0), 0), MAX_WAIT_SECONDS)
+    except ValueError:
+        wait = 0
+    if context is not None and hasattr(context, "get_remaining_time_in_millis"):
+        wait = min(wait, max(context.get_remaining_time_in_millis() / 1000 - 3, 0))
+    return wait
+
+def wait_for_change(tenant_id, order_id, since, wait):
+    """Relee el item STATUS hasta que su versión deje de ser `since` o pasen `wait` segundos.
+
+    Devuelve (cambió, item STATUS). Las relecturas son eventualmente
+    consistentes: una réplica atrasada devuelve una versión <= `since` y se
+    sigue esperando. Si el item desaparece cuenta como cambio y el llamador
+    lee el pedido.
+    """
+    deadline = time.monotonic() + wait
+    interval = POLL_INTERVAL
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False, None
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+        status = timeline.get_stage(tenant_id, order_id, timeline.STATUS)
+        if status is None or int(status.get("version", 0)) > since:
+            return True, status
+
+def etag(version):
+    return f'"{version}"'
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
         "Access-Control-Allow-Origin": headers_in.get("Origin") or headers_in.get("origin") or "*",
         "Access-Control-Allow-Headers": "Content-Type,X-Tenant-Id,X-User-Id,X-User-Email,X-User-Type,Authorization",
         "Access-Control-Allow-Methods": "OPTIONS,GET",
+        "Access-Control-Expose-Headers": "ETag",
         "Content-Type": "application/json",
     }
 
@@ -70,8 +126,19 @@ def handler(event, context):
         tenant_id = get_tenant_id(event)
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
-        
-        resp = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
+
+        # Versión de estado (la sube bump_status_version). Se lee antes que Orders:
+        # así los datos devueltos nunca son más viejos que el ETag.
+        status = timeline.get_stage(tenant_id, order_id, timeline.STATUS, consistent=True)
+        since = get_since_version(event)
+        # el item STATUS trae id_customer: se autoriza sin leer Orders
+        if since is not None and status and check_authorization(user_info, status)[0]:
+            if int(status.get("version", 0)) == since:
+                changed, status = wait_for_change(tenant_id, order_id, since, get_wait_seconds(event, context))
+                if not changed:
+                    return {"statusCode": 304, "headers": {**cors_headers, "ETag": etag(since)}, "body": ""}
+
+        resp = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id}, ConsistentRead=True)
         item = resp.get("Item")
         if not item:
             return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Pedido no encontrado"})}
@@ -84,14 +151,18 @@ def handler(event, context):
         order_status = item.get("status", "")
         
         if order_status in ["en_camino", "listo_para_entrega", "entregado"]:
-            delivery_resp = delivery_table.query(
-                IndexName="OrderIndex",
-                KeyConditionExpression=Key("id_order").eq(order_id)
-            )
-            delivery_items = [x for x in delivery_resp.get("Items", []) if x.get("tenant_id") == tenant_id]
+            # la entrega se lee del timeline del pedido (get_item por clave, sin índice)
+            delivery = timeline.get_stage(tenant_id, order_id, timeline.DELIVERY, consistent=True)
+            if delivery is None:
+                # pedidos sin timeline (anteriores a OrderTimeline)
+                delivery_resp = delivery_table.query(
+                    IndexName="OrderIndex",
+                    KeyConditionExpression=Key("id_order").eq(order_id)
+                )
+                delivery_items = [x for x in delivery_resp.get("Items", []) if x.get("tenant_id") == tenant_id]
+                delivery = delivery_items[0] if delivery_items else None
             
-            if delivery_items:
-                delivery = delivery_items[0]
+            if delivery:
                 delivery_info = {
                     "id_delivery": delivery.get("id_delivery"),
                     "status": delivery.get("status"),
@@ -121,7 +192,19 @@ def handler(event, context):
         
         if delivery_info:
             response_data["delivery"] = delivery_info
+
+        if order_status in ["recibido", "en_preparacion"]:
+            # estimación con el modelo de preparación: O(items), sin leer historial
+            try:
+                response_data["eta"] = prep_model.order_eta(tenant_id, item)
+            except ClientError:
+                pass
+
+        headers_out = cors_headers
+        if status and status.get("version") is not None:
+            response_data["version"] = int(status["version"])
+            headers_out = {**cors_headers, "ETag": etag(response_data["version"])}
         
-        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(response_data)}
+        return {"statusCode": 200, "headers": headers_out, "body": json.dumps(response_data)}
     except ClientError as e:
         return {"statusCode": 500, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
\ No newline at end of file
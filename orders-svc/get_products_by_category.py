@@ -1,9 +1,20 @@
-import json, os, boto3
+import json, os
+from decimal import Decimal
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
+from common.dynamo import decode_token, query_page
+from common.cache import TTLCache, tenant_cached
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["PRODUCTS_TABLE"])
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 100
+# campos de la vista de lista (proyectados en TenantCategoryIndex)
+LIST_FIELDS = ["id_producto", "tenant_id", "nombre", "categoria", "precio", "available", "image_url", "updated_at"]
+
+# Páginas por (tenant, categoría, token); se invalidan con Menu.Updated del tenant
+_products_cache = TTLCache(maxsize=256, ttl=300)
 
 def get_user_info(event):
     headers = event.get("headers", {})
@@ -23,6 +34,61 @@ def get_user_info(event):
         "id": user_id
     }
 
+def get_tenant_id(event):
+    headers = event.get("headers", {}) or {}
+    tenant_id = headers.get("X-Tenant-Id") or headers.get("x-tenant-id")
+    if not tenant_id:
+        qs = event.get("queryStringParameters") or {}
+        tenant_id = qs.get("tenant_id")
+    return tenant_id
+
+def to_serializable(obj):
+    """Convierte Decimals y estructuras anidadas a tipos JSON-serializables."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, dict):
+        return {k: to_serializable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_serializable(v) for v in obj]
+    return obj
+
+def parse_page_params(qs):
+    """limit y next_token de la query string."""
+    try:
+        limit = int(qs.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        raise ValueError("limit debe ser un número")
+    return {"limit": max(1, min(limit, MAX_LIMIT)), "token": qs.get("next_token")}
+
+
+def available_page(tenant_id, categoria, page):
+    """Vista del cliente: productos disponibles de la categoría desde TenantCategoryIndex, por nombre."""
+    category = menu.category_key(tenant_id, categoria)
+    if page["token"] and decode_token(page["token"]).get(menu.CATEGORY_KEY) != category:
+        raise ValueError("next_token no corresponde a esta categoría")
+    return query_page(
+        table,
+        page["limit"],
+        page["token"],
+        projection=LIST_FIELDS,
+        IndexName=menu.CATEGORY_INDEX,
+        KeyConditionExpression=Key(menu.CATEGORY_KEY).eq(category),
+    )
+
+
+def all_page(tenant_id, categoria, page):
+    """Vista del staff: también los no disponibles (fuera del índice), del menú del tenant."""
+    if page["token"] and decode_token(page["token"]).get("tenant_id") != tenant_id:
+        raise ValueError("next_token no corresponde a este tenant")
+    return query_page(
+        table,
+        page["limit"],
+        page["token"],
+        projection=LIST_FIELDS,
+        KeyConditionExpression=Key("tenant_id").eq(tenant_id),
+        FilterExpression=Attr("categoria").eq(categoria),
+    )
+
 def handler(event, context):
     headers_in = event.get("headers", {}) or {}
     cors_headers = {
@@ -38,19 +104,32 @@ def handler(event, context):
         if not user_info.get("type"):
             return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"error": "Información de usuario no proporcionada"})}
         
+        utype = user_info.get("type")
+        if utype not in ("staff", "customer"):
+            return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Tipo de usuario no válido"})}
+
         categoria = event["pathParameters"]["categoria"]
-        
-        if user_info.get("type") == "staff":
-            resp = table.scan(FilterExpression=Attr("categoria").eq(categoria))
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
-        
-        if user_info.get("type") == "customer":
-            resp = table.scan(
-                FilterExpression=Attr("categoria").eq(categoria) & Attr("available").eq(True)
+        tenant_id = get_tenant_id(event)
+        if not tenant_id:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
+
+        # Una página por request (Query por tenant, ya no scan de todos los tenants);
+        # las páginas calientes salen de la caché del contenedor
+        try:
+            page = parse_page_params(event.get("queryStringParameters") or {})
+            load_page = available_page if utype == "customer" else all_page
+            result = tenant_cached(
+                _products_cache, "menu", tenant_id, (utype, categoria, page["limit"], page["token"]),
+                lambda: load_page(tenant_id, categoria, page)
             )
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
-        
-        return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Tipo de usuario no válido"})}
+        except ValueError as e:
+            return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": str(e)})}
+
+        items, next_token = result
+        body = {"items": items}
+        if next_token:
+            body["next_token"] = next_token
+        return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(to_serializable(body))}
     except KeyError as e:
         return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": f"Parámetro faltante: {e}"})}
     except ClientError as e:
@@ -1,9 +1,10 @@
-import json, os, boto3, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
 from boto3.dynamodb.conditions import Attr
+from common.dynamo import iter_scan
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
 
 
 def handler(event, context):
@@ -24,13 +25,13 @@ def handler(event, context):
 
         # Si no llega tenant_id en el evento (compatibilidad hacia atrás), resolverlo buscando la orden
         if not tenant_id:
-            scan_resp = table.scan(
-                FilterExpression=Attr("id_order").eq(order_id)
+            match = next(
+                iter_scan(table, projection=["tenant_id"], FilterExpression=Attr("id_order").eq(order_id)),
+                None,
             )
-            items = scan_resp.get("Items", [])
-            if not items:
+            if not match:
                 return {"statusCode": 404, "body": json.dumps({"error": "Pedido no encontrado"})}
-            tenant_id = items[0]["tenant_id"]
+            tenant_id = match["tenant_id"]
 
         order_resp = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
         if not order_resp.get("Item"):
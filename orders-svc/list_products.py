@@ -1,9 +1,36 @@
-import json, os, boto3
+import json, os
+from decimal import Decimal
 from botocore.exceptions import ClientError
-from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.conditions import Attr, Key
+from common.dynamo import iter_query, iter_scan
+from common.cache import ALL_TENANTS, TTLCache, tenant_cached
+from common import aws, menu
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["PRODUCTS_TABLE"])
+table = aws.lazy_table(os.environ["MENU_TABLE"])
+
+# Listado de productos (de un tenant o de todos); se invalida con Menu.Updated
+_products_cache = TTLCache(maxsize=64, ttl=300)
+
+
+def to_serializable(obj):
+    """Convierte Decimals y estructuras anidadas a tipos JSON-serializables."""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, dict):
+        return {k: to_serializable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_serializable(v) for v in obj]
+    return obj
+
+
+def load_products(tenant_id, available_only):
+    """Productos de MenuItems: la partición del tenant si hay uno, si no todos los tenants."""
+    kwargs = {"FilterExpression": Attr("available").eq(True)} if available_only else {}
+    if tenant_id:
+        items = iter_query(table, KeyConditionExpression=Key("tenant_id").eq(tenant_id), **kwargs)
+    else:
+        items = iter_scan(table, **kwargs)
+    return to_serializable(list(items))
 
 def get_user_info(event):
     headers = event.get("headers", {})
@@ -38,13 +65,29 @@ def handler(event, context):
         if not user_info.get("type"):
             return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"error": "Información de usuario no proporcionada"})}
         
+        # Con tenant: el snapshot del menú en S3 (ETag / ?redirect=1), sin leer DynamoDB
+        headers = event.get("headers", {}) or {}
+        qs = event.get("queryStringParameters") or {}
+        tenant_id = headers.get("X-Tenant-Id") or headers.get("x-tenant-id") or qs.get("tenant_id")
+        if tenant_id and user_info.get("type") in ("staff", "customer"):
+            view = "all" if user_info.get("type") == "staff" else "available"
+            try:
+                snapshot = menu.snapshot_response(event, tenant_id, view, cors_headers)
+            except ClientError:
+                snapshot = None
+            if snapshot:
+                return snapshot
+
         if user_info.get("type") == "staff":
-            resp = table.scan()
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
+            items = tenant_cached(_products_cache, "menu", tenant_id or ALL_TENANTS, "all", lambda: load_products(tenant_id, False))
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(items)}
         
         if user_info.get("type") == "customer":
-            resp = table.scan(FilterExpression=Attr("available").eq(True))
-            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(resp.get("Items", []))}
+            items = tenant_cached(
+                _products_cache, "menu", tenant_id or ALL_TENANTS, "available",
+                lambda: load_products(tenant_id, True)
+            )
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps(items)}
         
         return {"statusCode": 403, "headers": cors_headers, "body": json.dumps({"error": "Tipo de usuario no válido"})}
     except ClientError as e:
@@ -1,10 +1,10 @@
-import json, os, boto3
+import json, os
 from decimal import Decimal
 from botocore.exceptions import ClientError
+from common import aws
 
 
-dynamo = boto3.resource("dynamodb")
-users_table = dynamo.Table(os.environ["USERS_TABLE"])
+users_table = aws.lazy_table(os.environ["USERS_TABLE"])
 
 
 def to_serializable(obj):
@@ -1,9 +1,10 @@
-import json, os, boto3, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
+from common.transitions import transition, TransitionError
+from common import aws
 
-dynamo = boto3.resource("dynamodb")
-table = dynamo.Table(os.environ["ORDERS_TABLE"])
-eb = boto3.client("events")
+table = aws.lazy_table(os.environ["ORDERS_TABLE"])
+eb = aws.lazy_client("events")
 
 def get_user_info(event):
     """Extrae información del usuario desde headers"""
@@ -54,17 +55,15 @@ def handler(event, context):
         if not tenant_id:
             return {"statusCode": 400, "headers": cors_headers, "body": json.dumps({"error": "tenant_id requerido"})}
         
-        order_resp = table.get_item(Key={"tenant_id": tenant_id, "id_order": order_id})
-        if not order_resp.get("Item"):
-            return {"statusCode": 404, "headers": cors_headers, "body": json.dumps({"error": "Pedido no encontrado"})}
-        
         now = datetime.datetime.utcnow().isoformat()
-        table.update_item(
-            Key={"tenant_id": tenant_id, "id_order": order_id},
-            UpdateExpression="SET #s = :s, updated_at = :u",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":s": new_status, ":u": now}
-        )
+        # escritura condicional: solo avanza si el estado actual permite el salto (sin leer antes)
+        try:
+            _, changed = transition(table, {"tenant_id": tenant_id, "id_order": order_id}, new_status, now)
+        except TransitionError as e:
+            return {"statusCode": e.status_code, "headers": cors_headers, "body": json.dumps({"error": e.error})}
+        if not changed:
+            # reintento de una actualización ya aplicada: no se vuelve a publicar el evento
+            return {"statusCode": 200, "headers": cors_headers, "body": json.dumps({"message": "Estado actualizado"})}
 
         eb.put_events(
             Entries=[
@@ -1,19 +1,20 @@
-import json, os, boto3, uuid, datetime
+import json, os, uuid, datetime
 from botocore.exceptions import ClientError
-import bcrypt
 from common.jwt_utils import sign_jwt
+from common import aws
 
 
-dynamo = boto3.resource("dynamodb")
-users_table = dynamo.Table(os.environ["USERS_TABLE"])  # papasqueens-users
+users_table = aws.lazy_table(os.environ["USERS_TABLE"])  # papasqueens-users
 
 
 def hash_password(password):
+    import bcrypt  # import diferido: fuera del cold start
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
 
 def verify_password(password, password_hash):
+    import bcrypt  # import diferido: fuera del cold start
     try:
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     except Exception:
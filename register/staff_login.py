@@ -1,14 +1,15 @@
-import json, os, boto3, datetime
+import json, os, datetime
 from botocore.exceptions import ClientError
-import bcrypt
 from common.jwt_utils import sign_jwt
+from common.dynamo import iter_query
+from common import aws
 
 
-dynamo = boto3.resource("dynamodb")
-staff_table = dynamo.Table(os.environ["STAFF_TABLE"])  # Staff
+staff_table = aws.lazy_table(os.environ["STAFF_TABLE"])  # Staff
 
 
 def verify_password(password: str, password_hash: str) -> bool:
+    import bcrypt  # import diferido: fuera del cold start
     try:
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     except Exception:
@@ -45,13 +46,14 @@ def handler(event, context):
             staff_item = None
 
         if (not staff_item) and username:
-            # fallback: escaneo por email dentro del mismo tenant
+            # fallback: búsqueda por email dentro del mismo tenant (tenant_id es la clave de partición)
             try:
-                from boto3.dynamodb.conditions import Attr
-                scan = staff_table.scan(
-                    FilterExpression=Attr("tenant_id").eq(tenant_id)
+                from boto3.dynamodb.conditions import Key
+                staff_items = iter_query(
+                    staff_table,
+                    KeyConditionExpression=Key("tenant_id").eq(tenant_id)
                 )
-                for it in scan.get("Items", []):
+                for it in staff_items:
                     if str(it.get("email", "")).lower() == str(username).lower():
                         staff_item = it
                         break
@@ -67,12 +69,15 @@ def handler(event, context):
         if not verify_password(password, staff_item.get("password_hash", "")):
             return {"statusCode": 401, "headers": cors_headers, "body": json.dumps({"error": "Credenciales inválidas"})}
 
-        # actualizar last_login
+        # actualizar last_login (y role_status para registros previos a TenantRoleStatusIndex)
         try:
             staff_table.update_item(
                 Key={"tenant_id": staff_item.get("tenant_id") or tenant_id, "id_staff": staff_item["id_staff"]},
-                UpdateExpression="SET last_login = :ts",
-                ExpressionAttributeValues={":ts": datetime.datetime.utcnow().isoformat()}
+                UpdateExpression="SET last_login = :ts, role_status = :rs",
+                ExpressionAttributeValues={
+                    ":ts": datetime.datetime.utcnow().isoformat(),
+                    ":rs": f"{staff_item.get('role', 'staff')}#{staff_item.get('status', 'activo')}",
+                }
             )
         except Exception:
             pass